@@ -9,7 +9,7 @@ from __future__ import annotations
 import os
 import stat
 import sys
-from dataclasses import dataclass
+from dataclasses import dataclass, replace
 from enum import Enum
 from pathlib import Path
 from typing import Annotated, Final, Self, TextIO
@@ -23,6 +23,8 @@ from typer import Argument, Option, Typer
 
 from tyranno_sandbox._about import __about__
 from tyranno_sandbox.context import Context, ContextFactory, DefaultContextFactory
+from tyranno_sandbox.functions.license_index import LicenseIndex
+from tyranno_sandbox.functions.licenses import LicenseFunctions
 from tyranno_sandbox.global_vars import EnvGlobalVarsFactory, GlobalVars
 from tyranno_sandbox.sync import Syncer
 
@@ -183,9 +185,11 @@ class State:
 
     context_factory: ContextFactory
     is_dry_run: bool = False  # Will be set later.
+    is_offline: bool = False  # Will be set later.
 
     def create_context(self) -> Context:
-        return self.context_factory(Path.cwd(), ENV, dry_run=self.is_dry_run)
+        env = replace(ENV, offline=True) if self.is_offline else ENV
+        return self.context_factory(Path.cwd(), env, dry_run=self.is_dry_run)
 
 
 logging: Final = Logging()
@@ -199,6 +203,9 @@ cli: Final = Typer(
 def meta(
     *,
     dry_run: Annotated[bool, Option(help="Just log; don't make any changes")] = False,
+    offline: Annotated[
+        bool, Option(help="Don't make network requests; use cached responses, even if stale.")
+    ] = ENV.offline,
     verbose: Annotated[
         int, Option("--verbose", "-v", count=True, help="Log INFO (repeat for DEBUG, TRACE).")
     ] = 0,
@@ -211,6 +218,7 @@ def meta(
 ) -> None:
     logging.configure(quiet=quiet, verbose=verbose, to=log_to, format=ENV.log_format)
     state.is_dry_run = dry_run
+    state.is_offline = offline
 
 
 @cli.command()
@@ -242,14 +250,52 @@ def new(
 
 
 @cli.command()
-def sync() -> None:
+def sync(
+    *,
+    jobs: Annotated[
+        int, Option("--jobs", "-j", min=1, help="Number of files to process in parallel.")
+    ] = os.cpu_count() or 1,
+    force: Annotated[
+        bool, Option(help="Re-sync every target, even those unchanged since the last sync.")
+    ] = False,
+    rewrite_unchanged: Annotated[
+        bool, Option(help="Rewrite targets even if their content would not change.")
+    ] = False,
+) -> None:
     """Syncs project metadata between configured files."""
     logger.info("Syncing metadata...")
     context = state.create_context()
-    syncer = Syncer(context)
-    syncer.run()
+    syncer = Syncer(context, jobs=jobs, incremental=not force, rewrite_unchanged=rewrite_unchanged)
+    try:
+        syncer.run()
+    finally:
+        context.data.close()
     logger.success("Sync complete.")
 
 
+@cli.command()
+def refresh_licenses(
+    ids: Annotated[
+        list[str] | None,
+        Argument(
+            help="SPDX IDs to include [default: all non-deprecated licenses].", show_default=False
+        ),
+    ] = None,
+    *,
+    jobs: Annotated[int, Option("--jobs", "-j", min=1, help="Number of parallel downloads.")] = 8,
+) -> None:
+    """Downloads SPDX licenses and rebuilds the local license index."""
+    import niquests  # noqa: PLC0415
+
+    index = LicenseIndex.of(ENV)
+    logger.info(f"Rebuilding license index {index.path}...")
+    if state.is_dry_run:
+        logger.success("Dry run; not downloading licenses.")
+        return
+    with niquests.Session() as session:
+        n = LicenseFunctions(session, index).refresh_index(ids or (), jobs=jobs)
+    logger.success(f"Wrote {n} licenses to {index.path}.")
+
+
 if __name__ == "__main__":
     cli()
@@ -4,36 +4,43 @@
 
 """Per-repo context."""
 
+import hashlib
+import json
 import re
-import tomllib
-from dataclasses import dataclass
-from typing import TYPE_CHECKING, Any, Final
+from dataclasses import dataclass, field
+from functools import lru_cache
+from typing import TYPE_CHECKING, Any, Final, NamedTuple
 
-from jsonpath_ng.ext import parse as jsonpath_parse
 from pathspec import GitIgnoreSpec
 
-from tyranno_sandbox.dot_tree import DotTree, Toml
-from tyranno_sandbox.tyranno_functions import FUNCS, SOURCE_FUNCS
+from tyranno_sandbox.prefetch import NetworkCall, NetworkCalls
+from tyranno_sandbox.tree_cache import TreeCache
+from tyranno_sandbox.tyranno_functions import FUNCS, NETWORK_FUNCS, PURE_FUNCS, SOURCE_FUNCS
 
 if TYPE_CHECKING:
     from collections.abc import Iterator
     from pathlib import Path
 
+    from tyranno_sandbox.dot_tree import DotTree, Toml
     from tyranno_sandbox.global_vars import GlobalVars
 
 __all__ = [
     "CommentSyntaxError",
+    "CompiledExpression",
     "Context",
     "ContextFactory",
     "Data",
     "DefaultContextFactory",
     "ErrorLocation",
     "ExpressionError",
+    "FuncCall",
     "FunctionFailedError",
+    "Lookup",
     "NoSuchFunctionError",
     "NoSuchKeyError",
     "SignatureMismatchError",
     "SyncError",
+    "compile_expression",
 ]
 
 # ── Regex patterns (all pre-compiled) ────────────────────────────────────────
@@ -173,14 +180,136 @@ class FunctionFailedError(ExpressionError):
         return f"Function {self.name!r} failed{self._loc_str()}: {self.cause}"
 
 
+# ── Expression compilation ────────────────────────────────────────────────────
+
+
+class FuncCall(NamedTuple):
+    """A function call step like `replace(@, '-', '_')`, with `@` and quotes removed from args."""
+
+    name: str
+    args: tuple[str, ...]
+
+
+class Lookup(NamedTuple):
+    """An attribute or dict-key access step like `.minor_version`."""
+
+    name: str
+
+
+type Step = FuncCall | Lookup
+
+
+@dataclass(frozen=True, slots=True)
+class CompiledExpression:
+    """An expression from inside `$<< >>`, parsed once into an evaluation plan.
+
+    See [compile_expression][] and [Data.evaluate][].
+
+    Attributes:
+        key: The key expression to resolve, or `None` to start from `None`.
+        steps: Function calls and lookups to apply in order.
+        pipe: Whether the `|` syntax was used.
+          Unlike the compact dot-chained syntax, this formats a final `None` as `"None"`.
+        pure: Whether every function called is in `PURE_FUNCS`,
+          so that the result is fixed for a given tree and `in_key`.
+    """
+
+    key: str | None
+    steps: tuple[Step, ...]
+    pipe: bool
+    pure: bool = True
+
+
+@lru_cache(maxsize=1024)
+def compile_expression(expression: str) -> CompiledExpression:
+    """Parses an expression from inside `$<< >>` into a [CompiledExpression][].
+
+    Handles:
+    - Simple key paths: `project.name`, `.vendor`
+    - Pipe syntax: `project.keywords | yaml(@)`
+    - Chained functions: `project.version.pep440(@).minor_version`
+    - Standalone calls: `now_utc().year`
+
+    Plans are cached by expression text, since the same few expressions recur across targets.
+    """
+    expression = expression.strip()
+    if not expression:
+        return CompiledExpression(None, (), pipe=False)
+
+    # Pipe syntax: split on | and process left-to-right
+    if "|" in expression:
+        first, *calls = [part.strip() for part in _PIPE_SPLIT_RE.split(expression)]
+        steps = tuple(_compile_step(call) for call in calls)
+        if "(" in first:
+            return _plan(None, (_compile_step(first), *steps), pipe=True)
+        return _plan(first, steps, pipe=True)
+
+    # Compact dot-chained syntax: key.func1(args).func2(args)
+    key_part, calls = _split_chained(expression)
+    steps = tuple(_compile_step(call) for call in calls)
+    return _plan(key_part or None, steps, pipe=False)
+
+
+def _plan(key: str | None, steps: tuple[Step, ...], *, pipe: bool) -> CompiledExpression:
+    pure = all(s.name in PURE_FUNCS for s in steps if isinstance(s, FuncCall))
+    return CompiledExpression(key, steps, pipe=pipe, pure=pure)
+
+
+def _calls_network(plan: CompiledExpression) -> bool:
+    return any(isinstance(s, FuncCall) and s.name in NETWORK_FUNCS for s in plan.steps)
+
+
+def _split_chained(expr: str) -> tuple[str, list[str]]:
+    """Split `key.func1(args).func2(args)` into a key path and function list."""
+    if _WS_CHECK_RE.search(expr):
+        expr = _WS_DOT_RE.sub(".", _MULTI_SPACE_RE.sub(" ", expr)).strip()
+
+    segments = expr.split(".")
+    key_segs: list[str] = []
+    func_calls: list[str] = []
+    in_funcs = False
+    for seg in segments:
+        if in_funcs or ("(" in seg):
+            if seg:
+                func_calls.append(seg)
+            in_funcs = True
+        else:
+            key_segs.append(seg)
+
+    # Preserve empty leading element so `.frag` → `".frag"` not `"frag"`
+    return ".".join(key_segs), func_calls
+
+
+def _compile_step(func_call: str) -> Step:
+    """Parse a single function call like `yaml(@)` or key access like `year`."""
+    func_call = func_call.strip()
+    if m := _FUNC_CALL_RE.fullmatch(func_call):
+        raw_args = [a.strip() for a in m.group(2).split(",") if a.strip()]
+        # `@` is the value placeholder; strip it — value is always passed as first arg
+        return FuncCall(m.group(1), tuple(a.strip("'\"") for a in raw_args if a != "@"))
+    return Lookup(func_call)
+
+
 # ── Data and Context ──────────────────────────────────────────────────────────
 
 
 @dataclass(frozen=True, slots=True)
 class Data:
-    """A data source for `::tyranno::` comments."""
+    """A data source for `::tyranno::` comments.
+
+    The tree must not be modified after construction:
+    results of pure expressions are memoized for the lifetime of this object (i.e. one run).
+
+    Attributes:
+        tree: The data.
+        network: Calls functions in `NETWORK_FUNCS`; if `None`, those functions fail.
+    """
 
     tree: DotTree
+    network: NetworkCalls | None = None
+    _memo: dict[tuple[str, str], str] = field(
+        default_factory=dict, init=False, repr=False, compare=False
+    )
 
     def get(self, key: str) -> Toml | None:
         return self.tree.get(key)
@@ -188,6 +317,16 @@ class Data:
     def access(self, key: str) -> Toml:
         return self.tree.access(key)
 
+    def snapshot(self) -> dict[str, Any]:
+        """Returns a copy of the tree as JSON data, with dates and times as ISO 8601 strings."""
+        return json.loads(json.dumps(dict(self.tree), ensure_ascii=False, default=str))
+
+    def digest(self) -> str:
+        """Returns a SHA-256 hex digest of the tree, which changes iff the data changes."""
+        # TOML dates and times fall back to `str`, which is their ISO 8601 form.
+        encoded = json.dumps(dict(self.tree), sort_keys=True, ensure_ascii=False, default=str)
+        return hashlib.sha256(encoded.encode()).hexdigest()
+
     def replace_vars_in(self, template: str, *, in_key: str = "") -> str:
         def _expand(m: re.Match) -> str:
             return self.expand_var(m.group("expr"), in_key=in_key)
@@ -201,72 +340,84 @@ class Data:
     def expand_var(self, expression: str, *, in_key: str = "") -> str:
         """Evaluate a single expression from inside ``$<< >>``.
 
-        Handles:
-        - Simple key paths: `project.name`, `.vendor`
-        - Pipe syntax: `project.keywords | yaml(@)`
-        - Chained functions: `project.version.pep440(@).minor_version`
-        - Standalone calls: `now_utc().year`
+        The expression is compiled via [compile_expression][], which caches the plan.
+        If the plan is pure, the result is memoized by `(expression, in_key)`.
         """
-        expression = expression.strip()
-        if not expression:
+        memo_key = (expression, in_key)
+        if (result := self._memo.get(memo_key)) is not None:
+            return result
+        plan = compile_expression(expression)
+        result = self.evaluate(plan, in_key=in_key)
+        if plan.pure:
+            self._memo[memo_key] = result
+        return result
+
+    def evaluate(self, plan: CompiledExpression, *, in_key: str = "") -> str:
+        """Evaluate a [CompiledExpression][] against this data."""
+        value: Any = None if plan.key is None else self._resolve_key(plan.key, in_key=in_key)
+        for step in plan.steps:
+            value = self._apply_step(step, value)
+        if value is None and not plan.pipe:
             return ""
+        return self._to_str(value)
+
+    def network_calls(self, template: str, *, in_key: str = "") -> Iterator[NetworkCall]:
+        """Yields the network calls that rendering `template` would make, for prefetching.
+
+        Each expression's steps are evaluated up to its first network call.
+        Later network calls need that call's result, so they're made while rendering.
+        Expressions that fail before reaching a network call are skipped.
+        """
+        for m in EXPR_REGEX.finditer(template):
+            plan = compile_expression(m.group("expr"))
+            if not _calls_network(plan):
+                continue
+            try:
+                value = None if plan.key is None else self._resolve_key(plan.key, in_key=in_key)
+                for step in plan.steps:
+                    if isinstance(step, FuncCall) and step.name in NETWORK_FUNCS:
+                        yield NetworkCall(step.name, str(value), step.args)
+                        break
+                    value = self._apply_step(step, value)
+            except Exception:  # noqa: BLE001, S112  # reported when rendering
+                continue
+
+    def close(self) -> None:
+        """Releases [network][]'s connections, if any."""
+        if self.network is not None:
+            self.network.close()
+
+    def is_pure(self, template: str) -> bool:
+        """Returns whether every expression in `template` is pure (see [CompiledExpression][]).
+
+        The output of a pure template is fixed by the keys it reads (see [dependencies][]).
+        Impure ones read the time or the network, so their output can change at any time.
+        """
+        return all(compile_expression(m.group("expr")).pure for m in EXPR_REGEX.finditer(template))
+
+    def dependencies(self, template: str, *, in_key: str = "") -> set[str]:
+        """Returns the `.`-delimited keys that rendering `template` reads from the tree.
 
-        # Pipe syntax: split on | and process left-to-right
-        if "|" in expression:
-            parts = _PIPE_SPLIT_RE.split(expression)
-            first = parts[0].strip()
-            value: Any = (
-                self._apply_func(first, None)
-                if "(" in first
-                else self._resolve_key(first, in_key=in_key)
-            )
-            for func_call in parts[1:]:
-                value = self._apply_func(func_call.strip(), value)
-            return self._to_str(value)
-
-        # Compact dot-chained syntax: key.func1(args).func2(args)
-        key_part, func_calls = self._parse_chained(expression)
-        value = None if not key_part else self._resolve_key(key_part, in_key=in_key)
-        for fc in func_calls:
-            value = self._apply_func(fc, value)
-        return self._to_str(value) if value is not None else ""
-
-    def _parse_chained(self, expr: str) -> tuple[str, list[str]]:
-        """Split `key.func1(args).func2(args)` into a key path and function list."""
-        if _WS_CHECK_RE.search(expr):
-            expr = _WS_DOT_RE.sub(".", _MULTI_SPACE_RE.sub(" ", expr)).strip()
-
-        segments = expr.split(".")
-        key_segs: list[str] = []
-        func_calls: list[str] = []
-        in_funcs = False
-        for seg in segments:
-            if in_funcs or ("(" in seg):
-                if seg:
-                    func_calls.append(seg)
-                in_funcs = True
-            else:
-                key_segs.append(seg)
-
-        # Preserve empty leading element so `.frag` → `".frag"` not `"frag"`
-        return ".".join(key_segs), func_calls
+        These are the keys of each expression, as [_resolve_key][] would resolve them.
+        A JSONPath is reduced to its leading dotted key; e.g. `project.urls` for `project.urls.*`.
+        `""` stands for the whole tree.
+        Whatever functions read (e.g. the time, or the network) is not included;
+        see [is_pure][].
+        """
+        keys: set[str] = set()
+        for m in EXPR_REGEX.finditer(template):
+            plan = compile_expression(m.group("expr"))
+            if plan.key is None or (key := self._absolute_key(plan.key, in_key=in_key)) is None:
+                continue
+            keys.add(prefix.group() if (prefix := SIMPLE_KEY_REGEX.match(key)) else "")
+        return keys
 
     def _resolve_key(self, expr: str, *, in_key: str = "") -> Any:
         """Resolve a dotted key expression to its raw value in the tree."""
         expr = expr.strip()
-        if not expr:
-            return ""
-
-        if expr.startswith(_PREFIX_ROOT):
-            simple_key = expr[2:]
-        elif expr.startswith(_PREFIX_AT):
-            simple_key = "tool.tyranno.data." + expr[2:]
-        elif expr.startswith(_PREFIX_LOCAL):
-            simple_key = (in_key + expr) if in_key else ("tool.tyranno.data" + expr)
-        elif expr == _ROOT_ONLY:
+        simple_key = self._absolute_key(expr, in_key=in_key)
+        if simple_key is None:
             return ""
-        else:
-            simple_key = expr.removeprefix(_MARKER_FILE_LOCAL)
 
         if SIMPLE_KEY_REGEX.fullmatch(simple_key):
             try:
@@ -276,33 +427,52 @@ class Data:
 
         jpath = expr if expr.startswith("$") else f"$.{simple_key}"
         try:
-            matches = jsonpath_parse(jpath).find(dict(self.tree))
+            matches = self.tree.query(jpath)
             if matches:
-                return matches[0].value
+                return matches[0]
         except Exception as e:
             raise NoSuchKeyError(expr) from e
         raise NoSuchKeyError(expr)
 
-    def _apply_func(self, func_call: str, value: Any) -> Any:
+    @staticmethod
+    def _absolute_key(expr: str, *, in_key: str = "") -> str | None:
+        """Expands the prefix of a key expression; returns `None` for the empty key (`$`)."""
+        expr = expr.strip()
+        if not expr or expr == _ROOT_ONLY:
+            return None
+        if expr.startswith(_PREFIX_ROOT):
+            return expr[2:]
+        if expr.startswith(_PREFIX_AT):
+            return "tool.tyranno.data." + expr[2:]
+        if expr.startswith(_PREFIX_LOCAL):
+            return (in_key + expr) if in_key else ("tool.tyranno.data" + expr)
+        return expr.removeprefix(_MARKER_FILE_LOCAL)
+
+    def _apply_step(self, step: Step, value: object) -> object:
         """Apply a single function call like `yaml(@)` or key access like `year`."""
-        func_call = func_call.strip()
-        if m := _FUNC_CALL_RE.fullmatch(func_call):
-            name = m.group(1)
-            raw_args = [a.strip() for a in m.group(2).split(",") if a.strip()]
-            # `@` is the value placeholder; strip it — value is always passed as first arg
-            extra_args = [a.strip("'\"") for a in raw_args if a != "@"]
-            if name in SOURCE_FUNCS:
-                return SOURCE_FUNCS[name](*extra_args)
-            if name in FUNCS:
-                return FUNCS[name](value, *extra_args)
-            raise NoSuchFunctionError(name)
+        if isinstance(step, FuncCall):
+            if step.name in SOURCE_FUNCS:
+                return SOURCE_FUNCS[step.name](*step.args)
+            if step.name in FUNCS:
+                return FUNCS[step.name](value, *step.args)
+            if step.name in NETWORK_FUNCS:
+                return self._call_network(NetworkCall(step.name, str(value), step.args))
+            raise NoSuchFunctionError(step.name)
         # No parentheses: treat as attribute or dict-key access on the current value
         try:
-            return getattr(value, func_call)
+            return getattr(value, step.name)
         except AttributeError:
-            if isinstance(value, dict) and func_call in value:
-                return value[func_call]
-            raise NoSuchFunctionError(func_call)
+            if isinstance(value, dict) and step.name in value:
+                return value[step.name]
+            raise NoSuchFunctionError(step.name) from None
+
+    def _call_network(self, call: NetworkCall) -> object:
+        if self.network is None:
+            raise FunctionFailedError(call.name, cause="network functions are unavailable")
+        try:
+            return self.network.call(call)
+        except Exception as e:
+            raise FunctionFailedError(call.name, cause=str(e)) from e
 
     @staticmethod
     def _to_str(value: object) -> str:
@@ -334,6 +504,10 @@ class Context:
     def trash_dir(self) -> Path:
         return self.repo_dir / self.env.tyranno_dir / "trashed"
 
+    @property
+    def manifest_path(self) -> Path:
+        return self.repo_dir / self.env.tyranno_dir / "sync-manifest.json"
+
     def find_targets(self) -> Iterator[Path]:
         include = self.data.tree.get_list_as("tool.tyranno.targets", as_type=str)
         target_spec = GitIgnoreSpec.from_lines(include)
@@ -360,6 +534,6 @@ class DefaultContextFactory(ContextFactory):
     """A [Context][] factory that reads from `pyproject.toml`."""
 
     def __call__(self, cwd: Path, env: GlobalVars, *, dry_run: bool) -> Context:
-        read = (cwd / "pyproject.toml").read_text(encoding="utf-8")
-        tree = DotTree.from_nested(tomllib.loads(read))
-        return Context(env=env, repo_dir=cwd, data=Data(tree), dry_run=dry_run)
+        tree = TreeCache.of(env).load_toml(cwd / "pyproject.toml").indexed()
+        data = Data(tree, NetworkCalls.of(env))
+        return Context(env=env, repo_dir=cwd, data=data, dry_run=dry_run)
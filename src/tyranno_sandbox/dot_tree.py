@@ -7,14 +7,24 @@
 See [DotTree][].
 """
 
+import re
 from collections import Counter, defaultdict
-from collections.abc import Callable, Generator, Iterator, Mapping, MutableMapping, MutableSequence
+from collections.abc import (
+    Callable,
+    Generator,
+    Iterator,
+    Mapping,
+    MutableMapping,
+    MutableSequence,
+    Sequence,
+)
 from dataclasses import dataclass, field
 from datetime import date, datetime, time
-from typing import TYPE_CHECKING, Literal, Self, TypeIs, overload
+from functools import lru_cache
+from typing import TYPE_CHECKING, Final, Literal, NamedTuple, NoReturn, Self, TypeIs, overload
 
 if TYPE_CHECKING:
-    import re
+    from jsonpath_ng import JSONPath
 
 try:
     import orjson as json
@@ -33,16 +43,21 @@ __all__ = [
     "DotTree",
     "DotTrees",
     "DottedToNested",
+    "KeyPath",
+    "LayeredDotTree",
+    "LeafChange",
     "LeafConflictError",
     "LeafIntersectionError",
     "LeavesInCommonError",
     "NestedToDotted",
+    "QueryStep",
     "Toml",
     "TomlArray",
     "TomlBranch",
     "TomlLeaf",
     "TomlLimb",
     "TomlPrimitive",
+    "compile_query",
 ]
 
 
@@ -67,6 +82,22 @@ class DuplicateKeyError(Exception):
         return f"Key '{self.key}' was defined more than once."
 
 
+def _clash(values: list[TomlLeaf]) -> bool:
+    """Returns whether `values` are not all equal (without hashing them, since lists can't be)."""
+    return any(v != values[0] for v in values[1:])
+
+
+def _same(a: object, b: object) -> bool:
+    """Returns whether `a == b` and their types (and those of any elements) match."""
+    if type(a) is not type(b):
+        return False
+    if isinstance(a, list):
+        return len(a) == len(b) and all(_same(x, b[i]) for i, x in enumerate(a))
+    if isinstance(a, dict):
+        return a.keys() == b.keys() and all(_same(v, b[k]) for k, v in a.items())
+    return a == b
+
+
 @dataclass(frozen=True, slots=True)
 class LeavesInCommonError(Exception):
     """Two or more trees have leaves in common."""
@@ -87,14 +118,14 @@ class LeafIntersectionError(LeavesInCommonError):
     def __post_init__(self) -> None:
         msg = "??"
         if j := self.intersection:
-            n_intersect = str(len(j)) + " leaves are" if len(j) > 1 else " leaf is"
+            n_intersect = f"{len(j)} leaves are" if len(j) > 1 else "1 leaf is"
             intersect = "{ " + ", ".join(j.keys()) + " }"
             msg = f"{n_intersect} present in multiple trees: {intersect}."
-            if conflicts := {k: v for k, v in j.items() if len(set(v)) > 1}:
+            if conflicts := {k: v for k, v in j.items() if _clash(v)}:
                 conflict_str = ", ".join(
                     f"{k}: {'/'.join(str(z) for z in v)}" for k, v in conflicts.items()
                 )
-                n_conflict = str(len(conflicts)) + ("have" if len(conflicts) > 1 else "has")
+                n_conflict = f"{len(conflicts)} " + ("have" if len(conflicts) > 1 else "has")
                 msg += f" {n_conflict} conflicting values: {conflict_str}."
         object.__setattr__(self, "msg", msg)
 
@@ -117,12 +148,12 @@ class LeafConflictError(LeavesInCommonError):
     def __post_init__(self) -> None:
         msg = "??"
         if self.intersection:
-            clashes = {k: v for k, v in self.intersection.items() if len(set(v)) > 1}
+            clashes = {k: v for k, v in self.intersection.items() if _clash(v)}
             n_clash = str(len(clashes)) + (" leaves are" if len(clashes) > 1 else " leaf is")
             clash_list = ", ".join(
                 f"{k}: {'/'.join(str(z) for z in v)}" for k, v in clashes.items()
             )
-            msg = f"{n_clash} are present with clashing values in multiple trees: {clash_list}"
+            msg = f"{n_clash} present with clashing values in multiple trees: {clash_list}"
         object.__setattr__(self, "msg", msg)
 
     def __str__(self) -> str:
@@ -134,7 +165,12 @@ class DotDictChecker:
     """Utilities to check [DotDict][]-related claims.
 
     Use [check][] to verify that a value is a valid [Branch][], [Array][], or [Primitive][].
-    Use [check_keys][] to
+    Use [check_keys][] or [check_values][] to check only the keys or only the values.
+
+    The checks walk the tree once, iteratively (so depth is not limited by recursion),
+    and raise for the first offence in document order, naming its path; e.g. `tool.x[2].y`.
+    Keys must be strings everywhere; the `.` ban and [key_pattern][] apply to keys
+    that are reachable with `.`-delimited keys (i.e. not to keys of tables inside arrays).
 
     Attributes:
         key_pattern: A global regex pattern that key names must match.
@@ -152,19 +188,15 @@ class DotDictChecker:
     def check(self, node: TomlPrimitive, /) -> TomlPrimitive: ...
 
     def check(self, node: Toml, /) -> Toml:
-        """Verifies that `node` is valid.
-
-         Calls [check_keys][] and [check_values][] if `node` is a branch or array.
-         Calls [check_primitive][] otherwise.
+        """Verifies that `node` is valid, checking its keys and values in a single pass.
 
         Raises:
             TypeError: If a key is not `str` or a value is not [Toml][].
             ValueError: If a key contains the substring `.`.
-            KeyDoesNotMatchRegexError: If a key does not match [key_pattern][].
+            KeyRegexError: If a key does not match [key_pattern][].
         """
         if isinstance(node, dict | list):
-            self.check_keys(node)
-            self.check_values(node)
+            self._check(node, keys=True, values=True)
         else:
             self.check_primitive(node)
         return node
@@ -176,30 +208,14 @@ class DotDictChecker:
     def check_keys(self, node: TomlArray, /) -> TomlArray: ...
 
     def check_keys(self, node: TomlBranch | TomlArray, /) -> TomlBranch | TomlArray:
-        """Validates the keys in `node` and (if `node` is a `Branch`) its sub-dicts recursively.
+        """Validates the keys in `node` and its sub-dicts.
 
         Raises:
             TypeError: If a key is not an `str`.
             ValueError: If a key contains the '.'.
-            KeyDoesNotMatchRegexError: If a key does not match [key_pattern][].
-        """
-        if isinstance(node, list):
-            for v in node:
-                if isinstance(v, list | dict):
-                    self.check_keys(v)
-        elif isinstance(node, dict):
-            if bad := [k for k in node if not isinstance(k, str)]:
-                # noinspection PyUnboundLocalVariable
-                msg = f"Key(s) {bad} are not strings."
-                raise TypeError(msg)
-            if bad := [k for k in node if "." in k]:
-                msg = f"Key(s) {bad} contain '.'."
-                raise ValueError(msg)
-            for v in node.values():
-                if isinstance(v, dict):
-                    self.check_keys(v)
-            if self.key_pattern and (bad := [k for k in node if not self.key_pattern.fullmatch(k)]):
-                raise KeyRegexError(bad, self.key_pattern.pattern)
+            KeyRegexError: If a key does not match [key_pattern][].
+        """
+        self._check(node, keys=True, values=False)
         return node
 
     @overload
@@ -209,29 +225,56 @@ class DotDictChecker:
     def check_values(self, node: TomlArray, /) -> TomlArray: ...
 
     def check_values(self, node: TomlBranch | TomlArray, /) -> TomlBranch | TomlArray:
-        """Recursively, verifies that values have valid types."""
-        if isinstance(node, list):
-            for v in node:
-                if isinstance(v, list | dict):
-                    self.check_values(v)
-                else:
-                    self.check_primitive(v)
-        elif isinstance(node, dict):
-            if bad := {
-                k: type(v)
-                for k, v in node.items()
-                if not isinstance(v, dict | list) and not self.is_primitive(v)
-            }:
-                # noinspection PyUnboundLocalVariable
-                msg = (
-                    f"Key(s) {list(bad.keys())} have invalid values of type(s) {set(bad.values())}"
-                )
-                raise TypeError(msg)
-            for v in node.values():
-                if isinstance(v, dict | list):
-                    self.check_values(v)
+        """Verifies that values in `node` and its sub-dicts and sub-lists have valid types.
+
+        Raises:
+            TypeError: If a value is not [Toml][].
+        """
+        self._check(node, keys=False, values=True)
         return node
 
+    def _check(self, root: TomlBranch | TomlArray, /, *, keys: bool, values: bool) -> None:
+        # Frames are (path, is a dict, has dotted-reachable keys, iterator over the children).
+        stack: list[tuple[str, bool, bool, Iterator[tuple[object, Toml]]]] = [
+            ("", True, True, iter(root.items()))
+            if isinstance(root, dict)
+            else ("", False, True, enumerate(root))
+        ]
+        while stack:
+            prefix, is_dict, reachable, children = stack[-1]
+            for key, value in children:
+                if not is_dict:
+                    path = f"{prefix}[{key}]"
+                elif keys:
+                    path = self._check_key(prefix, key, reachable=reachable)
+                else:
+                    path = f"{prefix}.{key}" if prefix else str(key)
+                if isinstance(value, dict):
+                    stack.append((path, True, reachable, iter(value.items())))
+                    break
+                if isinstance(value, list):
+                    # A table in an array can't be reached with `.`-delimited keys.
+                    stack.append((path, False, reachable and not is_dict, enumerate(value)))
+                    break
+                if values and not self.is_primitive(value):
+                    msg = f"Value at '{path}' has invalid type {type(value)}."
+                    raise TypeError(msg)
+            else:
+                stack.pop()
+
+    def _check_key(self, prefix: str, key: object, *, reachable: bool) -> str:
+        """Checks a key of a dict at `prefix`, returning its path."""
+        if not isinstance(key, str):
+            msg = f"Key '{prefix}<<{key!r}>>' is a {type(key)}, not a string."
+            raise TypeError(msg)
+        path = f"{prefix}.{key}" if prefix else key
+        if reachable and "." in key:
+            msg = f"Key '{prefix}<<{key}>>' contains '.'."
+            raise ValueError(msg)
+        if reachable and self.key_pattern and not self.key_pattern.fullmatch(key):
+            raise KeyRegexError([path], self.key_pattern.pattern)
+        return path
+
     def check_primitive(self, value: TomlPrimitive, /) -> TomlPrimitive:
         if not self.is_primitive(value):
             msg = f"Invalid type {type(value)}"
@@ -242,6 +285,14 @@ class DotDictChecker:
         return isinstance(value, str | int | float | bool | date | datetime | time)
 
 
+def _common_prefix_length(a: list[str], b: list[str]) -> int:
+    n = min(len(a), len(b))
+    for i in range(n):
+        if a[i] != b[i]:
+            return i
+    return n
+
+
 @dataclass(frozen=True, slots=True, kw_only=True)
 class DottedToNested(Callable[[TomlBranch], TomlBranch]):
     """Callable that converts a [Branch][] with dotted keys to a nested `Branch`.
@@ -252,6 +303,9 @@ class DottedToNested(Callable[[TomlBranch], TomlBranch]):
     `NestedToDotted(DottedToNested(x)) == x` **iff**
     `merge_lists == False` **and** `{not isinstance(v, dict) for v in x.values()}`.
 
+    Each dotted key of a leaf is split only once, and runs of keys with a common prefix
+    share the lookups of that prefix's branches.
+
     Attributes:
         merge_lists: Concatenate duplicate lists instead of erroring, when nesting.
 
@@ -268,10 +322,36 @@ class DottedToNested(Callable[[TomlBranch], TomlBranch]):
 
     def __call__(self, items: TomlBranch, /) -> TomlBranch:
         out: TomlBranch = {}
-        for k, v in items.items():
-            self._nest(out, k, v)
+        # Each leaf's key is split once, and the branches along the previous key are kept,
+        # since consecutive keys usually share a prefix (e.g. from `DotTree.leaves`).
+        path: list[str] = []
+        nodes: list[TomlBranch] = [out]
+        for key, item in items.items():
+            if isinstance(item, dict) or isinstance(item, list) and self.merge_lists:
+                self._nest(out, key, item)  # Only adds to existing branches, so `nodes` is valid.
+                continue
+            heads = key.split(".")
+            last = heads.pop()
+            if heads != path:
+                self._descend(path, nodes, heads)
+            node = nodes[-1]
+            if node.get(last) is not None:
+                raise DuplicateKeyError(last)
+            node[last] = item
         return out
 
+    def _descend(self, path: list[str], nodes: list[TomlBranch], heads: list[str]) -> None:
+        """Moves `path` (and its branches, `nodes`) to `heads`, creating branches as needed."""
+        depth = _common_prefix_length(path, heads)
+        del path[depth:], nodes[depth + 1 :]
+        node = nodes[-1]
+        for head in heads[depth:]:
+            node = node.setdefault(head, {})
+            if not isinstance(node, dict):
+                raise DuplicateKeyError(head)
+            path.append(head)
+            nodes.append(node)
+
     def _nest(self, dst: TomlBranch, key: str, item: Toml) -> None:
         self._nest_check(dst, key, item)
         if "." in key:
@@ -351,6 +431,152 @@ class NestedToDotted(Callable[[TomlBranch], TomlBranch]):
 _CHECKER = DotDictChecker()
 
 
+class QueryStep(NamedTuple):
+    """One step of a compiled [DotTree.query][] path.
+
+    - `"key"`: The value under key `arg` of a dict.
+    - `"index"`: Element `arg` (possibly negative) of a list.
+    - `"values"` (`.*`): Every value of a dict.
+    - `"elements"` (`[*]`): Every element of a list, or the value itself if it is not a list.
+    """
+
+    kind: Literal["key", "index", "values", "elements"]
+    arg: str | int | None = None
+
+
+# One path step: `.key`, `."quoted key"`, `.'quoted key'`, `['key']`, `[3]`, `[*]`, or `.*`.
+_QUERY_STEP_RE: Final = re.compile(
+    r"""
+    \.?(?P<key>[A-Za-z_][A-Za-z0-9_-]*+)
+    | \.?"(?P<dq>[^"]*+)"
+    | \.?'(?P<sq>[^']*+)'
+    | \[(?:"(?P<bdq>[^"]*+)"|'(?P<bsq>[^']*+)')]
+    | \[(?P<index>-?[0-9]++)]
+    | (?P<elements>\[\*])
+    | (?P<values>\.\*)
+    """,
+    re.VERBOSE,
+)
+
+
+class LeafChange(NamedTuple):
+    """A leaf that differs between two trees, from [DotTrees.diff][].
+
+    `old` is `None` for `"added"` leaves, and `new` is `None` for `"removed"` leaves.
+    """
+
+    kind: Literal["added", "removed", "changed"]
+    key: str
+    old: TomlLeaf | None = None
+    new: TomlLeaf | None = None
+
+
+_MISSING: Final = object()
+
+
+@lru_cache(maxsize=1024)
+def compile_query(path: str, /) -> tuple[QueryStep, ...] | None:
+    """Compiles the JSONPath subset that [DotTree.query][] evaluates natively.
+
+    Returns `None` if `path` uses anything else (e.g. filters, slices, or `..`).
+    """
+    pos = 1 if path.startswith("$") else 0
+    steps: list[QueryStep] = []
+    while pos < len(path):
+        m = _QUERY_STEP_RE.match(path, pos)
+        # A leading unquoted key needs no `.`, but subsequent keys do.
+        if not m or pos > 0 and m.group("key") is not None and path[pos] != ".":
+            return None
+        pos = m.end()
+        match m.lastgroup:
+            case "key" | "dq" | "sq" | "bdq" | "bsq" as group:
+                steps.append(QueryStep("key", m.group(group)))
+            case "index":
+                steps.append(QueryStep("index", int(m.group("index"))))
+            case kind:
+                steps.append(QueryStep(kind))
+    return tuple(steps)
+
+
+@lru_cache(maxsize=256)
+def _compile_jsonpath(path: str, /) -> JSONPath:
+    # jsonpath_ng is slow to import and parse, so only use it for paths that need it.
+    from jsonpath_ng.ext import parse  # noqa: PLC0415
+
+    return parse(path)
+
+
+@dataclass(frozen=True, slots=True)
+class KeyPath:
+    """A `.`-delimited key, split once.
+
+    Get instances with [of][], which caches them by string,
+    so that repeated lookups of the same key do no string work.
+    Every [DotTree][] method that takes `keys` accepts a `KeyPath` or a `str`.
+
+    Examples:
+        >>> path = KeyPath.of("tool.tyranno.targets")
+        >>> path.parts
+        ('tool', 'tyranno', 'targets')
+        >>> path is KeyPath.of("tool.tyranno.targets")
+        True
+    """
+
+    dotted: str
+    parts: tuple[str, ...]
+
+    @classmethod
+    def of(cls, keys: str | KeyPath, /) -> KeyPath:
+        return keys if isinstance(keys, KeyPath) else _key_path(keys)
+
+    def __str__(self) -> str:
+        return self.dotted
+
+
+@lru_cache(maxsize=4096)
+def _key_path(keys: str, /) -> KeyPath:
+    return KeyPath(keys, tuple(keys.split(".")))
+
+
+def _iter_entries(raw: TomlBranch, /) -> Generator[tuple[str, str, Toml]]:
+    """Yields `(prefix, key, value)` for every branch and leaf, depth-first in document order.
+
+    `prefix` is the dotted key of the parent plus `"."`, or `""` at the root.
+    """
+    # A stack of iterators keeps document order without recursion or intermediate dicts.
+    stack = [("", iter(raw.items()))]
+    while stack:
+        prefix, items = stack[-1]
+        for key, value in items:
+            yield prefix, key, value
+            if isinstance(value, dict):
+                stack.append((prefix + key + ".", iter(value.items())))
+                break
+        else:
+            stack.pop()
+
+
+class _LeafIndex(NamedTuple):
+    """The flat index behind [DotTree.indexed][]."""
+
+    leaves: dict[str, TomlLeaf]
+    branches: frozenset[str]
+    limbs: dict[str, dict[str, TomlLeaf]]
+
+    @classmethod
+    def of(cls, raw: TomlBranch, /) -> _LeafIndex:
+        leaves: dict[str, TomlLeaf] = {}
+        branches: set[str] = set()
+        limbs: defaultdict[str, dict[str, TomlLeaf]] = defaultdict(dict)
+        for prefix, key, value in _iter_entries(raw):
+            if isinstance(value, dict):
+                branches.add(prefix + key)
+            else:
+                leaves[prefix + key] = value
+                limbs[prefix[:-1]][key] = value
+        return cls(leaves, frozenset(branches), dict(limbs))
+
+
 class DotTree(Mapping[str, Toml]):
     """A dict with TOML data types and methods to access nested values via e.g. `pet.name`.
 
@@ -371,6 +597,11 @@ class DotTree(Mapping[str, Toml]):
     General access:
         - `access`: Returns a value, or raises a `KeyError`.
         - `get`: Returns a value, or `None`/default.
+        - `has`: Checks whether a `.`-delimited key exists.
+        - `query`: Returns all values matching a JSONPath; e.g. `project.authors[*].name`.
+
+    Methods that take `keys` also accept a [KeyPath][], which is split only once.
+    For a tree that is read many times, [indexed][] serves lookups from a flat index of its leaves.
 
     Subtree access:
         - `access_subtree`: Returns an inner tree; e.g. `tree.access_subtree("owner.friends")`.
@@ -394,6 +625,7 @@ class DotTree(Mapping[str, Toml]):
             e.g. `{"info.pet": {"genus": "Felis", "species": "catus"}}`.
         - `leaves`: Returns a `dict[str, TomlLeaf]`;
             e.g. `{"info.pet.genus": "Felis", "info.pet.species": "catus"}`.
+        - `iter_leaves`: Yields the same `(dotted-key, leaf)` pairs without building a dict.
 
     Other methods:
         - `normalize`: Drops empty branches.
@@ -404,12 +636,19 @@ class DotTree(Mapping[str, Toml]):
     def __iter__(self) -> Iterator[str]:
         return iter(self._raw)
 
-    def __init__(self, /, x: TomlBranch) -> None:
-        """Constructs a tree from a nested dict (about the same as `dict(x)`)."""
+    def __init__(self, /, x: TomlBranch, *, indexed: bool = False) -> None:
+        """Constructs a tree from a nested dict (about the same as `dict(x)`).
+
+        Arguments:
+            x: The nested dict, which is not copied.
+            indexed: Serve lookups from a flat index (see [indexed][]).
+        """
         if not isinstance(x, dict):
             msg = f"Not a dict; actually {type(x)} (value: '{x}')"
             raise TypeError(msg)
         self._raw = x
+        self._indexed = indexed
+        self._index: _LeafIndex | None = None
 
     def __getitem__(self, key: str, /) -> Toml:
         return self._raw[key]
@@ -459,6 +698,18 @@ class DotTree(Mapping[str, Toml]):
         """
         return cls(DottedToNested()(x))
 
+    def indexed(self) -> Self:
+        """Returns this tree with lookups served from a flat `dotted-key -> value` index.
+
+        The index is built on first use and then serves [leaves][], [limbs][], [get][], [has][],
+        and the other methods that take `keys`, without traversing the tree.
+        Subtrees returned by [access_subtree][] and [get_subtree][] are not indexed.
+
+        Warning:
+            The index is a snapshot; it does not see changes to the underlying dict.
+        """
+        return self if self._indexed else self.__class__(self._raw, indexed=True)
+
     def transform_leaves(self, fn: Callable[[str, TomlLeaf], TomlLeaf | None], /) -> Self:
         """Applies a function to each leaf, returning a new tree.
 
@@ -473,7 +724,7 @@ class DotTree(Mapping[str, Toml]):
             Empty branches (`{}`) after the transformation are dropped.
             `dot_dict.transform_leaves(lambda v: v)` is equivalent to [normalize][].
         """
-        x = {k: fn(k, v) for k, v in self.leaves()}
+        x = {k: fn(k, v) for k, v in self.iter_leaves()}
         return self.__class__.from_dotted({k: v for k, v in x.items() if v is not None})
 
     def normalize(self) -> Self:
@@ -481,12 +732,9 @@ class DotTree(Mapping[str, Toml]):
         return self.__class__.from_dotted(self.leaves())
 
     def walk(self) -> Generator[Toml]:
-        """Iterates over the branches and leaves, depth-first."""
-        for value in self.values():
-            if isinstance(value, dict):
-                yield from self.__class__(value).walk()
-            else:
-                yield value
+        """Iterates over the leaf values, depth-first in document order."""
+        for _, value in self.iter_leaves():
+            yield value
 
     def limbs(self) -> dict[str, TomlLimb]:
         """Maps each bottom-level branch to a dict of its leaves.
@@ -496,10 +744,12 @@ class DotTree(Mapping[str, Toml]):
         Returns:
             `dotted-keys:str -> (single-key:str -> value)`
         """
-        dicts = defaultdict(dict)
-        for k, v in self.leaves().items():
-            k0, _, k1 = str(k).rpartition(".")
-            dicts[k0][k1] = v
+        if self._indexed:
+            return {k: dict(v) for k, v in self._leaf_index().limbs.items()}
+        dicts: defaultdict[str, TomlLimb] = defaultdict(dict)
+        for prefix, key, value in _iter_entries(self._raw):
+            if not isinstance(value, dict):
+                dicts[prefix[:-1]][key] = value
         return dicts
 
     def leaves(self) -> TomlLimb:
@@ -510,15 +760,26 @@ class DotTree(Mapping[str, Toml]):
         Warning:
             A `DotTree` can contain empty branches (`{}`), which this method ignores.
         """
-        dct: TomlLimb = {}
-        for key, value in self.items():
-            if isinstance(value, dict):
-                dct.update({key + "." + k: v for k, v in self.__class__(value).leaves().items()})
-            else:
-                dct[key] = value
-        return dct
+        if self._indexed:
+            return dict(self._leaf_index().leaves)
+        return dict(self.iter_leaves())
+
+    def iter_leaves(self) -> Generator[tuple[str, TomlLeaf]]:
+        """Yields `(dotted-key, leaf)` once per leaf, depth-first in document order.
 
-    def access_subtree(self, keys: str, /) -> Self:
+        Unlike [leaves][], this builds no intermediate dicts.
+
+        Warning:
+            A `DotTree` can contain empty branches (`{}`), which this method ignores.
+        """
+        if self._indexed:
+            yield from self._leaf_index().leaves.items()
+            return
+        for prefix, key, value in _iter_entries(self._raw):
+            if not isinstance(value, dict):
+                yield prefix + key, value
+
+    def access_subtree(self, keys: str | KeyPath, /) -> Self:
         """Returns the subtree under the `.`-delimited key string, `keys`.
 
         Raises:
@@ -527,7 +788,7 @@ class DotTree(Mapping[str, Toml]):
         """
         return self.__class__(self._access(keys))
 
-    def get_subtree(self, keys: str, /, default: TomlBranch | None = None) -> Self:
+    def get_subtree(self, keys: str | KeyPath, /, default: TomlBranch | None = None) -> Self:
         """Returns the subtree under the `.`-delimited key string, `keys`.
 
         If `keys` is not found, returns `default`; returns `{}` if `default=None`.
@@ -543,16 +804,16 @@ class DotTree(Mapping[str, Toml]):
 
     @overload
     def get_primitive_as[T: TomlPrimitive](
-        self, keys: str, /, as_type: type[T], default: T
+        self, keys: str | KeyPath, /, as_type: type[T], default: T
     ) -> T: ...
 
     @overload
     def get_primitive_as[T: TomlPrimitive](
-        self, keys: str, /, as_type: type[T], default: None
+        self, keys: str | KeyPath, /, as_type: type[T], default: None
     ) -> T | None: ...
 
     def get_primitive_as[T: TomlPrimitive](
-        self, keys: str, /, as_type: type[T], default: T | None = None
+        self, keys: str | KeyPath, /, as_type: type[T], default: T | None = None
     ) -> T | None:
         """Returns a primitive value after checking its type, or `default` if not found.
 
@@ -568,7 +829,7 @@ class DotTree(Mapping[str, Toml]):
             raise TypeError(msg)
         return x
 
-    def access_primitive_as[T: TomlPrimitive](self, keys: str, /, as_type: type[T]) -> T:
+    def access_primitive_as[T: TomlPrimitive](self, keys: str | KeyPath, /, as_type: type[T]) -> T:
         """Returns a value after checking its type, or raises a `KeyError` if not found.
 
         Raises:
@@ -581,7 +842,7 @@ class DotTree(Mapping[str, Toml]):
             raise TypeError(msg)
         return x
 
-    def get_list(self, keys: str, /, default: TomlArray | None = None) -> TomlArray:
+    def get_list(self, keys: str | KeyPath, /, default: TomlArray | None = None) -> TomlArray:
         """Returns a list, or `default` if not found.
 
         `default=None` is equivalent to `default=[]`.
@@ -599,7 +860,7 @@ class DotTree(Mapping[str, Toml]):
         return v
 
     def get_list_as[T: Toml](
-        self, keys: str, /, as_type: type[T], default: list[T] | None = None
+        self, keys: str | KeyPath, /, as_type: type[T], default: list[T] | None = None
     ) -> list[T]:
         """Returns a list, or `default` if not found, checking the types of the list elements.
 
@@ -620,7 +881,7 @@ class DotTree(Mapping[str, Toml]):
             raise TypeError(msg)
         return x
 
-    def access_list_as[T: Toml](self, keys: str, /, as_type: type[T]) -> list[T]:
+    def access_list_as[T: Toml](self, keys: str | KeyPath, /, as_type: type[T]) -> list[T]:
         """Returns a list after checking the types of its elements, or raises a `KeyError`.
 
         Raises:
@@ -637,12 +898,16 @@ class DotTree(Mapping[str, Toml]):
         return x
 
     @overload
-    def get_primitive[T: TomlPrimitive](self, keys: str, /, default: T) -> T: ...
+    def get_primitive[T: TomlPrimitive](self, keys: str | KeyPath, /, default: T) -> T: ...
 
     @overload
-    def get_primitive[T: TomlPrimitive](self, keys: str, /, default: T | None) -> T | None: ...
+    def get_primitive[T: TomlPrimitive](
+        self, keys: str | KeyPath, /, default: T | None
+    ) -> T | None: ...
 
-    def get_primitive[T: TomlPrimitive](self, keys: str, /, default: T | None = None) -> T | None:
+    def get_primitive[T: TomlPrimitive](
+        self, keys: str | KeyPath, /, default: T | None = None
+    ) -> T | None:
         """Returns a primitive value, or `default` if not found.
 
         Raises:
@@ -654,7 +919,7 @@ class DotTree(Mapping[str, Toml]):
             return default
         return _CHECKER.check_primitive(v)
 
-    def access_primitive(self, keys: str) -> TomlPrimitive:
+    def access_primitive(self, keys: str | KeyPath) -> TomlPrimitive:
         """Returns a primitive value, or raises a `KeyError`.
 
         Raises:
@@ -664,19 +929,31 @@ class DotTree(Mapping[str, Toml]):
         return _CHECKER.check_primitive(self._access(keys))
 
     @overload
-    def get(self, keys: str, default: Toml = None) -> Toml: ...
+    def get(self, keys: str | KeyPath, default: Toml = None) -> Toml: ...
 
     @overload
-    def get(self, keys: str, default: Toml | None = None) -> Toml | None: ...
+    def get(self, keys: str | KeyPath, default: Toml | None = None) -> Toml | None: ...
 
-    def get(self, keys: str, default: Toml | None = None) -> Toml | None:
+    def get(self, keys: str | KeyPath, default: Toml | None = None) -> Toml | None:
         """Returns a value from the `.`-delimited `keys`, falling back to `default`."""
         try:
             return self._access(keys)
         except KeyError:
             return default
 
-    def access(self, keys: str) -> Toml:
+    def has(self, keys: str | KeyPath) -> bool:
+        """Returns whether the `.`-delimited `keys` points to a leaf or branch."""
+        if self._indexed:
+            dotted = KeyPath.of(keys).dotted
+            index = self._leaf_index()
+            return dotted in index.leaves or dotted in index.branches
+        try:
+            self._access(keys)
+        except KeyError, TypeError:
+            return False
+        return True
+
+    def access(self, keys: str | KeyPath) -> Toml:
         """Returns a value from the `.`-delimited `keys`, or raises a `KeyError`.
 
         Raises:
@@ -684,22 +961,90 @@ class DotTree(Mapping[str, Toml]):
         """
         return self._access(keys)
 
-    def _access(self, keys: str) -> Toml:
+    def query(self, path: str, /) -> list[Toml]:
+        """Returns the values matching a JSONPath, in document order.
+
+        Dotted keys, quoted keys (`."a b"`, `['a b']`), indices (`[0]`, `[-1]`),
+        and wildcards (`[*]`, `.*`) are compiled once (see [compile_query][])
+        and evaluated with plain dict and list indexing.
+        Any other path is delegated to `jsonpath_ng`.
+        Unlike `jsonpath_ng`, indices never select characters of strings.
+
+        Examples:
+            >>> tree = DotTree({"authors": [{"name": "Kerri"}, {"name": "Henry"}]})
+            >>> tree.query("$.authors[*].name")
+            ['Kerri', 'Henry']
+            >>> tree.query("authors[-1]")
+            [{'name': 'Henry'}]
+        """
+        steps = compile_query(path)
+        if steps is None:
+            # The raw dict, since `jsonpath_ng`'s recursive descent (`..`) skips other mappings.
+            return [m.value for m in _compile_jsonpath(path).find(self._raw)]
+        nodes: list[Toml] = [self._raw]
+        for step in steps:
+            nodes = self._query_step(step, nodes)
+        return nodes
+
+    @staticmethod
+    def _query_step(step: QueryStep, nodes: list[Toml]) -> list[Toml]:
+        kind, arg = step
+        found: list[Toml] = []
+        for node in nodes:
+            if kind == "key":
+                if isinstance(node, dict) and arg in node:
+                    found.append(node[arg])
+            elif kind == "index":
+                if isinstance(node, list) and -len(node) <= arg < len(node):
+                    found.append(node[arg])
+            elif kind == "values":
+                if isinstance(node, dict):
+                    found += node.values()
+            elif isinstance(node, list):
+                found += node
+            else:
+                found.append(node)
+        return found
+
+    def _access(self, keys: str | KeyPath) -> Toml:
+        path = KeyPath.of(keys)
+        if self._indexed:
+            index = self._leaf_index()
+            if path.dotted in index.leaves:
+                return index.leaves[path.dotted]
+            if path.dotted not in index.branches:
+                self._access_failed(path)
         x: Toml = self._raw
-        split = keys.split(".")
+        # Lists and primitives can't be indexed by `str`, so only dicts get past `x[k]`.
+        try:
+            for k in path.parts:
+                x = x[k]  # ty:ignore[invalid-argument-type, not-subscriptable]
+        except KeyError, TypeError:
+            self._access_failed(path)
+        return x
+
+    def _leaf_index(self) -> _LeafIndex:
+        # Concurrent first calls may each build an index; either one is correct.
+        if (index := self._index) is None:
+            index = self._index = _LeafIndex.of(self._raw)
+        return index
+
+    def _access_failed(self, path: KeyPath) -> NoReturn:
+        """Raises the `KeyError` or `TypeError` for a failed [_access][]."""
+        x: Toml = self._raw
+        split = path.parts
         for i, k in enumerate(split):
+            rest = "".join("." + r for r in split[i + 1 :])
+            where = f"{'.'.join(split[:i])}<<{k}>>{rest}"
             if not isinstance(x, dict):
-                msg = (
-                    f"Value at key '{'.'.join(split[:i])}<<{k}>>{keys[i + 1 :]}'"
-                    f" is a {type(x)}, not an object."
-                )
+                msg = f"Value at key '{where}' is a {type(x)}, not an object."
                 raise TypeError(msg)
-            try:
-                x = x[k]
-            except KeyError:
-                msg = f"No such key '{'.'.join(split[:i])}<<{k}>>{keys[i + 1 :]}'."
-                raise KeyError(msg) from None
-        return x
+            if k not in x:
+                msg = f"No such key '{where}'."
+                raise KeyError(msg)
+            x = x[k]
+        msg = f"No such key '{path}'."
+        raise KeyError(msg)
 
     def __rich_repr__(self) -> str:
         """Pretty-prints for [Rich](https://github.com/Textualize/rich) via [print][]."""
@@ -725,6 +1070,9 @@ class DotTrees:
 
         Empty branches are removed, and arrays are **not** merged.
 
+        The trees are walked together, one level at a time, and the result is built directly;
+        leaves are compared only where two or more trees share a key.
+
         Args:
             trees: Trees to merge.
             replace: How to handle overlapping keys:
@@ -734,23 +1082,131 @@ class DotTrees:
 
         Raises:
             LeafConflictError:
-              If `replace` is `same_value` and ≥ 1 key is in ≥ 2 trees with ≥ 2 unique values.
+              If `replace` is `if_values_match` and ≥ 1 key is in ≥ 2 trees with ≥ 2 unique values.
             LeafIntersectionError:
               If `replace` is `never`, and ≥ 1 key is in ≥ 2 trees (ignoring their values).
+            DuplicateKeyError: If a key is a leaf in one tree and a non-empty branch in another.
         """
-        limbs = [tree.leaves() for tree in trees]
-        if replace == "never" and (intersect := cls.leaf_intersection(*limbs)):
-            raise LeafIntersectionError(intersect)
-        if (
-            replace == "same_value"
-            and (intersect := cls.leaf_intersection(*limbs))
-            and any(len(set(v)) > 1 for v in intersect.values())
-        ):
-            raise LeafConflictError(intersect)
-        merged: dict[str, TomlLeaf] = {}
-        for limb in limbs:
-            merged.update(limb)
-        return DotTree.from_dotted(merged)
+        return DotTree(cls._merged(trees, "", replace))
+
+    @classmethod
+    def _merged(
+        cls, branches: Sequence[Mapping[str, Toml]], prefix: str, replace: str
+    ) -> TomlBranch:
+        """Merges `branches` (rightmost wins) under the dotted `prefix`, enforcing `replace`."""
+        shared: dict[str, list[TomlLeaf]] = {}
+        merged = cls._merge_branches(branches, prefix, replace, shared)
+        if shared and replace == "never":
+            raise LeafIntersectionError(shared)
+        if shared and replace == "if_values_match":
+            raise LeafConflictError(shared)
+        return merged
+
+    @classmethod
+    def _merge_branches(
+        cls,
+        branches: Sequence[Mapping[str, Toml]],
+        prefix: str,
+        replace: str,
+        shared: dict[str, list[TomlLeaf]],
+    ) -> TomlBranch:
+        """Merges `branches` into a new branch, recording in `shared` the leaves `replace` forbids."""
+        out: TomlBranch = {}
+        for key, values in cls._group_by_key(branches).items():
+            if len(values) == 1 and not isinstance(values[0], dict):
+                out[key] = values[0]
+                continue
+            dotted = prefix + key
+            subs = [v for v in values if isinstance(v, dict)]
+            leaves = [v for v in values if not isinstance(v, dict)]
+            sub = cls._merge_branches(subs, dotted + ".", replace, shared) if subs else {}
+            if sub and leaves:
+                raise DuplicateKeyError(dotted)
+            if sub:
+                out[key] = sub
+            elif leaves:
+                out[key] = leaves[-1]
+                # With "never", sharing a key is itself a clash.
+                clash = len(leaves) > 1 if replace == "never" else _clash(leaves)
+                if clash and replace != "always":
+                    shared[dotted] = leaves
+        return out
+
+    @staticmethod
+    def _group_by_key(branches: Sequence[Mapping[str, Toml]]) -> dict[str, list[Toml]]:
+        """Maps each key in any of `branches` to its values, in order."""
+        grouped: dict[str, list[Toml]] = {}
+        for branch in branches:
+            for key, value in branch.items():
+                if (values := grouped.get(key)) is None:
+                    grouped[key] = [value]
+                else:
+                    values.append(value)
+        return grouped
+
+    @classmethod
+    def diff(cls, a: Mapping[str, Toml], b: Mapping[str, Toml], /) -> Generator[LeafChange]:
+        """Yields the leaves that were added, removed, or changed from `a` to `b`.
+
+        Both trees are walked together, depth-first in document order, and subtrees that are
+        the same object are skipped without visiting their leaves.
+        Keys only in `b` follow the keys of `a` at each level.
+        Leaves of different types (e.g. `1` and `True`, or `[1]` and `[1.0]`) are changed
+        even if they are `==`.
+        A leaf that becomes a branch (or vice versa) is removed, and the new leaves are added.
+        Empty branches are ignored.
+
+        Examples:
+            >>> old = DotTree({"project": {"name": "x", "version": "1"}})
+            >>> new = DotTree({"project": {"name": "x", "version": "2", "license": "MIT"}})
+            >>> [tuple(c) for c in DotTrees.diff(old, new)]
+            [('changed', 'project.version', '1', '2'), ('added', 'project.license', None, 'MIT')]
+        """
+        stack = [("", cls._diff_pairs(a, b))]
+        while stack:
+            prefix, pairs = stack[-1]
+            for key, old, new in pairs:
+                if old is new:
+                    continue
+                dotted = prefix + key
+                old_is_dict, new_is_dict = isinstance(old, dict), isinstance(new, dict)
+                if old_is_dict and new_is_dict:
+                    # Not skipped if `==`, since that ignores the types of nested leaves.
+                    stack.append((dotted + ".", cls._diff_pairs(old, new)))
+                    break
+                if old_is_dict or new_is_dict or old is _MISSING or new is _MISSING:
+                    yield from cls._diff_replaced(dotted, old, new)
+                elif not _same(old, new):
+                    yield LeafChange("changed", dotted, old, new)
+            else:
+                stack.pop()
+
+    @staticmethod
+    def _diff_pairs(
+        a: Mapping[str, Toml], b: Mapping[str, Toml], /
+    ) -> Generator[tuple[str, object, object]]:
+        """Yields `(key, a[key], b[key])`, with `_MISSING` for absent keys."""
+        for key, old in a.items():
+            yield key, old, b.get(key, _MISSING)
+        for key, new in b.items():
+            if key not in a:
+                yield key, _MISSING, new
+
+    @staticmethod
+    def _diff_replaced(dotted: str, old: object, new: object) -> Generator[LeafChange]:
+        """Yields the removal of `old` and the addition of `new` (either may be a branch)."""
+        if isinstance(old, dict):
+            for prefix, key, value in _iter_entries(old):
+                if not isinstance(value, dict):
+                    yield LeafChange("removed", f"{dotted}.{prefix}{key}", old=value)
+        elif old is not _MISSING:
+            yield LeafChange("removed", dotted, old=old)
+        if isinstance(new, dict):
+            for prefix, key, value in _iter_entries(new):
+                if not isinstance(value, dict):
+                    yield LeafChange("added", f"{dotted}.{prefix}{key}", new=value)
+        elif new is not _MISSING:
+            yield LeafChange("added", dotted, new=new)
 
     @classmethod
     def leaf_intersection(cls, *limbs: TomlLimb) -> dict[str, list[TomlLeaf]]:
@@ -794,3 +1250,186 @@ class DotTrees:
     def to_json(cls, tree: DotTree, /, *, sort: bool = False) -> str:
         """Converts to JSON, raising `ValueError` for `NaN`, `Inf`, and `-Inf` values."""
         return json.dumps(tree, ensure_ascii=False, allow_nan=False, sort_keys=sort)
+
+
+class LayeredDotTree(Mapping[str, Toml]):
+    """A stack of trees that acts like their merge, without building it; like a `ChainMap`.
+
+    The first layer is the top; its leaves replace those of the layers below it.
+    So `LayeredDotTree(*layers)` acts like `DotTrees.merge_leaves(*reversed(layers))`,
+    with the same `replace` policies and errors.
+
+    Lookups ([access][], [get][], [has][]) probe each layer for the key, top-down.
+    Only a branch that is looked up is merged, and only its leaves are checked for conflicts.
+    [get_subtree][] returns another `LayeredDotTree` over the layers' subtrees, merging nothing.
+    [materialize][] merges everything, as `merge_leaves` would.
+
+    Warning:
+        The layers are not copied, so they must not be modified.
+        Conflicts outside the keys that are looked up are not detected.
+
+    Examples:
+        >>> defaults = DotTree({"tool": {"line-length": 88, "target": "py313"}})
+        >>> repo = DotTree({"tool": {"line-length": 100}})
+        >>> stack = LayeredDotTree(repo, defaults)
+        >>> stack.access("tool.line-length"), stack.access("tool.target")
+        (100, 'py313')
+        >>> dict(stack.get_subtree("tool").materialize())
+        {'line-length': 100, 'target': 'py313'}
+    """
+
+    def __init__(
+        self,
+        /,
+        *layers: Mapping[str, Toml],
+        replace: Literal["always", "if_values_match", "never"] = "always",
+    ) -> None:
+        """Stacks `layers`, the first on top.
+
+        Arguments:
+            layers: Trees or nested dicts; other mappings are copied shallowly.
+            replace: How to handle leaves in more than one layer (see [DotTrees.merge_leaves][]).
+        """
+        # Nested values are always dicts, so plain dicts at the top make probing uniform.
+        self._layers: tuple[TomlBranch, ...] = tuple(
+            layer if isinstance(layer, dict) else dict(layer) for layer in layers
+        )
+        self._replace = replace
+
+    @property
+    def layers(self) -> tuple[TomlBranch, ...]:
+        return self._layers
+
+    def __getitem__(self, key: str, /) -> Toml:
+        # A single top-level key, as for `DotTree`; use [access][] for `.`-delimited keys.
+        return self._lookup(KeyPath(key, (key,)))
+
+    def __contains__(self, key: object, /) -> bool:
+        # Probes without merging, so that it agrees with `__iter__` and never raises.
+        return isinstance(key, str) and self.has(KeyPath(key, (key,)))
+
+    def __iter__(self) -> Iterator[str]:
+        # Keys whose branches hold no leaves in any layer are absent from the merge.
+        seen: set[str] = set()
+        for layer in self._layers:
+            for key, value in layer.items():
+                if key not in seen and (not isinstance(value, dict) or _has_leaf(value)):
+                    seen.add(key)
+                    yield key
+
+    def __len__(self) -> int:
+        return sum(1 for _ in self)
+
+    def __repr__(self) -> str:
+        layers = ", ".join(repr(layer) for layer in self._layers)
+        return f"{self.__class__.__name__}({layers}, replace={self._replace!r})"
+
+    def access(self, keys: str | KeyPath) -> Toml:
+        """Returns the merged value at the `.`-delimited `keys`, or raises a `KeyError`.
+
+        A branch is merged into a new `dict`.
+
+        Raises:
+            KeyError: If no layer has a leaf at or under `keys`.
+            DuplicateKeyError: If `keys` or a key above it is a leaf in one layer
+              and a branch in another.
+            LeafConflictError | LeafIntersectionError: As for [DotTrees.merge_leaves][].
+        """
+        return self._lookup(KeyPath.of(keys))
+
+    def get(self, keys: str | KeyPath, default: Toml | None = None) -> Toml | None:
+        """Like [access][], but returns `default` instead of raising a `KeyError`."""
+        try:
+            return self._lookup(KeyPath.of(keys))
+        except KeyError:
+            return default
+
+    def has(self, keys: str | KeyPath) -> bool:
+        """Returns whether any layer has a leaf at or under the `.`-delimited `keys`."""
+        values, _ = self._probe(KeyPath.of(keys))
+        return any(not isinstance(v, dict) or _has_leaf(v) for v in values)
+
+    def access_subtree(self, keys: str | KeyPath, /) -> LayeredDotTree:
+        """Returns a `LayeredDotTree` of the layers' subtrees under `keys`.
+
+        Raises:
+            KeyError: If no layer has `keys`.
+            TypeError: If the value is a leaf.
+            DuplicateKeyError: If `keys` or a key above it is a leaf in one layer
+              and a branch in another.
+        """
+        path = KeyPath.of(keys)
+        values, blocked = self._probe(path)
+        if not values:
+            msg = f"No such key '{path}'."
+            raise KeyError(msg)
+        branches = [v for v in values if isinstance(v, dict)]
+        nonempty = any(_has_leaf(b) for b in branches)
+        if nonempty and (blocked is not None or len(branches) < len(values)):
+            raise DuplicateKeyError(path.dotted if blocked is None else blocked)
+        if len(branches) < len(values):
+            msg = f"Value at key '{path}' is a leaf, not an object."
+            raise TypeError(msg)
+        return self.__class__(*branches, replace=self._replace)
+
+    def get_subtree(
+        self, keys: str | KeyPath, /, default: TomlBranch | None = None
+    ) -> LayeredDotTree:
+        """Like [access_subtree][], but falls back to a single layer, `default` (or `{}`)."""
+        try:
+            return self.access_subtree(keys)
+        except KeyError:
+            return self.__class__({} if default is None else default, replace=self._replace)
+
+    def materialize(self) -> DotTree:
+        """Merges the layers into a new tree.
+
+        Raises:
+            DuplicateKeyError | LeafConflictError | LeafIntersectionError:
+              As for [DotTrees.merge_leaves][].
+        """
+        return DotTree(DotTrees._merged(self._layers[::-1], "", self._replace))  # noqa: SLF001
+
+    def _lookup(self, path: KeyPath) -> Toml:
+        values, blocked = self._probe(path)
+        leaves = [v for v in values if not isinstance(v, dict)]
+        branches = [v for v in values if isinstance(v, dict)]
+        prefix = path.dotted + "."
+        merged = DotTrees._merged(branches[::-1], prefix, self._replace) if branches else {}  # noqa: SLF001
+        if (merged or leaves) and blocked is not None:
+            raise DuplicateKeyError(blocked)
+        if merged and leaves:
+            raise DuplicateKeyError(path.dotted)
+        if merged:
+            return merged
+        if not leaves:
+            msg = f"No such key '{path}'."
+            raise KeyError(msg)
+        if self._replace == "never" and len(leaves) > 1:
+            raise LeafIntersectionError({path.dotted: leaves[::-1]})
+        if self._replace == "if_values_match" and _clash(leaves):
+            raise LeafConflictError({path.dotted: leaves[::-1]})
+        return leaves[0]
+
+    def _probe(self, path: KeyPath) -> tuple[list[Toml], str | None]:
+        """Returns the values at `path` in each layer, top-down.
+
+        Also returns the first key above `path` that is a leaf in some layer, if any.
+        """
+        values: list[Toml] = []
+        blocked: str | None = None
+        for layer in self._layers:
+            x: Toml = layer
+            for i, k in enumerate(path.parts):
+                if not isinstance(x, dict):
+                    blocked = blocked or ".".join(path.parts[:i])
+                    break
+                if (x := x.get(k, _MISSING)) is _MISSING:
+                    break
+            else:
+                values.append(x)
+        return values, blocked
+
+
+def _has_leaf(branch: TomlBranch, /) -> bool:
+    return any(not isinstance(v, dict) for _, _, v in _iter_entries(branch))
@@ -7,57 +7,66 @@
 from __future__ import annotations
 
 from datetime import datetime
-from typing import TYPE_CHECKING, Any, Final
-
-from packaging.specifiers import SpecifierSet
-from packaging.version import Version as Pep440
-from semver import VersionInfo as Semver
+from typing import TYPE_CHECKING, Any, Final, cast
 
 from tyranno_sandbox.functions.licenses import LicenseDict, LicenseFunctions
-from tyranno_sandbox.functions.pep440 import Pep440Dict, Pep440Functions
+from tyranno_sandbox.functions.pep440 import Pep440Dict, Pep440Functions, pep440_index
 from tyranno_sandbox.functions.pypi import PypiFunctions
-from tyranno_sandbox.functions.semver import SemverDict, SemverFunctions
+from tyranno_sandbox.functions.semver import SemverDict, SemverFunctions, semver_index
 from tyranno_sandbox.functions.times import DatetimeFunctions, TimeDict
 from tyranno_sandbox.global_vars import STARTUP
 
 if TYPE_CHECKING:
     from niquests import Session
 
+    from tyranno_sandbox.functions.http_cache import HttpCache
+    from tyranno_sandbox.functions.license_index import LicenseIndex
+
 
 class Functions:
-    def __init__(self, session: Session) -> None:
+    def __init__(
+        self,
+        session: Session,
+        *,
+        cache: HttpCache | None = None,
+        license_index: LicenseIndex | None = None,
+    ) -> None:
         self._f_time = DatetimeFunctions()
-        self._f_license = LicenseFunctions(session)
+        self._f_license = LicenseFunctions(session, license_index)
         self._f_pep440 = Pep440Functions()
-        self._f_pypi = PypiFunctions(session)
+        self._f_pypi = PypiFunctions(session, cache)
         self._f_semver = SemverFunctions()
-        self._now_local: Final = self._f_time.of(STARTUP.local)
-        self._now_utc: Final = self._f_time.of(STARTUP.utc)
+        self._now_local: Final = cast("TimeDict", self._f_time.lazy(STARTUP.local))
+        self._now_utc: Final = cast("TimeDict", self._f_time.lazy(STARTUP.utc))
 
     def semver(self, semver_string: str) -> SemverDict:
         return self._f_semver.of(semver_string)
 
     def semver_ascending(self, versions: list[str]) -> list[str]:
-        sorted_ = sorted(Semver.parse(v) for v in versions)
-        return [str(p) for p in sorted_]
+        return [str(v) for v in semver_index(tuple(versions)).versions]
 
     def semver_descending(self, versions: list[str]) -> list[str]:
-        sorted_ = sorted((Semver.parse(v) for v in versions), reverse=True)
-        return [str(p) for p in sorted_]
+        return [str(v) for v in reversed(semver_index(tuple(versions)).versions)]
 
     def semver_max(self, versions: list[str]) -> str:
-        return str(max(Semver.parse(v) for v in versions))
+        return str(semver_index(tuple(versions)).max())
 
     def semver_min(self, versions: list[str]) -> str:
-        return str(min(Semver.parse(v) for v in versions))
+        return str(semver_index(tuple(versions)).min())
+
+    def semver_filter(self, versions: list[str], predicate: str) -> list[str]:
+        return [str(v) for v in semver_index(tuple(versions)).filter(predicate)]
 
     def pep440(self, pep440_string: str) -> Pep440Dict:
         return self._f_pep440.of(pep440_string)
 
     def pep440_filter(self, versions: list[str], predicate: str) -> list[str]:
-        return [
-            self._f_pep440.sanitize(v) for v in versions if Pep440(v) in SpecifierSet(predicate)
-        ]
+        index = pep440_index(tuple(versions))
+        return [self._f_pep440.sanitize(v) for v in index.filter(predicate)]
+
+    def pep440_range(self, versions: list[str], lower: str, upper: str) -> list[str]:
+        index = pep440_index(tuple(versions))
+        return [self._f_pep440.sanitize(v) for v in index.range(lower or None, upper or None)]
 
     def pep440_find_for_spec(self, spec: str) -> list[str]:
         pkg, predicate = self._f_pep440.split_spec(spec)
@@ -65,18 +74,18 @@ class Functions:
         return self.pep440_filter(list(versions), predicate)
 
     def pep440_ascending(self, versions: list[str]) -> list[str]:
-        sorted_ = sorted(Pep440(v) for v in versions)
-        return [self._f_pep440.sanitize(p) for p in sorted_]
+        index = pep440_index(tuple(versions))
+        return [self._f_pep440.sanitize(p) for p in index.ascending()]
 
     def pep440_descending(self, versions: list[str]) -> list[str]:
-        sorted_ = sorted((Pep440(v) for v in versions), reverse=True)
-        return [self._f_pep440.sanitize(p) for p in sorted_]
+        index = pep440_index(tuple(versions))
+        return [self._f_pep440.sanitize(p) for p in index.descending()]
 
     def pep440_max(self, versions: list[str]) -> str:
-        return self._f_pep440.sanitize(max(Pep440(v) for v in versions))
+        return self._f_pep440.sanitize(pep440_index(tuple(versions)).max())
 
     def pep440_min(self, versions: list[str]) -> str:
-        return self._f_pep440.sanitize(min(Pep440(v) for v in versions))
+        return self._f_pep440.sanitize(pep440_index(tuple(versions)).min())
 
     def pep440_max_per(self, versions: list[str], per: str) -> list[str]:
         return self._f_pep440.max_per(versions, per)
@@ -88,7 +97,7 @@ class Functions:
         return self._f_license.license_data(spdx_id)
 
     def timestamp(self, ts: str) -> TimeDict:
-        return self._f_time.of(datetime.fromisoformat(ts))
+        return cast("TimeDict", self._f_time.lazy(datetime.fromisoformat(ts)))
 
     def now_local(self) -> TimeDict:
         return self._now_local
@@ -0,0 +1,162 @@
+# SPDX-FileCopyrightText: Copyright 2020-2026, Contributors to Tyrannosaurus
+# SPDX-PackageHomePage: https://github.com/dmyersturnbull/tyrannosaurus
+# SPDX-License-Identifier: Apache-2.0
+
+"""Persistent on-disk cache for HTTP GET responses."""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import threading
+import time
+from dataclasses import dataclass
+from datetime import timedelta
+from typing import TYPE_CHECKING, NamedTuple, Self
+
+from loguru import logger
+from niquests.exceptions import ConnectionError as NiquestsConnectionError
+from niquests.exceptions import Timeout
+
+from tyranno_sandbox.functions._core import FunctionError
+
+if TYPE_CHECKING:
+    from pathlib import Path
+
+    from niquests import Session
+
+    from tyranno_sandbox._core import Json
+    from tyranno_sandbox.global_vars import GlobalVars
+
+__all__ = ["CachedResponse", "HttpCache"]
+
+
+class CachedResponse(NamedTuple):
+    """A stored response body and the validators needed to revalidate it."""
+
+    url: str
+    fetched_at: float
+    etag: str | None
+    last_modified: str | None
+    body: bytes
+
+    def age(self) -> timedelta:
+        return timedelta(seconds=time.time() - self.fetched_at)
+
+    def refreshed(self) -> Self:
+        return self._replace(fetched_at=time.time())
+
+
+@dataclass(frozen=True, slots=True, kw_only=True)
+class HttpCache:
+    """Caches response bodies in `directory`, along with their `ETag` and `Last-Modified`.
+
+    Entries younger than `ttl` are served without a request.
+    Older entries are revalidated with `If-None-Match`/`If-Modified-Since`;
+    a `304 Not Modified` response costs no body download.
+    If the server is unreachable, a stale entry is served with a warning.
+
+    Attributes:
+        session: Used for requests.
+        directory: Where entries are stored; normally under `GlobalVars.cache_dir`.
+        ttl: How long an entry is fresh.
+        offline: Never make requests, serving entries regardless of age.
+    """
+
+    session: Session
+    directory: Path
+    ttl: timedelta = timedelta(hours=1)
+    offline: bool = False
+
+    @classmethod
+    def of(cls, session: Session, env: GlobalVars) -> Self:
+        """Returns a cache under `env.cache_dir`, configured by `env`."""
+        return cls(
+            session=session,
+            directory=env.cache_dir / "http",
+            ttl=env.http_cache_ttl,
+            offline=env.offline,
+        )
+
+    def get_json(self, url: str) -> Json:
+        return json.loads(self.get(url))
+
+    def get(self, url: str) -> bytes:
+        """Returns the body from the cache or the server, storing any new response.
+
+        Raises:
+            FunctionError: If `offline` and `url` has no cache entry.
+            niquests.HTTPError: If the server returns an error status.
+        """
+        entry = self._load(url)
+        if entry is not None and (self.offline or entry.age() < self.ttl):
+            return entry.body
+        if self.offline:
+            msg = f"{url} is not cached, and requests are disabled (offline mode)."
+            raise FunctionError(function="get", args={"url": url}, message=msg)
+        headers = {}
+        if entry is not None and entry.etag:
+            headers["If-None-Match"] = entry.etag
+        if entry is not None and entry.last_modified:
+            headers["If-Modified-Since"] = entry.last_modified
+        try:
+            response = self.session.get(url, headers=headers)
+        except (NiquestsConnectionError, Timeout) as e:
+            if entry is None:
+                raise
+            logger.warning(f"Using stale cache entry for {url} ({entry.age()} old): {e}")
+            return entry.body
+        if response.status_code == 304 and entry is not None:
+            self._store(entry.refreshed())
+            return entry.body
+        response.raise_for_status()
+        body = response.content or b""
+        etag = response.headers.get("ETag")
+        last_modified = response.headers.get("Last-Modified")
+        self._store(CachedResponse(url, time.time(), etag, last_modified, body))
+        return body
+
+    def _load(self, url: str) -> CachedResponse | None:
+        meta_path, body_path = self._paths(url)
+        try:
+            meta = json.loads(meta_path.read_text(encoding="utf-8"))
+            body = body_path.read_bytes()
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as e:
+            logger.warning(f"Ignoring corrupt cache entry {meta_path}: {e}")
+            return None
+        fetched_at = meta.get("fetched_at") if isinstance(meta, dict) else None
+        if not isinstance(fetched_at, int | float) or isinstance(fetched_at, bool):
+            logger.warning(f"Ignoring corrupt cache entry {meta_path}: invalid metadata")
+            return None
+        if meta.get("url") != url:  # A hash collision is effectively impossible, but be safe.
+            return None
+        return CachedResponse(url, fetched_at, meta.get("etag"), meta.get("last_modified"), body)
+
+    def _store(self, entry: CachedResponse) -> None:
+        meta_path, body_path = self._paths(entry.url)
+        meta = {
+            "url": entry.url,
+            "fetched_at": entry.fetched_at,
+            "etag": entry.etag,
+            "last_modified": entry.last_modified,
+        }
+        self.directory.mkdir(parents=True, exist_ok=True)
+        # Write the body before the metadata so that a reader never sees metadata without a body.
+        self._replace(body_path, entry.body)
+        self._replace(meta_path, json.dumps(meta).encode())
+
+    def _paths(self, url: str) -> tuple[Path, Path]:
+        name = hashlib.sha256(url.encode()).hexdigest()
+        return self.directory / f"{name}.json", self.directory / f"{name}.body"
+
+    def _replace(self, path: Path, data: bytes) -> None:
+        # Unique per thread and process, since several may fetch the same URL.
+        temp_file = path.with_name(f".~{path.name}.{os.getpid()}.{threading.get_ident()}.temp")
+        try:
+            temp_file.write_bytes(data)
+            temp_file.replace(path)
+        finally:
+            temp_file.unlink(missing_ok=True)
@@ -0,0 +1,184 @@
+# SPDX-FileCopyrightText: Copyright 2020-2026, Contributors to Tyrannosaurus
+# SPDX-PackageHomePage: https://github.com/dmyersturnbull/tyrannosaurus
+# SPDX-License-Identifier: Apache-2.0
+
+"""Compact, memory-mapped index of SPDX licenses."""
+
+from __future__ import annotations
+
+import json
+import mmap
+import os
+import struct
+import threading
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, Final, NamedTuple, Self
+
+if TYPE_CHECKING:
+    from collections.abc import Iterable, Iterator
+    from pathlib import Path
+
+    from tyranno_sandbox.global_vars import GlobalVars
+
+__all__ = ["LicenseIndex", "LicenseIndexError", "LicenseRecord"]
+
+_MAGIC: Final = b"TYRSPDX1"
+_HEADER_SIZE: Final = struct.Struct("<8sQ")
+
+
+class LicenseRecord(NamedTuple):
+    """An SPDX license's name, valid URIs (in SPDX order), and full text."""
+
+    spdx_id: str
+    name: str
+    links: list[str]
+    text: str
+
+
+class _Entry(NamedTuple):
+    name: str
+    links: list[str]
+    offset: int
+    length: int
+
+
+class _Mapped(NamedTuple):
+    mapped: mmap.mmap
+    texts_start: int
+    table: dict[str, _Entry]
+
+
+@dataclass(frozen=True, slots=True)
+class LicenseIndexError(Exception):
+    """The license index file is missing or malformed."""
+
+    path: Path
+    issue: str
+
+    def __str__(self) -> str:
+        return f"License index {self.path} {self.issue}."
+
+
+@dataclass(slots=True)
+class LicenseIndex:
+    """A single file mapping SPDX IDs to names, URIs, and license texts.
+
+    The file is a fixed header (magic bytes and a table size), a JSON table of
+    `id → [name, links, offset, length]`, and the concatenated UTF-8 license texts.
+    Offsets are relative to the start of the texts.
+    Nothing is read until first use; the file is then memory-mapped,
+    the table is decoded, and each text is decoded only when requested.
+    Rebuild the file with [write][].
+    """
+
+    path: Path
+    _lock: threading.Lock = field(default_factory=threading.Lock, init=False, repr=False)
+    _state: _Mapped | None = field(default=None, init=False, repr=False)
+
+    @classmethod
+    def of(cls, env: GlobalVars) -> Self:
+        """Returns the index under `env.cache_dir`."""
+        return cls(env.cache_dir / "spdx-licenses.idx")
+
+    def exists(self) -> bool:
+        return self._state is not None or self.path.is_file()
+
+    def ids(self) -> list[str]:
+        return list(self._load())
+
+    def __contains__(self, spdx_id: object) -> bool:
+        return spdx_id in self._load()
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._load())
+
+    def __len__(self) -> int:
+        return len(self._load())
+
+    def get(self, spdx_id: str) -> LicenseRecord | None:
+        """Returns the license, or `None` if the index doesn't contain it.
+
+        Raises:
+            LicenseIndexError: If the file is missing or malformed.
+        """
+        # Under the lock, so that `close` can't unmap the file while it's being read.
+        with self._lock:
+            state = self._load_locked()
+            if (entry := state.table.get(spdx_id)) is None:
+                return None
+            start = state.texts_start + entry.offset
+            raw = state.mapped[start : start + entry.length]
+        return LicenseRecord(spdx_id, entry.name, entry.links, raw.decode())
+
+    def close(self) -> None:
+        """Unmaps the file; the next access reopens it."""
+        with self._lock:
+            if self._state is not None:
+                self._state.mapped.close()
+            self._state = None
+
+    def write(self, records: Iterable[LicenseRecord]) -> int:
+        """Atomically replaces the file with `records`, returning the number written.
+
+        Open readers keep seeing the previous contents until [close][] is called.
+        """
+        table: dict[str, tuple[str, list[str], int, int]] = {}
+        texts: list[bytes] = []
+        offset = 0
+        for record in records:
+            text = record.text.encode()
+            table[record.spdx_id] = (record.name, record.links, offset, len(text))
+            texts.append(text)
+            offset += len(text)
+        header = json.dumps(table, ensure_ascii=False, separators=(",", ":")).encode()
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        temp_file = self.path.with_name(f".~{self.path.name}.{os.getpid()}.temp")
+        try:
+            with temp_file.open("wb") as f:
+                f.write(_HEADER_SIZE.pack(_MAGIC, len(header)))
+                f.write(header)
+                f.writelines(texts)
+            temp_file.replace(self.path)
+        finally:
+            temp_file.unlink(missing_ok=True)
+        return len(table)
+
+    def _load(self) -> dict[str, _Entry]:
+        # The state is replaced as a whole, so it's safe to read without the lock.
+        if (state := self._state) is not None:
+            return state.table
+        with self._lock:
+            return self._load_locked().table
+
+    def _load_locked(self) -> _Mapped:
+        if self._state is None:
+            self._state = self._open()
+        return self._state
+
+    def _open(self) -> _Mapped:
+        try:
+            with self.path.open("rb") as f:
+                size = os.fstat(f.fileno()).st_size
+                if size < _HEADER_SIZE.size:
+                    raise LicenseIndexError(self.path, "is truncated")
+                mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except FileNotFoundError:
+            msg = "does not exist; run `tyranno refresh-licenses`"
+            raise LicenseIndexError(self.path, msg) from None
+        try:
+            return self._parse(mapped, size)
+        except LicenseIndexError:
+            mapped.close()
+            raise
+        except (ValueError, TypeError, AttributeError) as e:
+            mapped.close()
+            raise LicenseIndexError(self.path, "is corrupt; run `tyranno refresh-licenses`") from e
+
+    def _parse(self, mapped: mmap.mmap, size: int) -> _Mapped:
+        magic, header_size = _HEADER_SIZE.unpack_from(mapped)
+        if magic != _MAGIC or _HEADER_SIZE.size + header_size > size:
+            raise LicenseIndexError(self.path, "is not a license index")
+        texts_start = _HEADER_SIZE.size + header_size
+        raw = mapped[_HEADER_SIZE.size : texts_start]
+        table = {k: _Entry(*v) for k, v in json.loads(raw).items()}
+        return _Mapped(mapped, texts_start, table)
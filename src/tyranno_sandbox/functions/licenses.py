@@ -6,14 +6,22 @@
 
 from __future__ import annotations
 
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass
 from operator import itemgetter
-from typing import TYPE_CHECKING, TypedDict
+from typing import TYPE_CHECKING, Final, TypedDict
+
+from tyranno_sandbox.functions.license_index import LicenseRecord
 
 if TYPE_CHECKING:
+    from collections.abc import Iterable
+
     from niquests import Session
 
     from tyranno_sandbox._core import Json, JsonBranch
+    from tyranno_sandbox.functions.license_index import LicenseIndex
+
+_LICENSE_DATA: Final = "https://raw.githubusercontent.com/spdx/license-list-data/main/json"
 
 
 class LicenseDict(TypedDict):
@@ -28,24 +36,57 @@ class LicenseDict(TypedDict):
 
 @dataclass(frozen=True, slots=True)
 class LicenseFunctions:
+    """Gets SPDX license data, from `index` if it has the license, otherwise from GitHub."""
+
     session: Session
+    index: LicenseIndex | None = None
 
     def license_data(self, spdx_id: str) -> LicenseDict:
-        data = self._dl_license(spdx_id)
-        uris = self._get_license_uris(data)
+        record = None
+        if self.index is not None and self.index.exists():
+            record = self.index.get(spdx_id)
+        if record is None:
+            record = self.download(spdx_id)
         return LicenseDict(
             id=spdx_id,
             spdx_id=spdx_id,
-            name=data["name"],
+            name=record.name,
             uri=f"https://spdx.org/licenses/{spdx_id}.html",
-            links=uris,
+            links=record.links,
             header=f"SPDX-License-Identifier: {spdx_id}",
-            text=data["licenseText"],
+            text=record.text,
         )
 
+    def download(self, spdx_id: str) -> LicenseRecord:
+        data = self._dl_license(spdx_id)
+        return LicenseRecord(
+            spdx_id, data["name"], self._get_license_uris(data), data["licenseText"]
+        )
+
+    def list_ids(self) -> list[str]:
+        """Downloads the IDs of all non-deprecated SPDX licenses."""
+        response = self.session.get(f"{_LICENSE_DATA}/licenses.json").raise_for_status()
+        licenses = response.json()["licenses"]
+        return [x["licenseId"] for x in licenses if not x.get("isDeprecatedLicenseId")]
+
+    def refresh_index(self, ids: Iterable[str] = (), *, jobs: int = 8) -> int:
+        """Downloads licenses and rebuilds `index`, returning the number of licenses.
+
+        Args:
+            ids: SPDX IDs to include; if empty, includes all non-deprecated licenses.
+            jobs: Number of parallel downloads.
+        """
+        if self.index is None:
+            msg = "No license index is configured."
+            raise ValueError(msg)
+        ids = sorted(ids or self.list_ids())
+        with ThreadPoolExecutor(max_workers=jobs, thread_name_prefix="tyranno-spdx") as pool:
+            records = list(pool.map(self.download, ids))
+        self.index.close()
+        return self.index.write(records)
+
     def _dl_license(self, spdx_id: str) -> Json:
-        dir_ = "https://raw.githubusercontent.com/spdx/license-list-data/main/json/details"
-        url = f"{dir_}/{spdx_id}.json"
+        url = f"{_LICENSE_DATA}/details/{spdx_id}.json"
         response = self.session.get(url).raise_for_status()
         return response.json()
 
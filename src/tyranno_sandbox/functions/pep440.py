@@ -5,13 +5,23 @@
 from __future__ import annotations
 
 import re
+from bisect import bisect_left, bisect_right
 from dataclasses import dataclass
-from typing import ClassVar, Literal, TypedDict
+from functools import lru_cache
+from typing import TYPE_CHECKING, ClassVar, Final, Literal, Self, TypedDict
 
+from packaging.specifiers import SpecifierSet
 from packaging.version import Version as Pep440
 
 from tyranno_sandbox.functions._core import FunctionError
 
+if TYPE_CHECKING:
+    from collections.abc import Iterable
+
+type Per = Literal["major", "minor", "micro"]
+
+_PER_LENGTHS: Final[dict[str, int]] = {"major": 1, "minor": 2, "micro": 3}
+
 
 class Pep440Dict(TypedDict):
     full_version: str
@@ -118,14 +128,136 @@ class Pep440Functions:
         raise ValueError(spec)
 
     def max_per(self, versions: list[str], per: str) -> list[str]:
-        versions = [Pep440(v) for v in versions]
-        options = {"major", "minor", "micro"}
-        if per not in options:
-            msg = f"Argument '{per}' is not one of {options}."
+        if per not in _PER_LENGTHS:
+            msg = f"Argument '{per}' is not one of {set(_PER_LENGTHS)}."
             raise FunctionError.from_call(msg, depth=1)
-        best = {}
-        for v in versions:
-            v0 = getattr(v, per)
-            if v0 not in best or v > best[v0]:
-                best[v0] = v
-        return [self.sanitize(b) for b in best.values()]
+        return [self.sanitize(b) for b in pep440_index(tuple(versions)).max_per(per)]
+
+
+@lru_cache(maxsize=8192)
+def parse_pep440(version: str, /) -> Pep440:
+    """Parses a version string, caching the result."""
+    return Pep440(version)
+
+
+@lru_cache(maxsize=256)
+def parse_specifiers(predicate: str, /) -> SpecifierSet:
+    """Parses a specifier set like `>=1.2,<2`, caching the result."""
+    return SpecifierSet(predicate)
+
+
+@lru_cache(maxsize=64)
+def pep440_index(versions: tuple[str, ...], /) -> Pep440Index:
+    """Returns a [Pep440Index][] of `versions`, caching it for repeated queries."""
+    return Pep440Index.of(versions)
+
+
+@dataclass(frozen=True, slots=True)
+class Pep440Index:
+    """Versions parsed and sorted once, for repeated queries.
+
+    Queries read the sorted array.
+    [filter][] and [range][] narrow it with binary search before testing each version.
+
+    Attributes:
+        versions: The versions, in ascending order.
+    """
+
+    versions: tuple[Pep440, ...]
+
+    @classmethod
+    def of(cls, versions: Iterable[str | Pep440]) -> Self:
+        return cls(tuple(sorted(cls._parse(v) for v in versions)))
+
+    def __len__(self) -> int:
+        return len(self.versions)
+
+    def ascending(self) -> list[Pep440]:
+        return list(self.versions)
+
+    def descending(self) -> list[Pep440]:
+        return list(reversed(self.versions))
+
+    def max(self) -> Pep440:
+        """Returns the greatest version.
+
+        Raises:
+            ValueError: If there are no versions.
+        """
+        if not self.versions:
+            msg = "No versions"
+            raise ValueError(msg)
+        return self.versions[-1]
+
+    def min(self) -> Pep440:
+        """Returns the least version.
+
+        Raises:
+            ValueError: If there are no versions.
+        """
+        if not self.versions:
+            msg = "No versions"
+            raise ValueError(msg)
+        return self.versions[0]
+
+    def max_per(self, per: Per) -> list[Pep440]:
+        """Returns the greatest version per major, minor, or micro release, in ascending order.
+
+        Releases are grouped by epoch and release prefix; e.g. `1.2` and `2.2` are distinct minors.
+        """
+        n = _PER_LENGTHS[per]
+        best: dict[tuple[int, ...], Pep440] = {}
+        for v in self.versions:  # Ascending, so the last one wins.
+            best[v.epoch, *(v.release + (0,) * n)[:n]] = v
+        return list(best.values())
+
+    def range(
+        self,
+        lower: str | Pep440 | None = None,
+        upper: str | Pep440 | None = None,
+        *,
+        include_upper: bool = False,
+    ) -> list[Pep440]:
+        """Returns the versions `v` with `lower <= v < upper` (or `<= upper`), in ascending order."""
+        lo, hi = 0, len(self.versions)
+        if lower is not None:
+            lo = bisect_left(self.versions, self._parse(lower))
+        if upper is not None:
+            bisect = bisect_right if include_upper else bisect_left
+            hi = bisect(self.versions, self._parse(upper))
+        return list(self.versions[lo:hi])
+
+    def filter(self, predicate: str | SpecifierSet) -> list[Pep440]:
+        """Returns the versions in `predicate` (as by `SpecifierSet.contains`), in ascending order.
+
+        Ordered comparisons, `==` (without a wildcard) and `~=` bound a slice via binary search;
+        only versions in that slice are tested against the full predicate.
+        """
+        specifiers = parse_specifiers(predicate) if isinstance(predicate, str) else predicate
+        lo, hi = 0, len(self.versions)
+        for spec in specifiers:
+            spec_lo, spec_hi = self._bounds(spec.operator, spec.version)
+            lo, hi = max(lo, spec_lo), min(hi, spec_hi)
+        return [v for v in self.versions[lo:hi] if specifiers.contains(v)]
+
+    def _bounds(self, operator: str, version: str) -> tuple[int, int]:
+        """Returns a slice that contains every version that could match a single specifier."""
+        n = len(self.versions)
+        if operator in {"!=", "==="} or version.endswith(".*"):
+            return 0, n
+        v = parse_pep440(version)
+        if operator in {">=", ">", "~="}:
+            # A local version sorts after its public version, so `v.public >= V` implies `v >= V`.
+            return bisect_left(self.versions, v), n
+        if operator == "<":
+            return 0, bisect_left(self.versions, v)
+        # `<=` and `==` compare public versions, so also include local versions of `V`.
+        hi = bisect_right(self.versions, v)
+        public = parse_pep440(v.public)
+        while hi < n and parse_pep440(self.versions[hi].public) == public:
+            hi += 1
+        return (bisect_left(self.versions, v) if operator == "==" else 0), hi
+
+    @staticmethod
+    def _parse(v: str | Pep440) -> Pep440:
+        return parse_pep440(v) if isinstance(v, str) else v
@@ -11,11 +11,13 @@ if TYPE_CHECKING:
     from niquests import Session
 
     from tyranno_sandbox._core import JsonBranch
+    from tyranno_sandbox.functions.http_cache import HttpCache
 
 
 @dataclass(frozen=True, slots=True)
 class PypiFunctions:
     session: Session
+    cache: HttpCache | None = None
 
     def extract_versions(self, pypi_data: JsonBranch) -> set[str]:
         versions: set[str] = set()
@@ -26,6 +28,8 @@ class PypiFunctions:
 
     def fetch_metadata(self, name: str) -> JsonBranch:
         url = f"https://pypi.org/pypi/{name}/json"
+        if self.cache is not None:
+            return self.cache.get_json(url)
         # niquests `.json()` uses orjson if it's installed.
         response = self.session.get(url).raise_for_status()
         return response.json()
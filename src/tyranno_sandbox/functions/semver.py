@@ -4,13 +4,38 @@
 
 from __future__ import annotations
 
+import re
+from bisect import bisect_left, bisect_right
 from dataclasses import dataclass
-from typing import TypedDict
+from functools import lru_cache
+from operator import itemgetter
+from typing import TYPE_CHECKING, Final, Literal, NamedTuple, Self, TypedDict
 
 from semver import VersionInfo as Semver
 
 from tyranno_sandbox.functions._core import FunctionError
 
+if TYPE_CHECKING:
+    from collections.abc import Iterable
+
+# A version's precedence: (major, minor, patch, is_release, prerelease identifiers).
+# Numeric identifiers are `(0, n)` and alphanumeric ones `(1, s)`, so tuple order is semver order.
+type SemverKey = tuple[int, int, int, int, tuple[tuple[int, int | str], ...]]
+
+_PARTIAL_RE: Final = re.compile(
+    r"""
+    v?(?P<major>\d+|[xX*])
+    (?:\.(?P<minor>\d+|[xX*]))?
+    (?:\.(?P<patch>\d+|[xX*]))?
+    (?:-?(?P<pre>[0-9A-Za-z-]+(?:\.[0-9A-Za-z-]+)*))?
+    (?:\+[0-9A-Za-z-]+(?:\.[0-9A-Za-z-]+)*)?
+    """,
+    re.VERBOSE,
+)
+_COMPARATOR_RE: Final = re.compile(r"(?P<op>[<>]=?|=|~>?|\^)?\s*(?P<version>\S+)")
+_HYPHEN_RE: Final = re.compile(r"^\s*(?P<lower>\S+)\s+-\s+(?P<upper>\S+)\s*$")
+_OP_SPACE_RE: Final = re.compile(r"([<>]=?|=|~>?|\^)\s+")
+
 
 class SemverDict(TypedDict):
     full_version: str
@@ -30,8 +55,296 @@ class NpmSpecDict(TypedDict):
     predicate: str
 
 
+def semver_key(v: Semver) -> SemverKey:
+    if not v.prerelease:
+        return v.major, v.minor, v.patch, 1, ()
+    ids = tuple((0, int(i)) if i.isdigit() else (1, i) for i in v.prerelease.split("."))
+    return v.major, v.minor, v.patch, 0, ids
+
+
+@lru_cache(maxsize=8192)
+def parse_semver(version: str, /) -> Semver:
+    """Parses a version string, caching the result."""
+    return Semver.parse(version)
+
+
+@lru_cache(maxsize=256)
+def compile_range(predicate: str, /) -> SemverRange:
+    """Compiles an npm-style range like `^1.2 || >=3.0.0-rc.1 <4`, caching the result."""
+    return SemverRange.parse(predicate)
+
+
+@lru_cache(maxsize=64)
+def semver_index(versions: tuple[str, ...], /) -> SemverIndex:
+    """Returns a [SemverIndex][] of `versions`, caching it for repeated queries."""
+    return SemverIndex.of(versions)
+
+
+class _Bound(NamedTuple):
+    key: SemverKey
+    inclusive: bool
+
+
+class SemverInterval(NamedTuple):
+    """A set of comparators joined by whitespace (AND), reduced to a single interval.
+
+    Attributes:
+        lower: The lower bound, or `None` if unbounded.
+        upper: The upper bound, or `None` if unbounded.
+        prereleases: `(major, minor, patch)` of prereleases named in the comparators.
+          As in npm, a prerelease version only matches if its tuple is one of these.
+        empty: Matches nothing (e.g. `<0.0.0-0` or `<*`).
+    """
+
+    lower: _Bound | None
+    upper: _Bound | None
+    prereleases: frozenset[tuple[int, int, int]]
+    empty: bool = False
+
+    def contains(self, v: Semver, key: SemverKey | None = None) -> bool:
+        key = semver_key(v) if key is None else key
+        if self.empty or v.prerelease and (v.major, v.minor, v.patch) not in self.prereleases:
+            return False
+        if self.lower is not None and (
+            key < self.lower.key or key == self.lower.key and not self.lower.inclusive
+        ):
+            return False
+        return self.upper is None or (
+            key < self.upper.key or key == self.upper.key and self.upper.inclusive
+        )
+
+
+@dataclass(frozen=True, slots=True)
+class SemverRange:
+    """A compiled npm-style range: a union (`||`) of [SemverInterval][]s.
+
+    Supports primitives (`<`, `<=`, `>`, `>=`, `=`), X-ranges (`1.x`, `1.2.*`, `*`),
+    partial versions (`1.2`), tilde (`~1.2.3`), caret (`^0.2`), and hyphen ranges (`1 - 2.3`).
+    Compile with [compile_range][] to reuse ranges by predicate.
+    """
+
+    predicate: str
+    intervals: tuple[SemverInterval, ...]
+
+    @classmethod
+    def parse(cls, predicate: str) -> Self:
+        intervals = tuple(_parse_set(part) for part in predicate.split("||"))
+        return cls(predicate, intervals)
+
+    def __contains__(self, v: object) -> bool:
+        if isinstance(v, str):
+            v = parse_semver(v)
+        if not isinstance(v, Semver):
+            return False
+        key = semver_key(v)
+        return any(i.contains(v, key) for i in self.intervals)
+
+
+@dataclass(frozen=True, slots=True)
+class SemverIndex:
+    """Versions parsed and sorted once, for repeated queries.
+
+    Attributes:
+        versions: The versions, in ascending order of precedence.
+        keys: The [semver_key][] of each version.
+    """
+
+    versions: tuple[Semver, ...]
+    keys: tuple[SemverKey, ...]
+
+    @classmethod
+    def of(cls, versions: Iterable[str | Semver]) -> Self:
+        parsed = [parse_semver(v) if isinstance(v, str) else v for v in versions]
+        pairs = sorted(((semver_key(v), v) for v in parsed), key=itemgetter(0))
+        return cls(tuple(v for _, v in pairs), tuple(k for k, _ in pairs))
+
+    def __len__(self) -> int:
+        return len(self.versions)
+
+    def max(self) -> Semver:
+        """Returns the version with the highest precedence.
+
+        Raises:
+            ValueError: If there are no versions.
+        """
+        if not self.versions:
+            msg = "No versions"
+            raise ValueError(msg)
+        return self.versions[-1]
+
+    def min(self) -> Semver:
+        """Returns the version with the lowest precedence.
+
+        Raises:
+            ValueError: If there are no versions.
+        """
+        if not self.versions:
+            msg = "No versions"
+            raise ValueError(msg)
+        return self.versions[0]
+
+    def filter(self, predicate: str | SemverRange) -> list[Semver]:
+        """Returns the versions in `predicate`, in ascending order.
+
+        Each interval of the range bounds a slice via binary search;
+        only prereleases in that slice need further checks.
+        """
+        compiled = compile_range(predicate) if isinstance(predicate, str) else predicate
+        matched: set[int] = set()
+        for interval in compiled.intervals:
+            if interval.empty:
+                continue
+            lo, hi = self._slice(interval)
+            matched.update(
+                i
+                for i in range(lo, hi)
+                if not self.versions[i].prerelease
+                or (self.versions[i].major, self.versions[i].minor, self.versions[i].patch)
+                in interval.prereleases
+            )
+        return [self.versions[i] for i in sorted(matched)]
+
+    def _slice(self, interval: SemverInterval) -> tuple[int, int]:
+        lo, hi = 0, len(self.keys)
+        if (lower := interval.lower) is not None:
+            lo = (bisect_left if lower.inclusive else bisect_right)(self.keys, lower.key)
+        if (upper := interval.upper) is not None:
+            hi = (bisect_right if upper.inclusive else bisect_left)(self.keys, upper.key)
+        return lo, hi
+
+
+type _Op = Literal["<", "<=", ">", ">=", "="]
+
+
+class _Partial(NamedTuple):
+    major: int | None
+    minor: int | None
+    patch: int | None
+    pre: str | None
+
+    @classmethod
+    def parse(cls, s: str) -> Self:
+        if not (m := _PARTIAL_RE.fullmatch(s)):
+            msg = f"Invalid semver range component '{s}'"
+            raise ValueError(msg)
+        parts = [
+            None if g is None or g in "xX*" else int(g) for g in m.group("major", "minor", "patch")
+        ]
+        # Anything after a wildcard is also a wildcard, e.g. `1.x.3` is `1.x.x`.
+        for i in range(1, 3):
+            if parts[i - 1] is None:
+                parts[i] = None
+        major, minor, patch = parts
+        pre = m.group("pre") if patch is not None else None
+        return cls(major, minor, patch, pre)
+
+    def key(self) -> SemverKey:
+        """Returns the lowest version this partial covers (e.g. `1.2` → `1.2.0`)."""
+        v = Semver(self.major or 0, self.minor or 0, self.patch or 0, self.pre)
+        return semver_key(v)
+
+
+def _floor(major: int, minor: int = 0, patch: int = 0) -> SemverKey:
+    """Returns the lowest version with this release, i.e. `major.minor.patch-0`."""
+    return major, minor, patch, 0, ((0, 0),)
+
+
+def _next(p: _Partial) -> SemverKey:
+    """Returns the lowest version above everything `p` covers, e.g. `1.2` → `1.3.0-0`."""
+    if p.minor is None:
+        return _floor((p.major or 0) + 1)
+    if p.patch is None:
+        return _floor(p.major or 0, p.minor + 1)
+    return _floor(p.major or 0, p.minor, p.patch + 1)
+
+
+def _parse_set(part: str) -> SemverInterval:
+    part = part.strip()
+    bounds: list[tuple[_Op, SemverKey]] = []
+    prereleases: set[tuple[int, int, int]] = set()
+    if m := _HYPHEN_RE.fullmatch(part):
+        lower, upper = _Partial.parse(m.group("lower")), _Partial.parse(m.group("upper"))
+        comparators = [(lower, ">="), (upper, "<=")]
+    else:
+        comparators = []
+        for token in _OP_SPACE_RE.sub(r"\1", part).split():
+            cm = _COMPARATOR_RE.fullmatch(token)
+            if not cm:
+                msg = f"Invalid semver comparator '{token}'"
+                raise ValueError(msg)
+            comparators.append((_Partial.parse(cm.group("version")), cm.group("op") or "="))
+    for p, op in comparators:
+        if p.pre is not None:
+            prereleases.add((p.major or 0, p.minor or 0, p.patch or 0))
+        bounds += _desugar(p, op)
+    return _intersect(bounds, prereleases)
+
+
+def _desugar(p: _Partial, op: str) -> list[tuple[_Op, SemverKey]]:  # noqa: C901, PLR0911
+    if p.major is None:  # `*`, `x`, or `>=*`: anything, except `<*` and `>*`.
+        return [("<", _floor(0))] if op in {"<", ">"} else []
+    full = p.patch is not None
+    match op:
+        case "=":
+            return [("=", p.key())] if full else [(">=", p.key()), ("<", _next(p))]
+        case ">=":
+            return [(">=", p.key())]
+        case ">":
+            return [(">", p.key())] if full else [(">=", _next(p))]
+        case "<":
+            return [("<", p.key() if full else _floor(p.major, p.minor or 0))]
+        case "<=":
+            return [("<=", p.key())] if full else [("<", _next(p))]
+        case "~" | "~>":
+            upper = _floor(p.major + 1) if p.minor is None else _floor(p.major, p.minor + 1)
+            return [(">=", p.key()), ("<", upper)]
+        case "^":
+            if p.minor is None or p.major > 0:
+                upper = _floor(p.major + 1)
+            elif p.patch is None or p.minor > 0:
+                upper = _floor(0, p.minor + 1)
+            else:
+                upper = _floor(0, 0, p.patch + 1)
+            return [(">=", p.key()), ("<", upper)]
+    msg = f"Invalid semver operator '{op}'"
+    raise ValueError(msg)
+
+
+def _intersect(
+    bounds: list[tuple[_Op, SemverKey]], prereleases: set[tuple[int, int, int]]
+) -> SemverInterval:
+    lower: _Bound | None = None
+    upper: _Bound | None = None
+    for op, key in bounds:
+        if op in {">", ">=", "="}:
+            bound = _Bound(key, inclusive=op != ">")
+            if lower is None or (bound.key, not bound.inclusive) > (lower.key, not lower.inclusive):
+                lower = bound
+        if op in {"<", "<=", "="}:
+            bound = _Bound(key, inclusive=op != "<")
+            if upper is None or (bound.key, bound.inclusive) < (upper.key, upper.inclusive):
+                upper = bound
+    empty = (
+        lower is not None
+        and upper is not None
+        and (
+            lower.key > upper.key
+            or lower.key == upper.key
+            and not (lower.inclusive and upper.inclusive)
+        )
+    )
+    return SemverInterval(lower, upper, frozenset(prereleases), empty=empty)
+
+
 @dataclass(frozen=True, slots=True)
 class SemverFunctions:
+    def split_spec(self, spec: str) -> NpmSpecDict:
+        """Splits an npm-style spec like `@scope/pkg@^1.2` into a package and range."""
+        package, sep, predicate = spec.rpartition("@")
+        if not sep or not package:  # No range, or only a scope's `@`
+            return NpmSpecDict(package=spec, predicate="*")
+        return NpmSpecDict(package=package, predicate=predicate or "*")
+
     def of(self, v: Semver | str) -> SemverDict:
         if isinstance(v, str):
             v = Semver.parse(v)
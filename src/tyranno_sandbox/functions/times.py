@@ -6,10 +6,13 @@ import calendar
 import math
 from dataclasses import dataclass
 from datetime import UTC, datetime
-from typing import ClassVar, NamedTuple, TypedDict
+from typing import TYPE_CHECKING, Any, ClassVar, Final, NamedTuple, TypedDict, cast
 
 from tyranno_sandbox.functions._core import FunctionError
 
+if TYPE_CHECKING:
+    from collections.abc import Callable, ItemsView, Iterator, KeysView, ValuesView
+
 
 class DateTuple(NamedTuple):
     year: int
@@ -94,39 +97,121 @@ class DatetimeFunctions:
         return stamp
 
     def of(self, dt: datetime) -> TimeDict:
-        # starting at 1
-        week_of_month: int = math.ceil(dt.day + dt.replace(day=1).weekday() / 7)
-        rfc_9557 = self.format(dt) + (f"[{dt.tzname()}]" if dt.tzname() else "")
-        return TimeDict(
-            rfc_9557=rfc_9557,
-            rfc_9557_utc=self.format(dt.astimezone(UTC)) + "[Etc/UTC]",
-            rfc_3339=self.format(dt),
-            rfc_3339_utc=self.format(dt.astimezone(UTC)),
-            iso_8601_week_date=dt.strftime("%G-W%V-%u"),
-            unix_time=int(dt.timestamp()),
-            formatted_local=dt.strftime("%Y-%m-%d %H:%M:%S"),
-            formatted=self.format(dt, sep=" ", ts="seconds"),
-            year=dt.year,
-            month=dt.month,
-            day=dt.day,
-            hour=dt.hour,
-            minute=dt.minute,
-            second=dt.second,
-            microsecond=dt.microsecond,
-            offset=dt.strftime("%z"),
-            zone=dt.tzname(),
-            is_dst=dt.dst() not in {None, 0},
-            date=dt.strftime("%Y-%m-%d"),
-            date_tuple=DateTuple(dt.year, dt.month, dt.day),
-            time=dt.strftime("%H:%M:%S:%ffffff"),
-            truncated_time=dt.strftime("%H:%M:%S"),
-            time_tuple=TimeTuple(dt.hour, dt.minute, dt.second, dt.microsecond),
-            day_number=dt.weekday(),
-            day_name=dt.strftime("%A"),
-            day_abbr=dt.strftime("%a"),
-            month_name=dt.strftime("%B"),
-            month_abbr=dt.strftime("%b"),
-            week_number=dt.isocalendar().week,
-            week_parity=week_of_month % 2,
-            is_leap_year=calendar.isleap(dt.year),
-        )
+        """Computes every field of a [TimeDict][]; see [lazy][] to compute only those used."""
+        return cast("TimeDict", {k: f(self, dt) for k, f in _TIME_FIELDS.items()})
+
+    def lazy(self, dt: datetime) -> LazyTimeDict:
+        """Returns a [TimeDict][] whose fields are computed when first accessed."""
+        return LazyTimeDict(self, dt)
+
+
+def _week_parity(dt: datetime) -> int:
+    # starting at 1
+    week_of_month: int = math.ceil(dt.day + dt.replace(day=1).weekday() / 7)
+    return week_of_month % 2
+
+
+def _rfc_9557(f: DatetimeFunctions, dt: datetime) -> str:
+    return f.format(dt) + (f"[{dt.tzname()}]" if dt.tzname() else "")
+
+
+# Maps each TimeDict key → how to compute it.
+_TIME_FIELDS: Final[dict[str, Callable[[DatetimeFunctions, datetime], Any]]] = {
+    "rfc_9557": _rfc_9557,
+    "rfc_9557_utc": lambda f, dt: f.format(dt.astimezone(UTC)) + "[Etc/UTC]",
+    "rfc_3339": lambda f, dt: f.format(dt),
+    "rfc_3339_utc": lambda f, dt: f.format(dt.astimezone(UTC)),
+    "iso_8601_week_date": lambda _, dt: dt.strftime("%G-W%V-%u"),
+    "unix_time": lambda _, dt: int(dt.timestamp()),
+    "formatted_local": lambda _, dt: dt.strftime("%Y-%m-%d %H:%M:%S"),
+    "formatted": lambda f, dt: f.format(dt, sep=" ", ts="seconds"),
+    "year": lambda _, dt: dt.year,
+    "month": lambda _, dt: dt.month,
+    "day": lambda _, dt: dt.day,
+    "hour": lambda _, dt: dt.hour,
+    "minute": lambda _, dt: dt.minute,
+    "second": lambda _, dt: dt.second,
+    "microsecond": lambda _, dt: dt.microsecond,
+    "offset": lambda _, dt: dt.strftime("%z"),
+    "zone": lambda _, dt: dt.tzname(),
+    "is_dst": lambda _, dt: dt.dst() not in {None, 0},
+    "date": lambda _, dt: dt.strftime("%Y-%m-%d"),
+    "date_tuple": lambda _, dt: DateTuple(dt.year, dt.month, dt.day),
+    "time": lambda _, dt: dt.strftime("%H:%M:%S:%ffffff"),
+    "truncated_time": lambda _, dt: dt.strftime("%H:%M:%S"),
+    "time_tuple": lambda _, dt: TimeTuple(dt.hour, dt.minute, dt.second, dt.microsecond),
+    "day_number": lambda _, dt: dt.weekday(),
+    "day_name": lambda _, dt: dt.strftime("%A"),
+    "day_abbr": lambda _, dt: dt.strftime("%a"),
+    "month_name": lambda _, dt: dt.strftime("%B"),
+    "month_abbr": lambda _, dt: dt.strftime("%b"),
+    "week_number": lambda _, dt: dt.isocalendar().week,
+    "week_parity": lambda _, dt: _week_parity(dt),
+    "is_leap_year": lambda _, dt: calendar.isleap(dt.year),
+}
+
+
+class LazyTimeDict(dict[str, object]):  # noqa: FURB189, PLW1641  # must be a dict; unhashable
+    """A [TimeDict][] that computes each field on first access, then caches it.
+
+    Fields are available as keys (`d["year"]`) and attributes (`d.year`).
+    Operations on the whole mapping (iteration, `items()`, `==`, `repr`, etc.)
+    compute every remaining field first, so it otherwise behaves like the eager `dict`.
+    """
+
+    __slots__ = ("_dt", "_functions")
+
+    def __init__(self, functions: DatetimeFunctions, dt: datetime) -> None:
+        super().__init__()
+        self._functions = functions
+        self._dt = dt
+
+    def __missing__(self, key: str) -> object:
+        if key not in _TIME_FIELDS:
+            raise KeyError(key)
+        value = _TIME_FIELDS[key](self._functions, self._dt)
+        super().__setitem__(key, value)
+        return value
+
+    def __getattr__(self, name: str) -> object:
+        if name in _TIME_FIELDS:
+            return self[name]
+        msg = f"{type(self).__name__!r} object has no attribute {name!r}"
+        raise AttributeError(msg)
+
+    def __contains__(self, key: object) -> bool:
+        return key in _TIME_FIELDS
+
+    def __len__(self) -> int:
+        return len(_TIME_FIELDS)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(_TIME_FIELDS)
+
+    def __eq__(self, other: object) -> bool:
+        return self._filled().__eq__(other)
+
+    def __ne__(self, other: object) -> bool:
+        return self._filled().__ne__(other)
+
+    def __repr__(self) -> str:
+        return repr(self._filled())
+
+    def get(self, key: str, default: object = None) -> object:
+        return self[key] if key in _TIME_FIELDS else default
+
+    def keys(self) -> KeysView[str]:
+        return self._filled().keys()
+
+    def values(self) -> ValuesView[object]:
+        return self._filled().values()
+
+    def items(self) -> ItemsView[str, object]:
+        return self._filled().items()
+
+    def copy(self) -> dict[str, object]:
+        return self._filled()
+
+    def _filled(self) -> dict[str, object]:
+        """Returns a plain `dict` of every field, in `TimeDict` order."""
+        return {k: self[k] for k in _TIME_FIELDS}
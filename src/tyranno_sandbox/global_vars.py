@@ -6,7 +6,7 @@
 
 import time
 from dataclasses import dataclass
-from datetime import UTC, datetime
+from datetime import UTC, datetime, timedelta
 from functools import cached_property
 from pathlib import Path
 from typing import TYPE_CHECKING, Final, Protocol, Self
@@ -65,6 +65,8 @@ class GlobalVars:
     tyranno_dir: str
     log_format: str
     debug_mode: bool
+    http_cache_ttl: timedelta = timedelta(hours=1)
+    offline: bool = False
 
 
 @dataclass(frozen=True, slots=True)
@@ -135,6 +137,8 @@ class EnvGlobalVarsFactory(GlobalVarsFactory):
             tyranno_dir=str(self._rel_dir("TYRANNO_DIR", Path(".tyranno"))),
             log_format=self._str("TYRANNO_LOG_FORMAT", ""),
             debug_mode=self._flag("TYRANNO_DEBUG_MODE"),
+            http_cache_ttl=self._seconds("TYRANNO_HTTP_CACHE_TTL", timedelta(hours=1)),
+            offline=self._flag("TYRANNO_OFFLINE"),
         )
 
     def _str(self, var: str, default: str) -> str:
@@ -145,6 +149,17 @@ class EnvGlobalVarsFactory(GlobalVarsFactory):
             return self.__parse_bool(var, value)
         return default
 
+    def _seconds(self, var: str, default: timedelta) -> timedelta:
+        if value := self.env.get(var):  # Treat empty the same as missing.
+            try:
+                seconds = float(value)
+            except ValueError:
+                seconds = -1.0
+            if seconds < 0:
+                raise GlobalConfigError("$" + var, value, "is not a non-negative number of seconds")
+            return timedelta(seconds=seconds)
+        return default
+
     def __parse_bool(self, var: str, value: str) -> bool:
         match value:
             case s if s == "1":
@@ -0,0 +1,107 @@
+# SPDX-FileCopyrightText: Copyright 2020-2026, Contributors to Tyrannosaurus
+# SPDX-PackageHomePage: https://github.com/dmyersturnbull/tyrannosaurus
+# SPDX-License-Identifier: Apache-2.0
+
+"""Concurrent prefetching of network-backed template functions."""
+
+from __future__ import annotations
+
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, NamedTuple, Self
+
+from loguru import logger
+
+from tyranno_sandbox.tyranno_functions import NETWORK_FUNCS
+
+if TYPE_CHECKING:
+    from collections.abc import Iterable
+
+    from niquests import Session
+
+    from tyranno_sandbox.functions import Functions
+    from tyranno_sandbox.global_vars import GlobalVars
+
+__all__ = ["NetworkCall", "NetworkCalls"]
+
+
+class NetworkCall(NamedTuple):
+    """A call to a function in `NETWORK_FUNCS`, with its input value as a string."""
+
+    name: str
+    value: str
+    args: tuple[str, ...]
+
+
+@dataclass(frozen=True, slots=True)
+class NetworkCalls:
+    """Results of network-backed template functions, fetched at most once per run.
+
+    Before rendering, [Syncer][] collects every network call in the targets
+    (see [Data.network_calls][]) and passes them to [prefetch][],
+    which issues them concurrently.
+    Rendering then reads the results through [call][],
+    so a repo with 20 version lookups pays about one round trip of latency rather than 20.
+
+    Attributes:
+        functions: Implements the calls.
+        jobs: Maximum number of concurrent requests.
+        session: The HTTP session `functions` uses, if it should be closed by [close][].
+    """
+
+    functions: Functions
+    jobs: int = 16
+    session: Session | None = field(default=None, repr=False, compare=False)
+    _results: dict[NetworkCall, object] = field(
+        default_factory=dict, init=False, repr=False, compare=False
+    )
+
+    @classmethod
+    def of(cls, env: GlobalVars) -> Self:
+        """Returns calls using a new session, `env`'s HTTP cache, and its SPDX license index."""
+        import niquests  # noqa: PLC0415
+
+        from tyranno_sandbox.functions import Functions  # noqa: PLC0415
+        from tyranno_sandbox.functions.http_cache import HttpCache  # noqa: PLC0415
+        from tyranno_sandbox.functions.license_index import LicenseIndex  # noqa: PLC0415
+
+        session = niquests.Session()
+        cache = HttpCache.of(session, env)
+        functions = Functions(session, cache=cache, license_index=LicenseIndex.of(env))
+        return cls(functions, session=session)
+
+    def close(self) -> None:
+        """Closes [session][], if any."""
+        if self.session is not None:
+            self.session.close()
+
+    def call(self, call: NetworkCall) -> object:
+        """Returns the prefetched result, or makes the call now if it wasn't prefetched."""
+        if call in self._results:
+            return self._results[call]
+        result = NETWORK_FUNCS[call.name](self.functions, call.value, *call.args)
+        self._results[call] = result
+        return result
+
+    def prefetch(self, calls: Iterable[NetworkCall]) -> int:
+        """Concurrently makes each distinct call without a result, returning how many.
+
+        Failures are not raised here; the call is retried (and fails) while rendering,
+        where the error is reported against the target line.
+        """
+        pending = list(dict.fromkeys(c for c in calls if c not in self._results))
+        if not pending:
+            return 0
+        jobs = min(self.jobs, len(pending))
+        with ThreadPoolExecutor(max_workers=jobs, thread_name_prefix="tyranno-fetch") as pool:
+            for call, error in zip(pending, pool.map(self._try_call, pending), strict=True):
+                if error is not None:
+                    logger.debug(f"Prefetching {call} failed: {error}")
+        return len(pending)
+
+    def _try_call(self, call: NetworkCall) -> Exception | None:
+        try:
+            self.call(call)
+        except Exception as e:  # noqa: BLE001  # reported when rendering
+            return e
+        return None
@@ -4,22 +4,31 @@
 
 """`tyranno sync` command."""
 
+import hashlib
+import json
+import mmap
+import os
 import re
 import shutil
 from collections.abc import MutableSequence
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass, field
-from functools import cache
+from functools import cache, partial
+from itertools import islice
+from pathlib import Path
 from re import Pattern
-from typing import TYPE_CHECKING, Final, Literal, NamedTuple, NewType, Self
+from typing import TYPE_CHECKING, Any, Final, Literal, NamedTuple, NewType, Self, TextIO
 
 from loguru import logger
 
+from tyranno_sandbox._about import __about__
 from tyranno_sandbox.context import ExpressionError
+from tyranno_sandbox.dot_tree import DotTrees
 
 if TYPE_CHECKING:
-    from pathlib import Path
+    from collections.abc import Generator, Iterable
 
-    from tyranno_sandbox.context import Context
+    from tyranno_sandbox.context import Context, Data
 
 
 @dataclass(frozen=True, kw_only=True)
@@ -60,6 +69,10 @@ class Tokens:
 
 TOKENS: Final = Tokens.create()
 
+# Every directive line contains this, so files without it can be skipped undecoded.
+_MARKER: Final = TOKENS.tyranno_inline
+_MARKER_BYTES: Final = _MARKER.encode()
+
 Suffix = NewType("Suffix", str)
 
 
@@ -131,6 +144,10 @@ class DeltaBlock:
     def last_line_number(self) -> int:
         return self.first_line_number + len(self)
 
+    @property
+    def is_modified(self) -> bool:
+        return list(self.old_lines) != list(self.new_lines)
+
     @property
     def n_lines_differ(self) -> int:
         return sum(o != n for o, n in zip(self.old_lines, self.new_lines, strict=False))
@@ -155,20 +172,34 @@ class SyncHelper:
 
     After calling [run][], inspect [new_lines][] for the output content and
     [hits][] for a summary of what changed.
+    If the file does not contain the `::tyranno::` marker at all, [has_markers][] is `False`,
+    and the file is neither decoded nor split unless [new_lines][] is accessed.
+
+    For very large files, call [stream][] instead of [run][].
+    It writes the output as it reads the input, holding only directive windows in memory.
     """
 
     context: Context
     path: Path
     _pattern: Pattern[str] = field(init=False)
-    _new_lines: list[str] = field(default_factory=list, init=False)
+    _raw: bytes = field(default=b"", init=False, repr=False)
+    _has_markers: bool = field(default=False, init=False)
+    _new_lines: list[str] | None = field(default=None, init=False)
     _hits: list[DeltaBlock] = field(default_factory=list, init=False)
 
     def __post_init__(self) -> None:
         tokens = _COMMENTS[Suffix(self.path.suffix or self.path.name)]
         self._pattern = TOKENS.inline_regex(tokens.start, tokens.end)
 
+    @property
+    def has_markers(self) -> bool:
+        return self._has_markers
+
     @property
     def new_lines(self) -> list[str]:
+        """The output lines; not populated by [stream][]."""
+        if self._new_lines is None:
+            return self._raw.decode("utf-8").splitlines()
         return self._new_lines
 
     @property
@@ -177,36 +208,81 @@ class SyncHelper:
 
     def run(self) -> None:
         """Process the file line-by-line, expanding `::tyranno::` expressions."""
-        lines = self.path.read_text(encoding="utf-8").splitlines()
-        result: list[str] = []
-        i = 0
-        while i < len(lines):
-            m = self._pattern.fullmatch(lines[i].rstrip())
+        raw = self.path.read_bytes()
+        if _MARKER_BYTES not in raw:
+            self._raw = raw
+            return
+        self._has_markers = True
+        self._new_lines = list(self._substitute(raw.decode("utf-8").splitlines()))
+
+    def templates(self) -> Generator[str]:
+        """Yields the template of each `::tyranno::` directive line, without substituting.
+
+        Like [stream][], this reads the file lazily, decoding only lines with the marker.
+        """
+        if not self._mapped_has_marker():
+            return
+        with self.path.open("rb") as f:
+            for raw in f:
+                if _MARKER_BYTES not in raw:
+                    continue
+                # `splitlines`, since `run` also splits on `\r` and other separators.
+                for line in raw.decode("utf-8").splitlines():
+                    if m := self._match(line):
+                        yield m.group("line").strip()
+
+    def stream(self, out: TextIO) -> None:
+        """Like [run][], but writes each output line to `out` instead of to [new_lines][].
+
+        The marker check runs on a memory map, and the file is then read lazily,
+        so memory use does not grow with the file size.
+        If the file has no markers, nothing is written.
+        """
+        if not self._mapped_has_marker():
+            return
+        self._has_markers = True
+        with self.path.open(encoding="utf-8") as f:
+            lines = (line.removesuffix("\n") for line in f)
+            out.writelines(line + "\n" for line in self._substitute(lines))
+
+    def _mapped_has_marker(self) -> bool:
+        # `mmap` refuses empty files, which trivially have no markers.
+        if not self.path.stat().st_size:
+            return False
+        with self.path.open("rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            return mapped.find(_MARKER_BYTES) >= 0
+
+    def _substitute(self, lines: Iterable[str]) -> Generator[str]:
+        """Yields the output lines, recording a [DeltaBlock][] in [hits][] per directive window."""
+        numbered = enumerate(lines)
+        lookahead: tuple[int, str] | None = None
+        while (current := lookahead or next(numbered, None)) is not None:
+            lookahead = None
+            first_line, line = current
+            m = self._match(line)
             if not m:
-                result.append(lines[i])
-                i += 1
+                yield line
                 continue
 
             # Collect consecutive ::tyranno:: comment lines.
-            first_line = i
-            header_lines: list[str] = [lines[i]]
+            header_lines: list[str] = [line]
             expressions: list[str] = [m.group("line").strip()]
-            i += 1
-            while i < len(lines):
-                m2 = self._pattern.fullmatch(lines[i].rstrip())
+            for following in numbered:
+                m2 = self._match(following[1])
                 if not m2:
+                    lookahead = following
                     break
-                header_lines.append(lines[i])
+                header_lines.append(following[1])
                 expressions.append(m2.group("line").strip())
-                i += 1
 
             # Keep the ::tyranno:: comment lines verbatim.
-            result.extend(header_lines)
+            yield from header_lines
 
             # Consume old content lines (one per template) and emit new ones.
             n = len(expressions)
-            old_lines: MutableSequence[str] = lines[i : i + n]
-            i += n
+            old_lines: MutableSequence[str] = [lookahead[1]] if lookahead else []
+            lookahead = None
+            old_lines += [old for _, old in islice(numbered, n - len(old_lines))]
             new_lines: MutableSequence[str] = []
             content_start = first_line + len(header_lines) + 1  # 1-based line number
             for idx, expr in enumerate(expressions):
@@ -215,43 +291,338 @@ class SyncHelper:
                 except ExpressionError as e:
                     logger.error(f"{self.path}:{content_start + idx}: {e}")
                     new_lines.append(old_lines[idx] if idx < len(old_lines) else "")
-            result.extend(new_lines)
+            yield from new_lines
 
             self._hits.append(
                 DeltaBlock("inline", self.path, first_line, expressions, old_lines, new_lines)
             )
 
-        self._new_lines = result
+    def _match(self, line: str) -> re.Match[str] | None:
+        # The substring test is far cheaper than the regex and rules out almost every line.
+        if _MARKER not in line:
+            return None
+        return self._pattern.fullmatch(line.rstrip())
+
+
+def _sha256(path: Path) -> str:
+    # Hashed in chunks, so that streamed targets are never read into memory whole.
+    with path.open("rb") as f:
+        return hashlib.file_digest(f, "sha256").hexdigest()
+
+
+class ManifestEntry(NamedTuple):
+    """The state of a target file immediately after it was synced.
+
+    `keys` are the data keys its templates read (see [Data.dependencies][]), or `None` if unknown.
+    """
+
+    size: int
+    mtime_ns: int
+    sha256: str
+    data_sha256: str
+    keys: tuple[str, ...] | None = None
+
+    @classmethod
+    def of(cls, path: Path, data_sha256: str, keys: Iterable[str] | None = None) -> Self:
+        digest = _sha256(path)
+        stat = path.stat()
+        keys = None if keys is None else tuple(sorted(keys))
+        return cls(stat.st_size, stat.st_mtime_ns, digest, data_sha256, keys)
+
+    @classmethod
+    def from_json(cls, values: list) -> Self:
+        size, mtime_ns, sha256, data_sha256, *rest = values
+        keys = tuple(rest[0]) if rest and rest[0] is not None else None
+        return cls(size, mtime_ns, sha256, data_sha256, keys)
+
+
+@dataclass(slots=True)
+class SyncManifest:
+    """Records each target's state after syncing so that up-to-date targets can be skipped.
+
+    A target is up to date if its size and mtime are unchanged or, failing the mtime check,
+    its SHA-256 hash is, **and** its output can't have changed with the data (see [Data.digest][]).
+    That is the case if it was last synced against the current data or, if it was synced against
+    the data as of the last save, none of the data keys it reads have changed since.
+    To find the changed keys, the manifest keeps a [Data.snapshot][] and diffs it with the current
+    one (see [DotTrees.diff][]).
+    Manifests written by a different version of Tyranno are discarded.
+
+    Attributes:
+        path: The JSON file, normally [Context.manifest_path][].
+        data_sha256: The digest of the data targets are being synced against.
+        entries: Maps repo-relative POSIX paths to entries.
+        data: The snapshot of the data targets are being synced against.
+        saved_sha256: The digest of the data when the manifest was last saved, if known.
+        changed: The `.`-delimited keys of the leaves that changed since then.
+    """
+
+    path: Path
+    data_sha256: str
+    entries: dict[str, ManifestEntry] = field(default_factory=dict)
+    data: dict[str, Any] = field(default_factory=dict)
+    saved_sha256: str | None = None
+    changed: frozenset[str] = frozenset()
+    _changed_branches: frozenset[str] = field(default=frozenset(), init=False, repr=False)
+
+    def __post_init__(self) -> None:
+        # Every branch containing a changed leaf, including the root (`""`).
+        self._changed_branches = frozenset(
+            k[:i] for k in self.changed for i, c in enumerate(k) if c == "."
+        ) | ({""} if self.changed else set())
+
+    @classmethod
+    def load(cls, path: Path, data: Data) -> Self:
+        digest, snapshot = data.digest(), data.snapshot()
+        try:
+            raw = json.loads(path.read_text(encoding="utf-8"))
+        except FileNotFoundError:
+            return cls(path, digest, data=snapshot)
+        except (OSError, ValueError) as e:
+            logger.warning(f"Ignoring unreadable sync manifest {path}: {e}")
+            return cls(path, digest, data=snapshot)
+        if raw.get("version") != __about__["version"]:
+            logger.debug(f"Ignoring sync manifest {path} from Tyranno v{raw.get('version')}")
+            return cls(path, digest, data=snapshot)
+        entries = {k: ManifestEntry.from_json(v) for k, v in raw.get("files", {}).items()}
+        saved_sha256 = raw.get("data_sha256")
+        changed: set[str] = set()
+        if saved_sha256 is not None and saved_sha256 != digest:
+            changed = {change.key for change in DotTrees.diff(raw.get("data", {}), snapshot)}
+            logger.debug(f"{len(changed)} data leaves changed since the last sync")
+            if not changed:
+                # The snapshot misses whatever changed, so assume that everything did.
+                logger.debug("Data changed outside the saved snapshot; re-syncing all targets")
+                saved_sha256 = None
+        return cls(path, digest, entries, snapshot, saved_sha256, frozenset(changed))
+
+    def is_current(self, key: str, target: Path) -> bool:
+        entry = self.entries.get(key)
+        if entry is None or not self._is_data_current(entry):
+            return False
+        try:
+            stat = target.stat()
+        except FileNotFoundError:
+            return False
+        if stat.st_size != entry.size:
+            return False
+        if stat.st_mtime_ns == entry.mtime_ns:
+            return True
+        # Touched but not necessarily modified (e.g. by `git checkout`).
+        return _sha256(target) == entry.sha256
+
+    def refreshed(self, key: str) -> ManifestEntry:
+        """Returns the entry for a current target, marked as synced against the current data."""
+        return self.entries[key]._replace(data_sha256=self.data_sha256)
+
+    def _is_data_current(self, entry: ManifestEntry) -> bool:
+        if entry.data_sha256 == self.data_sha256:
+            return True
+        if entry.keys is None or entry.data_sha256 != self.saved_sha256:
+            return False
+        # A key is affected by a changed leaf at, under, or above it.
+        for dep in entry.keys:
+            if dep in self.changed or dep in self._changed_branches:
+                return False
+            if any(dep[:i] in self.changed for i, c in enumerate(dep) if c == "."):
+                return False
+        return True
+
+    def record(self, key: str, entry: ManifestEntry | None) -> None:
+        """Records `entry` for `key`, or forgets `key` if `entry` is `None`."""
+        if entry is None:
+            self.entries.pop(key, None)
+        else:
+            self.entries[key] = entry
+
+    def save(self) -> None:
+        data = {
+            "version": __about__["version"],
+            "data_sha256": self.data_sha256,
+            "data": self.data,
+            "files": {k: list(v) for k, v in sorted(self.entries.items())},
+        }
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        temp_file = self.path.with_name(f".~{self.path.name}.temp")
+        try:
+            temp_file.write_text(
+                json.dumps(data, indent=2, ensure_ascii=False) + "\n", encoding="utf-8"
+            )
+            shutil.move(str(temp_file), str(self.path))
+        finally:
+            temp_file.unlink(missing_ok=True)
+
+
+class SyncOutcome(NamedTuple):
+    """The result of syncing one target.
+
+    `hits` is `None` if the target was skipped as up to date,
+    and `entry` is `None` if the manifest should not record the target (so that it's never skipped).
+    `is_modified` is `True` iff any generated line differs from the original.
+    """
+
+    path: Path
+    hits: list[DeltaBlock] | None
+    entry: ManifestEntry | None
+    is_modified: bool = False
 
 
 @dataclass(frozen=True, slots=True)
 class Syncer:
-    """Entry point that syncs files."""
+    """Entry point that syncs files.
+
+    Attributes:
+        jobs: Maximum number of files to process concurrently.
+          Files are processed on a thread pool so that the parsed [Context][] is shared, not copied.
+          Results are still logged in the order of [Context.find_targets][].
+        incremental: Skip targets that the [SyncManifest][] reports as up to date;
+          i.e. that are unchanged and read no data keys that changed since they were synced.
+          The manifest is updated either way.
+          Targets with impure templates (e.g. that read the time or call network functions)
+          are never skipped, since their output can change without the data changing.
+        rewrite_unchanged: Rewrite targets even if no generated line differs.
+          By default, such targets are not touched, preserving their mtimes (and build caches).
+        stream_threshold: Targets of at least this many bytes are processed via
+          [SyncHelper.stream][], which writes straight to the temp file in constant memory.
+
+    Before processing, network calls needed by any target are made concurrently
+    (see [NetworkCalls][]).
+    """
 
     context: Context
     backup: bool = False
+    jobs: int = 1
+    incremental: bool = True
+    rewrite_unchanged: bool = False
+    stream_threshold: int = 64 * 1024 * 1024
 
     def run(self) -> None:
-        for path in self.context.find_targets():
-            suffix = Suffix(path.suffix or path.name)
-            if suffix not in _COMMENTS:
-                logger.debug(f"Skipping {path}: no comment tokens defined for suffix '{suffix}'")
-                continue
-            self.run_on(path)
+        paths = [path for path in self.context.find_targets() if self._is_syncable(path)]
+        manifest = SyncManifest.load(self.context.manifest_path, self.context.data)
+        current = self._current(paths, manifest)
+        self._prefetch([path for path in paths if path not in current])
+        process = partial(self._process, manifest=manifest, current=current)
+        if self.jobs <= 1 or len(paths) <= 1:
+            self._finish(map(process, paths), manifest)
+            return
+        with ThreadPoolExecutor(max_workers=self.jobs, thread_name_prefix="tyranno-sync") as pool:
+            # `map` yields in submission order, so log lines are deterministic.
+            self._finish(pool.map(process, paths), manifest)
 
     def run_on(self, path: Path) -> None:
+        outcome = self._process(path, manifest=None)
+        self._log(path, outcome.hits or [])
+
+    def _finish(self, outcomes: Iterable[SyncOutcome], manifest: SyncManifest) -> None:
+        n_modified = n_unmodified = n_current = 0
+        for path, hits, entry, is_modified in outcomes:
+            if hits is None:
+                logger.info(f"Skipped {path}: up to date")
+                n_current += 1
+            else:
+                self._log(path, hits)
+                n_modified += is_modified
+                n_unmodified += not is_modified
+            manifest.record(self._manifest_key(path), entry)
+        if not self.context.dry_run:
+            manifest.save()
+        unmodified_msg = "rewritten" if self.rewrite_unchanged else "left untouched"
+        logger.info(
+            f"Synced {n_modified + n_unmodified + n_current} targets: {n_modified} modified,"
+            f" {n_unmodified} unmodified ({unmodified_msg}), {n_current} already up to date"
+        )
+
+    def _current(self, paths: list[Path], manifest: SyncManifest) -> frozenset[Path]:
+        """Returns the targets to skip as up to date; checked once, since it may hash them."""
+        if not self.incremental:
+            return frozenset()
+        return frozenset(p for p in paths if manifest.is_current(self._manifest_key(p), p))
+
+    def _prefetch(self, paths: list[Path]) -> None:
+        """Concurrently makes the network calls that the targets to process will need."""
+        data = self.context.data
+        if data.network is None:
+            return
+        calls = [
+            call
+            for path in paths
+            for template in SyncHelper(self.context, path).templates()
+            for call in data.network_calls(template)
+        ]
+        if n := data.network.prefetch(calls):
+            logger.info(f"Prefetched {n} network calls")
+
+    def _is_syncable(self, path: Path) -> bool:
+        suffix = Suffix(path.suffix or path.name)
+        if suffix not in _COMMENTS:
+            logger.debug(f"Skipping {path}: no comment tokens defined for suffix '{suffix}'")
+            return False
+        return True
+
+    def _manifest_key(self, path: Path) -> str:
+        return path.relative_to(self.context.repo_dir).as_posix()
+
+    def _process(
+        self, path: Path, *, manifest: SyncManifest | None, current: frozenset[Path] = frozenset()
+    ) -> SyncOutcome:
+        if manifest is not None and path in current:
+            return SyncOutcome(path, None, manifest.refreshed(self._manifest_key(path)))
         helper = SyncHelper(self.context, path)
+        if path.stat().st_size >= self.stream_threshold:
+            return self._process_streaming(helper, manifest=manifest)
         helper.run()
-        if not self.context.dry_run:
+        is_modified = any(hit.is_modified for hit in helper.hits)
+        if self.context.dry_run:
+            return SyncOutcome(path, helper.hits, None, is_modified)
+        # Without markers, there's nothing to substitute, even when rewriting.
+        if is_modified or self.rewrite_unchanged and helper.has_markers:
             self._save(path, helper.new_lines)
-        self._log(path, helper.hits)
+        return SyncOutcome(path, helper.hits, self._entry(helper, manifest), is_modified)
+
+    def _process_streaming(
+        self, helper: SyncHelper, *, manifest: SyncManifest | None
+    ) -> SyncOutcome:
+        path = helper.path
+        if self.context.dry_run:
+            with Path(os.devnull).open("w", encoding="utf-8") as out:
+                helper.stream(out)
+            return SyncOutcome(path, helper.hits, None, any(h.is_modified for h in helper.hits))
+        temp_file = self._temp_path(path)
+        try:
+            with temp_file.open("w", encoding="utf-8") as out:
+                helper.stream(out)
+            is_modified = any(hit.is_modified for hit in helper.hits)
+            if is_modified or self.rewrite_unchanged and helper.has_markers:
+                self._backup(path)
+                shutil.move(str(temp_file), str(path))
+        finally:
+            temp_file.unlink(missing_ok=True)
+        return SyncOutcome(path, helper.hits, self._entry(helper, manifest), is_modified)
+
+    def _entry(self, helper: SyncHelper, manifest: SyncManifest | None) -> ManifestEntry | None:
+        """Returns the manifest entry for a target just processed, with the keys it depends on.
+
+        Returns `None` if any template is impure (see [Data.is_pure][]);
+        i.e. reads the time or the network, whose results aren't tracked.
+        """
+        if manifest is None:
+            return None
+        data = self.context.data
+        templates = [t for hit in helper.hits for t in hit.templates]
+        if not all(data.is_pure(t) for t in templates):
+            return None
+        keys = {k for t in templates for k in data.dependencies(t)}
+        return ManifestEntry.of(helper.path, manifest.data_sha256, keys)
 
     def _save(self, path: Path, lines: list[str]) -> None:
+        self._backup(path)
+        self._write(path, lines)
+
+    def _backup(self, path: Path) -> None:
         if self.backup:
             bak_path = self.context.bak_path(path)
             bak_path.parent.mkdir(parents=True, exist_ok=True)
             shutil.copyfile(path, bak_path)
-        self._write(path, lines)
 
     def _log(self, path: Path, hits: list[DeltaBlock]) -> None:
         for hit in hits:
@@ -267,9 +638,12 @@ class Syncer:
 
     def _write(self, path: Path, lines: list[str]) -> None:
         content = "\n".join(lines) + "\n"
-        temp_file = path.with_name(f".~{path.name}.temp")
+        temp_file = self._temp_path(path)
         try:
             temp_file.write_text(content, encoding="utf-8")
             shutil.move(str(temp_file), str(path))
         finally:
             temp_file.unlink(missing_ok=True)
+
+    def _temp_path(self, path: Path) -> Path:
+        return path.with_name(f".~{path.name}.temp")
@@ -0,0 +1,124 @@
+# SPDX-FileCopyrightText: Copyright 2020-2026, Contributors to Tyrannosaurus
+# SPDX-PackageHomePage: https://github.com/dmyersturnbull/tyrannosaurus
+# SPDX-License-Identifier: Apache-2.0
+
+"""Binary snapshots of parsed TOML files, so that unchanged files are not re-parsed."""
+
+from __future__ import annotations
+
+import hashlib
+import os
+import pickle
+import threading
+import tomllib
+from dataclasses import dataclass
+from datetime import date, datetime, time, timedelta, timezone
+from typing import TYPE_CHECKING, Final, Self
+
+from loguru import logger
+
+from tyranno_sandbox._about import __about__
+from tyranno_sandbox.dot_tree import DotTree
+
+if TYPE_CHECKING:
+    from pathlib import Path
+
+    from tyranno_sandbox.dot_tree import TomlBranch
+    from tyranno_sandbox.global_vars import GlobalVars
+
+__all__ = ["TreeCache"]
+
+_MAGIC: Final = b"TYRTREE1"
+_HEADER: Final = _MAGIC + __about__["version"].encode() + b"\n"
+
+# The only classes a snapshot may contain, besides the builtin containers and scalars.
+_ALLOWED: Final = {
+    ("datetime", cls.__name__): cls for cls in (date, datetime, time, timedelta, timezone)
+}
+
+
+class _Unpickler(pickle.Unpickler):  # noqa: S301  # restricted by `find_class`
+    """Refuses to load anything but TOML data, so a tampered snapshot can't run code."""
+
+    def find_class(self, module: str, name: str) -> type:
+        if (cls := _ALLOWED.get((module, name))) is None:
+            msg = f"Forbidden class {module}.{name} in snapshot"
+            raise pickle.UnpicklingError(msg)
+        return cls
+
+
+@dataclass(frozen=True, slots=True)
+class TreeCache:
+    """Caches the checked [DotTree][] of a TOML file in `directory`, keyed by the file's hash.
+
+    A snapshot is a pickle of the nested dict, which keeps the TOML `date`, `datetime`,
+    and `time` types, and which loads much faster than `tomllib` plus [DotDictChecker][].
+    Only the latest snapshot of each file is kept.
+    Snapshots from another Tyranno version are ignored, and failures to read or write
+    one only cost a re-parse.
+
+    Attributes:
+        directory: Where snapshots are stored.
+    """
+
+    directory: Path
+
+    @classmethod
+    def of(cls, env: GlobalVars) -> Self:
+        return cls(env.cache_dir / "trees")
+
+    def load_toml(self, path: Path) -> DotTree:
+        """Returns the tree of the TOML file `path`, parsing and checking it only if it changed.
+
+        Raises:
+            OSError: If `path` can't be read.
+            tomllib.TOMLDecodeError: If `path` is not valid TOML.
+            ValueError | TypeError: As for [DotTree.from_nested][].
+        """
+        data = path.read_bytes()
+        snapshot = self._snapshot_path(path, hashlib.sha256(data).hexdigest())
+        try:
+            return DotTree(self._read(snapshot))
+        except FileNotFoundError:
+            logger.debug(f"No snapshot of {path}; parsing it")
+        except Exception as e:  # noqa: BLE001  # a corrupt pickle can raise nearly anything
+            logger.debug(f"Ignoring unreadable snapshot {snapshot}: {e}")
+        tree = DotTree.from_nested(tomllib.loads(data.decode("utf-8")))
+        try:
+            self._write(snapshot, tree)
+        except OSError as e:
+            logger.debug(f"Could not write snapshot {snapshot}: {e}")
+        return tree
+
+    def _snapshot_path(self, path: Path, sha256: str) -> Path:
+        # Named by source path then content, so that older snapshots of a file can be found.
+        source = hashlib.sha256(str(path.resolve()).encode()).hexdigest()[:16]
+        return self.directory / f"{source}-{sha256}.pickle"
+
+    def _read(self, snapshot: Path) -> TomlBranch:
+        with snapshot.open("rb") as f:
+            if f.read(len(_HEADER)) != _HEADER:
+                msg = "Not a snapshot from this version"
+                raise ValueError(msg)
+            raw = _Unpickler(f).load()
+        if not isinstance(raw, dict):
+            msg = f"Snapshot is a {type(raw)}, not a dict"
+            raise TypeError(msg)
+        return raw
+
+    def _write(self, snapshot: Path, tree: DotTree) -> None:
+        self.directory.mkdir(parents=True, exist_ok=True)
+        data = _HEADER + pickle.dumps(dict(tree), protocol=pickle.HIGHEST_PROTOCOL)
+        # Unique per thread and process, since several may snapshot the same file.
+        temp_file = snapshot.with_name(
+            f".~{snapshot.name}.{os.getpid()}.{threading.get_ident()}.temp"
+        )
+        try:
+            temp_file.write_bytes(data)
+            temp_file.replace(snapshot)
+        finally:
+            temp_file.unlink(missing_ok=True)
+        source = snapshot.name.partition("-")[0]
+        for old in self.directory.glob(f"{source}-*.pickle"):
+            if old != snapshot:
+                old.unlink(missing_ok=True)
@@ -8,7 +8,8 @@ from __future__ import annotations
 
 import json
 from datetime import datetime
-from typing import TYPE_CHECKING, Any, Final
+from functools import cache
+from typing import TYPE_CHECKING, Any, Final, cast
 
 import yaml as _yaml_lib
 
@@ -16,14 +17,19 @@ from tyranno_sandbox import Json
 from tyranno_sandbox._core import Yaml
 from tyranno_sandbox.functions.pep440 import Pep440Dict, Pep440Functions
 from tyranno_sandbox.functions.semver import SemverDict, SemverFunctions
-from tyranno_sandbox.functions.times import DatetimeFunctions, TimeDict
+from tyranno_sandbox.functions.times import DatetimeFunctions, LazyTimeDict, TimeDict
 from tyranno_sandbox.global_vars import STARTUP
 
 if TYPE_CHECKING:
     from collections.abc import Callable
 
+    from tyranno_sandbox.functions import Functions
+    from tyranno_sandbox.functions.licenses import LicenseDict
+
 __all__ = [
     "FUNCS",
+    "NETWORK_FUNCS",
+    "PURE_FUNCS",
     "SOURCE_FUNCS",
     "from_json",
     "from_yaml",
@@ -32,10 +38,13 @@ __all__ = [
     "now_local",
     "now_utc",
     "pep440",
+    "pep440_find_for_spec",
     "pep440_minor",
+    "pypi_versions",
     "replace",
     "semver",
     "sort",
+    "spdx_license",
     "timestamp",
     "upper",
     "yaml",
@@ -48,27 +57,53 @@ FUNCS: Final[dict[str, Callable[..., Any]]] = {}
 # Maps name → callable(*extra_args: str) → Any  (produces a value; ignores pipeline input)
 SOURCE_FUNCS: Final[dict[str, Callable[..., Any]]] = {}
 
+# Maps name → callable(functions: Functions, value: str, *extra_args: str) → Any
+# These need the network, so they're called through `Data.network` (see `prefetch.py`).
+NETWORK_FUNCS: Final[dict[str, Callable[..., Any]]] = {}
+
+# Names in FUNCS or SOURCE_FUNCS whose results depend only on their args; not on the time or network.
+# Expressions that only call these can be memoized (see `Data.expand_var`),
+# and their output only changes with the keys they read (see `Data.dependencies`).
+PURE_FUNCS: Final[set[str]] = set()
+
 _f_time: Final = DatetimeFunctions()
 _f_pep440: Final = Pep440Functions()
 _f_semver: Final = SemverFunctions()
 
 
 def _func(name: str) -> Callable[[Callable], Callable]:
+    # Transforms only see their input, so they're all pure.
     def decorator(fn: Callable) -> Callable:
         FUNCS[name] = fn
+        PURE_FUNCS.add(name)
         return fn
 
     return decorator
 
 
-def _source(name: str) -> Callable[[Callable], Callable]:
+def _source(name: str, *, pure: bool = True) -> Callable[[Callable], Callable]:
     def decorator(fn: Callable) -> Callable:
         SOURCE_FUNCS[name] = fn
+        if pure:
+            PURE_FUNCS.add(name)
+        return fn
+
+    return decorator
+
+
+def _network(name: str) -> Callable[[Callable], Callable]:
+    # Never pure: results depend on the index queried (though `NetworkCalls` caches them per run).
+    def decorator(fn: Callable) -> Callable:
+        NETWORK_FUNCS[name] = fn
         return fn
 
     return decorator
 
 
+# Dump lazy dicts as plain mappings rather than as tagged Python objects.
+_yaml_lib.add_representer(LazyTimeDict, lambda dumper, d: dumper.represent_dict(dict(d)))
+
+
 def _yaml_dump(value: Any) -> str:
     raw = _yaml_lib.dump(value, allow_unicode=True, default_flow_style=False)
     return raw.strip().removesuffix("...").strip()
@@ -76,15 +111,20 @@ def _yaml_dump(value: Any) -> str:
 
 # ── Source functions ──────────────────────────────────────────────────────────
 
+# Not pure, since the time differs between runs.
+# Within a run, `STARTUP` is fixed, so each returns the same lazily computed instance every time.
+
 
-@_source("now_utc")
+@_source("now_utc", pure=False)
+@cache
 def now_utc() -> TimeDict:
-    return _f_time.of(STARTUP.utc)
+    return cast("TimeDict", _f_time.lazy(STARTUP.utc))
 
 
-@_source("now_local")
+@_source("now_local", pure=False)
+@cache
 def now_local() -> TimeDict:
-    return _f_time.of(STARTUP.local)
+    return cast("TimeDict", _f_time.lazy(STARTUP.local))
 
 
 # ── Transform functions ───────────────────────────────────────────────────────
@@ -148,7 +188,7 @@ def semver(value: str) -> SemverDict:
 
 @_func("timestamp")
 def timestamp(value: str) -> TimeDict:
-    return _f_time.of(datetime.fromisoformat(value))
+    return cast("TimeDict", _f_time.lazy(datetime.fromisoformat(value)))
 
 
 @_func("sort")
@@ -165,3 +205,21 @@ def sort(value: Any) -> str:
 def join(value: Any, sep: str = ", ") -> str:
     items = value if isinstance(value, list) else [i.strip() for i in str(value).split(",")]
     return sep.join(str(i) for i in items)
+
+
+# ── Network functions ─────────────────────────────────────────────────────────
+
+
+@_network("pypi_versions")
+def pypi_versions(functions: Functions, value: str) -> list[str]:
+    return sorted(functions.pypi_versions(value))
+
+
+@_network("pep440_find_for_spec")
+def pep440_find_for_spec(functions: Functions, value: str) -> list[str]:
+    return functions.pep440_find_for_spec(value)
+
+
+@_network("spdx_license")
+def spdx_license(functions: Functions, value: str) -> LicenseDict:
+    return functions.spdx_license(value)
@@ -0,0 +1,243 @@
+# SPDX-FileCopyrightText: Copyright 2020-2026, Contributors to Tyrannosaurus
+# SPDX-PackageHomePage: https://github.com/dmyersturnbull/tyrannosaurus
+# SPDX-License-Identifier: Apache-2.0
+
+"""Micro-benchmarks comparing optimized code paths against their slower equivalents.
+
+Run with `pytest -m slow tests/test_benchmarks.py --log-cli-level=INFO` to see the speedups.
+"""
+
+import timeit
+import tomllib
+from typing import TYPE_CHECKING
+
+import pytest
+from jsonpath_ng.ext import parse as jsonpath_parse
+from tests import logger
+
+from tyranno_sandbox.dot_tree import DottedToNested, DotTree, DotTrees, KeyPath, LayeredDotTree
+from tyranno_sandbox.functions.semver import SemverIndex, compile_range
+from tyranno_sandbox.tree_cache import TreeCache
+
+if TYPE_CHECKING:
+    from collections.abc import Callable
+    from pathlib import Path
+
+pytestmark = pytest.mark.slow
+
+
+def _speedup(name: str, baseline: Callable[[], object], optimized: Callable[[], object]) -> float:
+    """Returns how many times faster `optimized` is, taking the best of several repeats."""
+    assert baseline() == optimized()
+    t_baseline = min(timeit.repeat(baseline, number=200, repeat=5))
+    t_optimized = min(timeit.repeat(optimized, number=200, repeat=5))
+    speedup = t_baseline / t_optimized
+    logger.info("%s: %.1fx faster (%.2g s → %.2g s)", name, speedup, t_baseline, t_optimized)
+    return speedup
+
+
+@pytest.fixture(scope="module")
+def tree() -> DotTree:
+    authors = [{"name": f"author-{i}", "email": f"{i}@example.com"} for i in range(50)]
+    return DotTree.from_nested(
+        {"project": {"name": "bench", "authors": authors, "urls": {"Release Notes": "x"}}}
+    )
+
+
+class TestQueryBenchmark:
+    @pytest.mark.parametrize(
+        "path", ["$.project.authors[*].name", "$.project.urls.'Release Notes'"]
+    )
+    def test_query_vs_jsonpath_ng(self, tree: DotTree, path: str) -> None:
+        compiled = jsonpath_parse(path)
+        speedup = _speedup(
+            f"query({path})",
+            lambda: [m.value for m in compiled.find(dict(tree))],
+            lambda: tree.query(path),
+        )
+        assert speedup > 1
+
+
+def _split_access(raw: dict, keys: str) -> object:
+    """`DotTree._access` before `KeyPath`, splitting `keys` on every call."""
+    x: object = raw
+    split = keys.split(".")
+    for i, k in enumerate(split):
+        if not isinstance(x, dict):
+            msg = (
+                f"Value at key '{'.'.join(split[:i])}<<{k}>>{keys[i + 1 :]}'"
+                f" is a {type(x)}, not an object."
+            )
+            raise TypeError(msg)
+        try:
+            x = x[k]
+        except KeyError:
+            msg = f"No such key '{'.'.join(split[:i])}<<{k}>>{keys[i + 1 :]}'."
+            raise KeyError(msg) from None
+    return x
+
+
+class TestKeyPathBenchmark:
+    def test_key_path_vs_split(self, tree: DotTree) -> None:
+        keys = ["project.name", "project.urls.Release Notes", "project.authors"] * 10
+        paths = [KeyPath.of(k) for k in keys]
+        raw = dict(tree)
+        speedup = _speedup(
+            "access(KeyPath)",
+            lambda: [_split_access(raw, k) for k in keys],
+            lambda: [tree.access(p) for p in paths],
+        )
+        assert speedup > 1
+
+
+class TestIndexedBenchmark:
+    def test_indexed_vs_traversal(self, tree: DotTree) -> None:
+        indexed = tree.indexed()
+        keys = ["project.name", "project.urls.Release Notes", "project.missing"] * 10
+        speedup = _speedup(
+            "DotTree.indexed",
+            lambda: (tree.leaves(), tree.limbs(), [tree.get(k) for k in keys]),
+            lambda: (indexed.leaves(), indexed.limbs(), [indexed.get(k) for k in keys]),
+        )
+        assert speedup > 1
+
+
+def _recursive_leaves(raw: dict) -> dict:
+    """`DotTree.leaves` before it was rebuilt on `iter_leaves`."""
+    dct = {}
+    for key, value in raw.items():
+        if isinstance(value, dict):
+            dct.update({key + "." + k: v for k, v in _recursive_leaves(value).items()})
+        else:
+            dct[key] = value
+    return dct
+
+
+class TestIterLeavesBenchmark:
+    def test_iter_leaves_vs_recursion(self) -> None:
+        def branch(depth: int) -> dict:
+            if depth == 0:
+                return {f"leaf{i}": i for i in range(4)}
+            return {f"k{i}": branch(depth - 1) for i in range(3)}
+
+        raw = branch(6)
+        tree = DotTree(raw)
+        speedup = _speedup("DotTree.leaves", lambda: _recursive_leaves(raw), tree.leaves)
+        assert speedup > 1
+
+
+def _nest_each(items: dict) -> dict:
+    """`DottedToNested` before its bulk builder."""
+    nester = DottedToNested()
+    out: dict = {}
+    for k, v in items.items():
+        nester._nest(out, k, v)  # noqa: SLF001
+    return out
+
+
+class TestDottedToNestedBenchmark:
+    @pytest.mark.parametrize(
+        ("shape", "items"),
+        [
+            ("wide", {f"section{i}.key{j}": j for i in range(50) for j in range(40)}),
+            ("deep", {".".join(f"k{d}" for d in range(8)) + f".leaf{i}": i for i in range(2000)}),
+        ],
+    )
+    def test_bulk_vs_one_at_a_time(self, shape: str, items: dict) -> None:
+        speedup = _speedup(
+            f"DottedToNested ({shape})", lambda: _nest_each(items), lambda: DottedToNested()(items)
+        )
+        assert speedup > 1
+
+
+def _flatten_merge(*trees: DotTree) -> DotTree:
+    """`DotTrees.merge_leaves` (with `"if_values_match"`) before it walked the trees together."""
+    limbs = [tree.leaves() for tree in trees]
+    intersect = DotTrees.leaf_intersection(*limbs)
+    assert not any(len({repr(x) for x in v}) > 1 for v in intersect.values())
+    merged = {}
+    for limb in limbs:
+        merged.update(limb)
+    return DotTree.from_dotted(merged)
+
+
+class TestMergeLeavesBenchmark:
+    def test_walk_vs_flatten(self) -> None:
+        shared = {f"section{i}": {f"key{j}": j for j in range(10)} for i in range(10)}
+        trees = [
+            DotTree({**shared, f"layer{n}": {f"key{j}": [n, j] for j in range(20)}})
+            for n in range(30)
+        ]
+        speedup = _speedup(
+            "DotTrees.merge_leaves",
+            lambda: _flatten_merge(*trees),
+            lambda: DotTrees.merge_leaves(*trees),
+        )
+        assert speedup > 1
+
+
+def _leaves_diff(a: DotTree, b: DotTree) -> list[str]:
+    old, new = a.leaves(), b.leaves()
+    return [k for k in old.keys() | new.keys() if old.get(k) != new.get(k)]
+
+
+class TestDiffBenchmark:
+    def test_diff_vs_leaves(self) -> None:
+        sections = {f"section{i}": {f"key{j}": [i, j] for j in range(50)} for i in range(40)}
+        old = DotTree({**sections, "project": {"version": "1.0"}})
+        new = DotTree({**sections, "project": {"version": "1.1"}})
+        speedup = _speedup(
+            "DotTrees.diff",
+            lambda: _leaves_diff(old, new),
+            lambda: [c.key for c in DotTrees.diff(old, new)],
+        )
+        assert speedup > 1
+
+
+class TestLayeredDotTreeBenchmark:
+    def test_lookups_vs_merge(self) -> None:
+        shared = {f"section{i}": {f"key{j}": j for j in range(10)} for i in range(10)}
+        trees = [
+            DotTree({**shared, f"layer{n}": {f"key{j}": [n, j] for j in range(20)}})
+            for n in range(30)
+        ]
+        keys = ["section3.key4", "layer7.key2", "section9"]
+        speedup = _speedup(
+            "LayeredDotTree",
+            lambda: [DotTrees.merge_leaves(*trees, replace="always").get(k) for k in keys],
+            lambda: [LayeredDotTree(*reversed(trees)).get(k) for k in keys],
+        )
+        assert speedup > 1
+
+
+class TestTreeCacheBenchmark:
+    def test_snapshot_vs_parse(self, tmp_path: Path) -> None:
+        tables = [
+            f'[tool.section{i}]\nname = "s{i}"\nsince = 2026-01-{i % 28 + 1:02}\n'
+            f'keys = ["a", "b", "c"]\nlimit = {i}\nenabled = true\n'
+            f"[tool.section{i}.nested]\nat = 12:00:00\nratio = 0.5\n\n"
+            for i in range(150)
+        ]
+        path = tmp_path / "pyproject.toml"
+        path.write_text("".join(tables), encoding="utf-8")
+        cache = TreeCache(tmp_path / "trees")
+        cache.load_toml(path)
+        speedup = _speedup(
+            "TreeCache.load_toml",
+            lambda: DotTree.from_nested(tomllib.loads(path.read_text(encoding="utf-8"))),
+            lambda: cache.load_toml(path),
+        )
+        assert speedup > 1
+
+
+class TestSemverRangeBenchmark:
+    def test_index_filter_vs_contains(self) -> None:
+        versions = [f"{a}.{b}.{c}" for a in range(5) for b in range(20) for c in range(20)]
+        index = SemverIndex.of(versions)
+        compiled = compile_range("^1.2 || ~3.4.5")
+        speedup = _speedup(
+            "SemverIndex.filter",
+            lambda: sorted(v for v in index.versions if v in compiled),
+            lambda: index.filter(compiled),
+        )
+        assert speedup > 1
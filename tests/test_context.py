@@ -8,10 +8,19 @@ from typing import TYPE_CHECKING
 
 import pytest
 
-from tyranno_sandbox.context import Context, Data, ExpressionError
+from tyranno_sandbox.context import (
+    CompiledExpression,
+    Context,
+    Data,
+    ExpressionError,
+    FuncCall,
+    Lookup,
+    compile_expression,
+)
 from tyranno_sandbox.dot_tree import DotTree
-from tyranno_sandbox.global_vars import GlobalVars
+from tyranno_sandbox.global_vars import STARTUP, GlobalVars
 from tyranno_sandbox.sync import SyncHelper
+from tyranno_sandbox.tyranno_functions import FUNCS, PURE_FUNCS
 
 if TYPE_CHECKING:
     from pathlib import Path
@@ -90,6 +99,22 @@ class TestExpandVarSimpleKeys:
         assert data.expand_var("") == ""
 
 
+class TestExpandVarJsonPath:
+    def test_index(self, data: Data) -> None:
+        assert data.expand_var("project.keywords[1]") == "beta"
+
+    def test_wildcard_takes_first_match(self, data: Data) -> None:
+        assert data.expand_var("$.project.keywords[*]") == "alpha"
+
+    def test_recursive_descent(self, data: Data) -> None:
+        assert data.expand_var("$..vendor") == "acme"
+        assert data.expand_var("$..Homepage") == "https://example.com/my-project"
+
+    def test_missing(self, data: Data) -> None:
+        with pytest.raises(ExpressionError, match="not found"):
+            data.expand_var("project.keywords[9]")
+
+
 class TestExpandVarPipeSyntax:
     def test_pipe_to_lower(self, data: Data) -> None:
         assert data.expand_var("project.name | lower(@)") == "my-project"
@@ -149,6 +174,91 @@ class TestExpandVarErrors:
             data.expand_var("now_utc().no_such_attr")
 
 
+class TestCompileExpression:
+    def test_chained(self) -> None:
+        plan = compile_expression("project.version.pep440(@).minor_version")
+        assert plan == CompiledExpression(
+            "project.version", (FuncCall("pep440", ()), Lookup("minor_version")), pipe=False
+        )
+
+    def test_pipe(self) -> None:
+        plan = compile_expression(" project.name | replace(@, '-', '_') ")
+        assert plan == CompiledExpression(
+            "project.name", (FuncCall("replace", ("-", "_")),), pipe=True
+        )
+
+    def test_source_call(self) -> None:
+        plan = compile_expression("now_utc().year")
+        assert plan == CompiledExpression(
+            None, (FuncCall("now_utc", ()), Lookup("year")), pipe=False, pure=False
+        )
+
+    def test_cached(self) -> None:
+        assert compile_expression("project.name") is compile_expression("project.name")
+
+
+class TestDependencies:
+    def test_keys(self, data: Data) -> None:
+        template = (
+            "$<<project.name>> $<<$.project.version.pep440(@).minor_version>> $<<.vendor | upper(@)>>"
+            " $<<@.frag>> $<<project.urls.*>> $<<$>> $<<$[0]>>"
+        )
+        assert data.dependencies(template) == {
+            "project.name",
+            "project.version",
+            "tool.tyranno.data.vendor",
+            "tool.tyranno.data.frag",
+            "project.urls",
+            "",
+        }
+
+    def test_in_key(self, data: Data) -> None:
+        assert data.dependencies("$<<.name>>", in_key="project") == {"project.name"}
+
+    @pytest.mark.parametrize("expr", ["now_utc().year", "project.name.pypi_versions(@)"])
+    def test_is_pure(self, data: Data, expr: str) -> None:
+        assert data.is_pure("plain $<<project.version>> $<<.vendor | upper(@)>>")
+        assert not data.is_pure(f"$<<project.version>> $<<{expr}>>")
+
+
+class TestMemoization:
+    @pytest.fixture
+    def calls(self, monkeypatch: pytest.MonkeyPatch) -> list[str]:
+        calls: list[str] = []
+
+        def count(value: str) -> str:
+            calls.append(value)
+            return value
+
+        monkeypatch.setitem(FUNCS, "test_pure", count)
+        monkeypatch.setitem(FUNCS, "test_impure", count)
+        monkeypatch.setattr("tyranno_sandbox.context.PURE_FUNCS", {*PURE_FUNCS, "test_pure"})
+        return calls
+
+    def test_pure_evaluated_once(self, data: Data, calls: list[str]) -> None:
+        for _ in range(5):
+            assert data.expand_var("project.name | test_pure(@)") == "my-project"
+        assert len(calls) == 1
+
+    def test_impure_evaluated_each_time(self, data: Data, calls: list[str]) -> None:
+        for _ in range(5):
+            assert data.expand_var("project.name | test_impure(@)") == "my-project"
+        assert len(calls) == 5
+
+    def test_registered_impure_not_memoized(self, data: Data) -> None:
+        assert {"now_utc", "now_local", "pypi_versions"}.isdisjoint(PURE_FUNCS)
+        assert not compile_expression("now_utc().year").pure
+        assert data.expand_var("now_utc().year") == str(STARTUP.utc.year)
+        assert data.expand_var("project.name | upper(@)") == "MY-PROJECT"
+        assert ("project.name | upper(@)", "") in data._memo  # noqa: SLF001
+        assert ("now_utc().year", "") not in data._memo  # noqa: SLF001
+
+    def test_keyed_by_in_key(self, data: Data) -> None:
+        assert data.expand_var(".vendor") == "acme"
+        with pytest.raises(ExpressionError, match="not found"):
+            data.expand_var(".vendor", in_key="project")
+
+
 class TestIntegration:
     def test_replace_vars_in_full_template(self, data: Data) -> None:
         template = 'name = "$<<project.name>>" version = "$<<project.version>>"'
@@ -0,0 +1,449 @@
+# SPDX-FileCopyrightText: Copyright 2020-2026, Contributors to Tyrannosaurus
+# SPDX-PackageHomePage: https://github.com/dmyersturnbull/tyrannosaurus
+# SPDX-License-Identifier: Apache-2.0
+
+"""Tests for the `dot_tree` module."""
+
+import re
+
+import pytest
+from jsonpath_ng.ext import parse as jsonpath_parse
+
+from tyranno_sandbox.dot_tree import (
+    DotDictChecker,
+    DottedToNested,
+    DotTree,
+    DotTrees,
+    DuplicateKeyError,
+    KeyPath,
+    KeyRegexError,
+    LayeredDotTree,
+    LeafChange,
+    LeafConflictError,
+    LeafIntersectionError,
+    QueryStep,
+    compile_query,
+)
+
+
+@pytest.fixture
+def tree() -> DotTree:
+    return DotTree.from_nested(
+        {
+            "project": {
+                "name": "my-project",
+                "authors": [{"name": "Kerri"}, {"name": "Henry", "email": "h@example.com"}],
+                "urls": {"Homepage": "https://example.com", "Release Notes": "https://x.com"},
+                "keywords": ["alpha", "beta"],
+            },
+            "matrix": [[1, 2], [3]],
+        }
+    )
+
+
+class TestCompileQuery:
+    def test_steps(self) -> None:
+        assert compile_query("$.project.urls.'Release Notes'") == (
+            QueryStep("key", "project"),
+            QueryStep("key", "urls"),
+            QueryStep("key", "Release Notes"),
+        )
+        assert compile_query("authors[*].name[-1]") == (
+            QueryStep("key", "authors"),
+            QueryStep("elements"),
+            QueryStep("key", "name"),
+            QueryStep("index", -1),
+        )
+
+    @pytest.mark.parametrize("path", ["$..name", "$.a[?(@.b > 1)]", "a[1:2]", "a b", "a.b["])
+    def test_unsupported(self, path: str) -> None:
+        assert compile_query(path) is None
+
+
+class TestQuery:
+    @pytest.mark.parametrize(
+        "path",
+        [
+            "$",
+            "$.project.name",
+            "project.name",
+            '$.project.urls."Release Notes"',
+            "$.project.urls['Release Notes']",
+            "$.project.authors[*].name",
+            "$.project.authors[1].email",
+            "$.project.authors[-1].name",
+            "$.project.keywords[*]",
+            "$.project.urls.*",
+            "$.project.urls[*]",
+            "$.matrix[*][0]",
+            "$.project.missing",
+            "$.project.keywords[5]",
+            "$.project.authors[?(@.email)].name",
+        ],
+    )
+    def test_matches_jsonpath_ng(self, tree: DotTree, path: str) -> None:
+        expected = [m.value for m in jsonpath_parse(path).find(dict(tree))]
+        assert tree.query(path) == expected
+
+    def test_index_does_not_select_characters(self, tree: DotTree) -> None:
+        assert tree.query("$.project.name[0]") == []
+
+
+class TestKeyPath:
+    def test_interned(self) -> None:
+        path = KeyPath.of("project.name")
+        assert path.parts == ("project", "name")
+        assert KeyPath.of("project.name") is path
+        assert KeyPath.of(path) is path
+        assert str(path) == "project.name"
+
+    def test_access(self, tree: DotTree) -> None:
+        assert tree.access(KeyPath.of("project.name")) == "my-project"
+        assert tree.get(KeyPath.of("project.urls.Homepage")) == "https://example.com"
+        assert tree.get_list_as(KeyPath.of("project.keywords"), as_type=str) == ["alpha", "beta"]
+        assert tree.get(KeyPath.of("project.nonexistent")) is None
+
+    def test_errors(self, tree: DotTree) -> None:
+        with pytest.raises(KeyError, match=r"No such key 'project<<nope>>'"):
+            tree.access("project.nope")
+        with pytest.raises(KeyError, match=r"No such key 'project.urls<<nope>>.x'"):
+            tree.access(KeyPath.of("project.urls.nope.x"))
+        with pytest.raises(TypeError, match=r"Value at key 'project.name<<x>>' is a"):
+            tree.access("project.name.x")
+        with pytest.raises(TypeError, match=r"Value at key 'matrix<<x>>' is a"):
+            tree.access("matrix.x")
+
+
+class TestIndexed:
+    def test_matches_unindexed(self, tree: DotTree) -> None:
+        tree["project"]["empty"] = {}  # ty:ignore[invalid-assignment]
+        indexed = tree.indexed()
+        assert indexed.indexed() is indexed
+        assert list(indexed.leaves().items()) == list(tree.leaves().items())
+        assert indexed.limbs() == tree.limbs()
+        for keys in ["project.name", "project.urls", "project.empty", "matrix", "project.x"]:
+            assert indexed.get(keys) == tree.get(keys)
+            assert indexed.has(keys) == tree.has(keys)
+        assert indexed.get_subtree("project.urls") == tree.get_subtree("project.urls")
+
+    def test_has(self, tree: DotTree) -> None:
+        indexed = tree.indexed()
+        for t in [tree, indexed]:
+            assert t.has("project.urls.Homepage")
+            assert t.has(KeyPath.of("project.urls"))
+            assert not t.has("project.name.x")
+            assert not t.has("project.urls.Homepage.x")
+            assert not t.has("")
+
+    def test_results_are_copies(self, tree: DotTree) -> None:
+        indexed = tree.indexed()
+        indexed.leaves()["project.name"] = "changed"
+        indexed.limbs()["project"]["name"] = "changed"
+        assert indexed.get("project.name") == "my-project"
+
+    def test_errors(self, tree: DotTree) -> None:
+        indexed = tree.indexed()
+        with pytest.raises(KeyError, match=r"No such key 'project.urls<<nope>>.x'"):
+            indexed.access("project.urls.nope.x")
+        with pytest.raises(TypeError, match=r"Value at key 'project.name<<x>>' is a"):
+            indexed.access("project.name.x")
+
+
+class TestIterLeaves:
+    def test_document_order(self, tree: DotTree) -> None:
+        assert list(tree.iter_leaves()) == [
+            ("project.name", "my-project"),
+            ("project.authors", tree["project"]["authors"]),  # ty:ignore[not-subscriptable]
+            ("project.urls.Homepage", "https://example.com"),
+            ("project.urls.Release Notes", "https://x.com"),
+            ("project.keywords", ["alpha", "beta"]),
+            ("matrix", [[1, 2], [3]]),
+        ]
+        assert list(tree.walk()) == [v for _, v in tree.iter_leaves()]
+        assert tree.limbs()["project.urls"] == {
+            "Homepage": "https://example.com",
+            "Release Notes": "https://x.com",
+        }
+
+    def test_deeper_than_recursion_limit(self) -> None:
+        raw: dict[str, object] = {"leaf": 1}
+        for _ in range(5000):
+            raw = {"k": raw, "x": 0}
+        tree = DotTree(raw)  # ty:ignore[invalid-argument-type]
+        leaves = tree.leaves()
+        assert len(leaves) == 5001
+        assert leaves[".".join(["k"] * 5000) + ".leaf"] == 1
+
+    def test_transform_leaves(self, tree: DotTree) -> None:
+        upper = tree.transform_leaves(lambda _, v: v.upper() if isinstance(v, str) else None)
+        assert upper.leaves() == {
+            "project.name": "MY-PROJECT",
+            "project.urls.Homepage": "HTTPS://EXAMPLE.COM",
+            "project.urls.Release Notes": "HTTPS://X.COM",
+        }
+
+
+def _nest_each(items: dict, *, merge_lists: bool = False) -> dict:
+    """Nests one key at a time, as `DottedToNested` did before its bulk builder."""
+    nester = DottedToNested(merge_lists=merge_lists)
+    out: dict = {}
+    for k, v in items.items():
+        nester._nest(out, k, v)  # noqa: SLF001
+    return out
+
+
+class TestDottedToNested:
+    @pytest.mark.parametrize(
+        "items",
+        [
+            {},
+            {"a": 1},
+            {"a.b.c": 1, "a.b.d": 2, "a.e": 3, "f": 4, "a.b.g": 5},
+            {"x.y": ["s"], "x": {"z": {"w.v": 3}}, "x.z.u": 4},
+            {"a.b": {}, "a.c": 1},
+            {"a": [{"b.c": 1}], "a2.b": [{"c": 2}, {"d": 3}]},
+        ],
+    )
+    @pytest.mark.parametrize("merge_lists", [False, True])
+    def test_matches_one_at_a_time(self, items: dict, *, merge_lists: bool) -> None:
+        assert DottedToNested(merge_lists=merge_lists)(items) == _nest_each(
+            items, merge_lists=merge_lists
+        )
+
+    @pytest.mark.parametrize(
+        ("items", "key"),
+        [
+            ({"a": 1, "a.b": 2}, "a"),
+            ({"a.b": 2, "a": 1}, "a"),
+            ({"a.b.c": 2, "a.b": 1}, "b"),
+            ({"a.b": 1, "a": {"b": 2}}, "b"),
+            ({"a.b.c": 1, "a": {"b.c": 2}}, "c"),
+            ({"a": [1], "a.b": 2}, "a"),
+        ],
+    )
+    def test_duplicate(self, items: dict, key: str) -> None:
+        with pytest.raises(DuplicateKeyError) as e:
+            DottedToNested()(items)
+        assert e.value.key == key
+        with pytest.raises(DuplicateKeyError) as e:
+            _nest_each(items)
+        assert e.value.key == key
+
+    def test_merge_lists(self) -> None:
+        items = {"a": [{"b": 1}], "x.a": [{"c": 2}]}
+        nested = DottedToNested(merge_lists=True)({**items, "a2": [{"b": 1}, {"c": 2}]})
+        assert nested == {"a": [{"b": 1}], "x": {"a": [{"c": 2}]}, "a2": [{"b": 1, "c": 2}]}
+
+
+class TestMergeLeaves:
+    base = DotTree({"tool": {"a": 1, "b": [1, 2], "empty": {}}, "name": "x"})
+    layer = DotTree({"tool": {"b": [1, 2], "c": {"d": True}}, "name": "x", "x": {"y": {}}})
+    clash = DotTree({"tool": {"b": [3], "c": {"d": False}}})
+
+    def test_always(self) -> None:
+        merged = DotTrees.merge_leaves(self.base, self.layer, self.clash, replace="always")
+        assert merged == {"tool": {"a": 1, "b": [3], "c": {"d": False}}, "name": "x"}
+        assert merged.leaves() == self.base.leaves() | self.layer.leaves() | self.clash.leaves()
+
+    def test_if_values_match(self) -> None:
+        merged = DotTrees.merge_leaves(self.base, self.layer)
+        assert merged == {"tool": {"a": 1, "b": [1, 2], "c": {"d": True}}, "name": "x"}
+        with pytest.raises(LeafConflictError) as e:
+            DotTrees.merge_leaves(self.base, self.layer, self.clash)
+        assert e.value.intersection == {"tool.b": [[1, 2], [1, 2], [3]], "tool.c.d": [True, False]}
+        assert "tool.b: [1, 2]/[1, 2]/[3]" in str(e.value)
+
+    def test_never(self) -> None:
+        assert DotTrees.merge_leaves(self.base, DotTree({"z": 1}), replace="never")["z"] == 1
+        with pytest.raises(LeafIntersectionError) as e:
+            DotTrees.merge_leaves(self.base, self.layer, replace="never")
+        assert e.value.intersection == {"tool.b": [[1, 2], [1, 2]], "name": ["x", "x"]}
+        assert str(e.value).startswith("2 leaves are present in multiple trees: { tool.b, name }.")
+
+    def test_leaf_and_branch(self) -> None:
+        assert DotTrees.merge_leaves(DotTree({"a": 1}), DotTree({"a": {"b": {}}})) == {"a": 1}
+        with pytest.raises(DuplicateKeyError) as e:
+            DotTrees.merge_leaves(DotTree({"a": {"b": 1}}), DotTree({"a": {"b": {"c": 2}}}))
+        assert e.value.key == "a.b"
+
+    def test_does_not_share_branches(self) -> None:
+        merged = DotTrees.merge_leaves(self.base)
+        assert merged == {"tool": {"a": 1, "b": [1, 2]}, "name": "x"}
+        assert merged["tool"] is not self.base["tool"]
+
+
+class TestLayeredDotTree:
+    base = TestMergeLeaves.base
+    layer = TestMergeLeaves.layer
+    clash = TestMergeLeaves.clash
+
+    @pytest.mark.parametrize("replace", ["always", "if_values_match", "never"])
+    @pytest.mark.parametrize("keys", ["tool", "tool.a", "tool.b", "tool.c.d", "name", "x", "nope"])
+    def test_same_as_merge_leaves(self, replace: str, keys: str) -> None:
+        for trees in [(self.base,), (self.base, self.layer), (self.base, self.layer, self.clash)]:
+            stack = LayeredDotTree(*reversed(trees), replace=replace)
+            try:
+                expected = DotTrees.merge_leaves(*trees, replace=replace).get(keys, "missing")
+            except (LeafConflictError, LeafIntersectionError) as e:
+                if keys in e.intersection or any(k.startswith(keys + ".") for k in e.intersection):
+                    with pytest.raises(type(e)):
+                        stack.access(keys)
+                continue
+            assert stack.get(keys, "missing") == expected
+            assert stack.has(keys) == (expected != "missing")
+
+    def test_top_wins(self) -> None:
+        stack = LayeredDotTree(self.clash, self.layer, self.base)
+        assert stack.access("tool.b") == [3]
+        assert stack.access("tool.a") == 1
+        assert stack.access("tool") == {"a": 1, "b": [3], "c": {"d": False}}
+        assert stack["name"] == "x"
+
+    def test_lazy_conflicts(self) -> None:
+        stack = LayeredDotTree(self.clash, self.base, replace="never")
+        assert stack.access("tool.a") == 1
+        assert stack.access("tool.c.d") is False
+        with pytest.raises(LeafIntersectionError) as e:
+            stack.access("tool")
+        assert e.value.intersection == {"tool.b": [[1, 2], [3]]}
+        with pytest.raises(LeafConflictError):
+            LayeredDotTree(self.clash, self.base, replace="if_values_match").access("tool.b")
+
+    def test_subtree(self) -> None:
+        stack = LayeredDotTree(self.clash, self.layer, self.base)
+        tool = stack.get_subtree("tool")
+        assert isinstance(tool, LayeredDotTree)
+        assert tool.access("c.d") is False
+        assert tool.materialize() == stack.access("tool")
+        assert stack.get_subtree("nope").materialize() == {}
+        with pytest.raises(TypeError):
+            stack.access_subtree("name")
+        with pytest.raises(KeyError):
+            stack.access_subtree("nope")
+
+    def test_materialize(self) -> None:
+        stack = LayeredDotTree(self.layer, self.base)
+        assert stack.materialize() == DotTrees.merge_leaves(self.base, self.layer)
+        with pytest.raises(LeafConflictError):
+            LayeredDotTree(self.clash, self.base, replace="if_values_match").materialize()
+
+    def test_mapping(self) -> None:
+        stack = LayeredDotTree(self.layer, self.base, {"tool": {}, "z": 0})
+        assert list(stack) == ["tool", "name", "z"]
+        assert len(stack) == 3
+        assert "x" not in stack
+        assert "tool.a" not in stack
+        with pytest.raises(KeyError):
+            stack["tool.a"]
+        assert dict(stack) == DotTrees.merge_leaves({"z": 0}, self.base, self.layer)
+
+    def test_contains_does_not_merge(self) -> None:
+        stack = LayeredDotTree(self.clash, self.base, {"a": 1}, {"a": 2}, replace="never")
+        assert "a" in stack
+        assert "tool" in stack
+        assert list(stack) == ["tool", "name", "a"]
+        with pytest.raises(LeafIntersectionError):
+            stack["tool"]
+
+    def test_leaf_and_branch(self) -> None:
+        assert LayeredDotTree({"a": {"b": {}}}, {"a": 1}).access("a") == 1
+        stack = LayeredDotTree({"a": {"b": {"c": 2}}}, {"a": {"b": 1}})
+        for keys in ["a", "a.b", "a.b.c"]:
+            with pytest.raises(DuplicateKeyError) as e:
+                stack.access(keys)
+            assert e.value.key == "a.b"
+
+
+class TestDotDictChecker:
+    @pytest.mark.parametrize(
+        ("raw", "error", "match"),
+        [
+            ({"a": {"b.c": 1}}, ValueError, r"Key 'a<<b.c>>' contains '.'"),
+            ({"a": {1: 1}}, TypeError, r"Key 'a<<1>>' is a <class 'int'>, not a string"),
+            ({"a": [1, {"b": None}]}, TypeError, r"Value at 'a\[1\].b' has invalid type"),
+            ({"a": [[1], [object()]]}, TypeError, r"Value at 'a\[1\]\[0\]' has invalid type"),
+            ({"a": {"b": set()}, "c": None}, TypeError, r"Value at 'a.b' has invalid type"),
+        ],
+    )
+    def test_first_offence(self, raw: dict, error: type[Exception], match: str) -> None:
+        with pytest.raises(error, match=match):
+            DotTree.from_nested(raw)
+
+    def test_tables_in_arrays(self) -> None:
+        raw = {"books": [{"title": "Bats", "ids.isbn": "123-4-56-123456-0"}]}
+        assert DotTree.from_nested(raw) == raw
+        with pytest.raises(TypeError, match=r"Key 'books\[0\]<<2>>'"):
+            DotTree.from_nested({"books": [{2: "x"}]})
+
+    def test_key_pattern(self) -> None:
+        checker = DotDictChecker(key_pattern=re.compile(r"[a-z]+"))
+        checker.check({"a": {"b": [{"C": 1}]}})
+        with pytest.raises(KeyRegexError) as e:
+            checker.check_keys({"a": {"b": 1, "C": 2}})
+        assert e.value.keys == ["a.C"]
+        assert checker.check_values({"a": {"B.c": 1}}) == {"a": {"B.c": 1}}
+
+    def test_deeper_than_recursion_limit(self) -> None:
+        raw: dict = {"a": 1}
+        for _ in range(5000):
+            raw = {"a": raw}
+        assert DotTree.from_nested(raw) is not None
+        raw["a"]["a"] = {"a.b": 1}
+        with pytest.raises(ValueError, match=r"Key 'a.a<<a.b>>' contains '.'"):
+            DotTree.from_nested(raw)
+
+    def test_from_toml(self) -> None:
+        with pytest.raises(ValueError, match=r"Key 'tool<<a.b>>' contains '.'"):
+            DotTrees.from_toml('[tool]\n"a.b" = 1\n')
+
+
+class TestDiff:
+    def test_changes(self) -> None:
+        shared = {"deep": {"x": [1, 2]}}
+        old = DotTree({"a": {"b": 1, "c": "x", "s": shared}, "gone": {"x": 1, "y": {"z": 2}}})
+        new = DotTree({"a": {"b": True, "c": "x", "d": 3, "s": shared}, "n": {"m": {"o": 4}}})
+        assert list(DotTrees.diff(old, new)) == [
+            LeafChange("changed", "a.b", old=1, new=True),
+            LeafChange("added", "a.d", new=3),
+            LeafChange("removed", "gone.x", old=1),
+            LeafChange("removed", "gone.y.z", old=2),
+            LeafChange("added", "n.m.o", new=4),
+        ]
+
+    def test_nested_type_change(self) -> None:
+        for new in [True, 1.0]:
+            assert list(DotTrees.diff({"x": {"a": 1}}, {"x": {"a": new}})) == [
+                LeafChange("changed", "x.a", old=1, new=new)
+            ]
+        assert list(DotTrees.diff({"x": {"a": [1, {"b": 1}]}}, {"x": {"a": [1, {"b": True}]}}))
+        assert not list(DotTrees.diff({"x": {"a": [1, {"b": 1}]}}, {"x": {"a": [1, {"b": 1}]}}))
+
+    def test_leaf_becomes_branch(self) -> None:
+        old = DotTree({"a": 1, "b": {"c": 2}, "e": {}})
+        new = DotTree({"a": {"x": 1}, "b": 2})
+        assert list(DotTrees.diff(old, new)) == [
+            LeafChange("removed", "a", old=1),
+            LeafChange("added", "a.x", new=1),
+            LeafChange("removed", "b.c", old=2),
+            LeafChange("added", "b", new=2),
+        ]
+
+    def test_matches_leaves(self, tree: DotTree) -> None:
+        other = tree.transform_leaves(lambda k, v: None if k == "matrix" else v)
+        other = DotTrees.merge_leaves(other, DotTree({"project": {"name": "x"}}), replace="always")
+        assert not list(DotTrees.diff(tree, tree))
+        old, new = tree.leaves(), other.leaves()
+        changes = {c.key: (c.old, c.new) for c in DotTrees.diff(tree, other)}
+        assert changes == {
+            k: (old.get(k), new.get(k)) for k in old.keys() | new.keys() if old.get(k) != new.get(k)
+        }
+
+    def test_skips_equal_subtrees(self) -> None:
+        class Unequal(dict):  # noqa: FURB189
+            def __eq__(self, other: object) -> bool:
+                raise AssertionError
+
+            __hash__ = None
+
+        same = {"x": Unequal(y=1)}
+        assert not list(DotTrees.diff({"a": same}, {"a": same}))
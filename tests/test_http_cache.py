@@ -0,0 +1,130 @@
+# SPDX-FileCopyrightText: Copyright 2020-2026, Contributors to Tyrannosaurus
+# SPDX-PackageHomePage: https://github.com/dmyersturnbull/tyrannosaurus
+# SPDX-License-Identifier: Apache-2.0
+
+"""Tests for the on-disk HTTP cache, against a local HTTP server."""
+
+import json
+import threading
+from datetime import timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import TYPE_CHECKING, ClassVar, override
+
+import pytest
+from niquests import Session
+
+from tyranno_sandbox.functions._core import FunctionError  # noqa: PLC2701
+from tyranno_sandbox.functions.http_cache import HttpCache
+from tyranno_sandbox.functions.pypi import PypiFunctions
+
+if TYPE_CHECKING:
+    from collections.abc import Generator
+    from pathlib import Path
+
+
+class _Handler(BaseHTTPRequestHandler):
+    """Serves a fixed JSON document with an `ETag`, honoring `If-None-Match`."""
+
+    etag: ClassVar[str] = '"v1"'
+    body: ClassVar[bytes] = b'{"releases": {"1.0": [{}], "2.0": [{"yanked": true}]}}'
+    requests: ClassVar[list[str | None]] = []
+
+    def do_GET(self) -> None:
+        if_none_match = self.headers.get("If-None-Match")
+        self.requests.append(if_none_match)
+        if if_none_match == self.etag:
+            self.send_response(304)
+            self.end_headers()
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("ETag", self.etag)
+        self.send_header("Content-Length", str(len(self.body)))
+        self.end_headers()
+        self.wfile.write(self.body)
+
+    @override
+    def log_message(self, format: str, *args: object) -> None:
+        pass
+
+
+@pytest.fixture
+def server() -> Generator[ThreadingHTTPServer]:
+    _Handler.requests.clear()
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def url(server: ThreadingHTTPServer) -> str:
+    return f"http://127.0.0.1:{server.server_port}/pypi/pkg/json"
+
+
+@pytest.fixture
+def session() -> Generator[Session]:
+    with Session() as session:
+        yield session
+
+
+class TestHttpCache:
+    def test_fresh_entry_is_served_without_request(
+        self, tmp_path: Path, session: Session, url: str
+    ) -> None:
+        cache = HttpCache(session=session, directory=tmp_path)
+        assert cache.get(url) == _Handler.body
+        assert cache.get(url) == _Handler.body
+        assert _Handler.requests == [None]
+
+    def test_stale_entry_is_revalidated(self, tmp_path: Path, session: Session, url: str) -> None:
+        cache = HttpCache(session=session, directory=tmp_path, ttl=timedelta(0))
+        assert cache.get(url) == _Handler.body
+        assert cache.get(url) == _Handler.body
+        assert _Handler.requests == [None, '"v1"']
+
+    def test_persists_across_instances(self, tmp_path: Path, session: Session, url: str) -> None:
+        HttpCache(session=session, directory=tmp_path).get(url)
+        assert HttpCache(session=session, directory=tmp_path).get_json(url) == json.loads(
+            _Handler.body
+        )
+        assert len(_Handler.requests) == 1
+
+    def test_offline_serves_stale(self, tmp_path: Path, session: Session, url: str) -> None:
+        HttpCache(session=session, directory=tmp_path, ttl=timedelta(0)).get(url)
+        offline = HttpCache(session=session, directory=tmp_path, ttl=timedelta(0), offline=True)
+        assert offline.get(url) == _Handler.body
+        assert len(_Handler.requests) == 1
+
+    def test_offline_miss(self, tmp_path: Path, session: Session, url: str) -> None:
+        cache = HttpCache(session=session, directory=tmp_path, offline=True)
+        with pytest.raises(FunctionError):
+            cache.get(url)
+        assert not _Handler.requests
+
+    @pytest.mark.parametrize("meta", ["[]", "{}", '{"fetched_at": "soon"}', '{"fetched_at": true}'])
+    def test_corrupt_metadata_is_refetched(
+        self, tmp_path: Path, session: Session, url: str, meta: str
+    ) -> None:
+        cache = HttpCache(session=session, directory=tmp_path)
+        cache.get(url)
+        (meta_path,) = tmp_path.glob("*.json")
+        meta_path.write_text(meta, encoding="utf-8")
+        assert cache.get(url) == _Handler.body
+        assert _Handler.requests == [None, None]
+
+    def test_unreachable_serves_stale(
+        self, tmp_path: Path, session: Session, server: ThreadingHTTPServer, url: str
+    ) -> None:
+        cache = HttpCache(session=session, directory=tmp_path, ttl=timedelta(0))
+        cache.get(url)
+        server.shutdown()
+        server.server_close()
+        assert cache.get(url) == _Handler.body
+        assert len(_Handler.requests) == 1
+
+    def test_pypi_functions(self, tmp_path: Path, session: Session, url: str) -> None:
+        cache = HttpCache(session=session, directory=tmp_path)
+        data = cache.get_json(url)
+        assert PypiFunctions(session, cache).extract_versions(data) == {"1.0"}
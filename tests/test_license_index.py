@@ -0,0 +1,81 @@
+# SPDX-FileCopyrightText: Copyright 2020-2026, Contributors to Tyrannosaurus
+# SPDX-PackageHomePage: https://github.com/dmyersturnbull/tyrannosaurus
+# SPDX-License-Identifier: Apache-2.0
+
+"""Tests for the memory-mapped SPDX license index."""
+
+import struct
+from typing import TYPE_CHECKING
+
+import pytest
+from niquests import Session
+
+from tyranno_sandbox.functions.license_index import LicenseIndex, LicenseIndexError, LicenseRecord
+from tyranno_sandbox.functions.licenses import LicenseFunctions
+
+if TYPE_CHECKING:
+    from pathlib import Path
+
+RECORDS = [
+    LicenseRecord("MIT", "MIT License", ["https://opensource.org/license/mit/"], "Permission…"),
+    LicenseRecord("Empty", "Empty License", [], ""),
+    LicenseRecord("Apache-2.0", "Apache License 2.0", [], "Apache License\nVersion 2.0 ✓\n"),
+]
+
+
+class TestLicenseIndex:
+    def test_round_trip(self, tmp_path: Path) -> None:
+        index = LicenseIndex(tmp_path / "licenses.idx")
+        assert index.write(RECORDS) == 3
+        assert index.ids() == ["MIT", "Empty", "Apache-2.0"]
+        for record in RECORDS:
+            assert record.spdx_id in index
+            assert index.get(record.spdx_id) == record
+        assert index.get("GPL-3.0-only") is None
+        index.close()
+
+    def test_rewrite(self, tmp_path: Path) -> None:
+        index = LicenseIndex(tmp_path / "licenses.idx")
+        index.write(RECORDS)
+        assert len(index) == 3
+        index.close()
+        index.write(RECORDS[:1])
+        assert index.ids() == ["MIT"]
+        index.close()
+
+    def test_missing(self, tmp_path: Path) -> None:
+        index = LicenseIndex(tmp_path / "licenses.idx")
+        assert not index.exists()
+        with pytest.raises(LicenseIndexError, match="refresh-licenses"):
+            index.get("MIT")
+
+    def test_not_an_index(self, tmp_path: Path) -> None:
+        path = tmp_path / "licenses.idx"
+        path.write_bytes(b"this is not an index file")
+        with pytest.raises(LicenseIndexError, match="not a license index"):
+            LicenseIndex(path).get("MIT")
+
+    @pytest.mark.parametrize("table", [b"{not json", b'{"MIT": [1]}', b'["MIT"]', b"\xff"])
+    def test_corrupt_table(self, tmp_path: Path, table: bytes) -> None:
+        path = tmp_path / "licenses.idx"
+        path.write_bytes(struct.pack("<8sQ", b"TYRSPDX1", len(table)) + table)
+        with pytest.raises(LicenseIndexError, match="corrupt"):
+            LicenseIndex(path).get("MIT")
+
+    def test_get_after_close(self, tmp_path: Path) -> None:
+        index = LicenseIndex(tmp_path / "licenses.idx")
+        index.write(RECORDS)
+        assert "MIT" in index
+        index.close()
+        assert index.get("MIT") == RECORDS[0]
+        index.close()
+
+    def test_license_data_reads_index(self, tmp_path: Path) -> None:
+        index = LicenseIndex(tmp_path / "licenses.idx")
+        index.write(RECORDS)
+        with Session() as session:
+            data = LicenseFunctions(session, index).license_data("Apache-2.0")
+        assert data["name"] == "Apache License 2.0"
+        assert data["text"] == "Apache License\nVersion 2.0 ✓\n"
+        assert data["header"] == "SPDX-License-Identifier: Apache-2.0"
+        index.close()
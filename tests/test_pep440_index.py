@@ -0,0 +1,101 @@
+# SPDX-FileCopyrightText: Copyright 2020-2026, Contributors to Tyrannosaurus
+# SPDX-PackageHomePage: https://github.com/dmyersturnbull/tyrannosaurus
+# SPDX-License-Identifier: Apache-2.0
+
+"""Tests for `Pep440Index`."""
+
+import pytest
+from packaging.specifiers import SpecifierSet
+from packaging.version import Version
+
+from tyranno_sandbox.functions.pep440 import Pep440Index
+
+VERSIONS = [
+    "2.0",
+    "1.0",
+    "1.0.0+local",
+    "1.0+abc",
+    "1.0.post1",
+    "1.0a1",
+    "1.0.dev3",
+    "0.9",
+    "1.1",
+    "1.1.5",
+    "1.2rc1",
+    "1.4.5",
+    "1.4.9",
+    "1.5",
+    "2.0.1",
+    "2.2",
+    "1!0.1",
+]
+
+
+@pytest.fixture(scope="module")
+def index() -> Pep440Index:
+    return Pep440Index.of(VERSIONS)
+
+
+class TestPep440Index:
+    def test_sorted(self, index: Pep440Index) -> None:
+        assert index.ascending() == sorted(Version(v) for v in VERSIONS)
+        assert index.descending() == sorted((Version(v) for v in VERSIONS), reverse=True)
+        assert index.min() == Version("0.9")
+        assert index.max() == Version("1!0.1")
+
+    def test_empty(self) -> None:
+        with pytest.raises(ValueError, match="No versions"):
+            Pep440Index.of([]).max()
+
+    @pytest.mark.parametrize(
+        "predicate",
+        [
+            "",
+            ">=1.0",
+            ">1.0",
+            "<1.0",
+            "<=1.0",
+            "==1.0",
+            "==1.0.0",
+            "==1.0+abc",
+            "==1.*",
+            "!=1.0",
+            "~=1.4.5",
+            "~=1.1",
+            ">=1.0,<2",
+            ">1.0a1,<=2.0,!=1.1",
+            "===1.0",
+            ">=1.0a1",
+            "<1.0.dev3",
+        ],
+    )
+    def test_filter(self, index: Pep440Index, predicate: str) -> None:
+        specifiers = SpecifierSet(predicate)
+        expected = sorted(Version(v) for v in VERSIONS if specifiers.contains(v))
+        assert index.filter(predicate) == expected
+
+    def test_range(self, index: Pep440Index) -> None:
+        assert index.range("1.4", "2.0") == [Version(v) for v in ["1.4.5", "1.4.9", "1.5"]]
+        assert index.range("2.0.1", include_upper=True) == [
+            Version(v) for v in ["2.0.1", "2.2", "1!0.1"]
+        ]
+        assert index.range(upper="1.0a1", include_upper=True) == [
+            Version(v) for v in ["0.9", "1.0.dev3", "1.0a1"]
+        ]
+
+    def test_max_per(self, index: Pep440Index) -> None:
+        assert index.max_per("major") == [Version(v) for v in ["0.9", "1.5", "2.2", "1!0.1"]]
+        assert index.max_per("minor") == [
+            Version(v)
+            for v in [
+                "0.9",
+                "1.0.post1",
+                "1.1.5",
+                "1.2rc1",
+                "1.4.9",
+                "1.5",
+                "2.0.1",
+                "2.2",
+                "1!0.1",
+            ]
+        ]
@@ -0,0 +1,159 @@
+# SPDX-FileCopyrightText: Copyright 2020-2026, Contributors to Tyrannosaurus
+# SPDX-PackageHomePage: https://github.com/dmyersturnbull/tyrannosaurus
+# SPDX-License-Identifier: Apache-2.0
+
+"""Tests for concurrent prefetching of network-backed functions."""
+
+import json
+import threading
+import time
+import tracemalloc
+from dataclasses import replace
+from typing import TYPE_CHECKING, cast
+from unittest.mock import Mock
+
+import pytest
+
+from tyranno_sandbox.context import Context, Data, FunctionFailedError
+from tyranno_sandbox.dot_tree import DotTree
+from tyranno_sandbox.global_vars import GlobalVars
+from tyranno_sandbox.prefetch import NetworkCall, NetworkCalls
+from tyranno_sandbox.sync import Syncer
+
+if TYPE_CHECKING:
+    from pathlib import Path
+
+    from tyranno_sandbox.functions import Functions
+
+LATENCY = 0.2
+
+
+class _SlowFunctions:
+    """Stands in for `Functions`, taking `LATENCY` seconds per lookup."""
+
+    def __init__(self) -> None:
+        self.calls: list[str] = []
+        self.versions = {"1.0", "2.0"}
+        self._lock = threading.Lock()
+
+    def pypi_versions(self, pkg: str) -> set[str]:
+        time.sleep(LATENCY)
+        with self._lock:
+            self.calls.append(pkg)
+        if pkg == "missing":
+            msg = f"No such package: {pkg}"
+            raise LookupError(msg)
+        return self.versions
+
+
+@pytest.fixture
+def functions() -> _SlowFunctions:
+    return _SlowFunctions()
+
+
+@pytest.fixture
+def data(functions: _SlowFunctions) -> Data:
+    return Data(_tree(), NetworkCalls(cast("Functions", functions)))
+
+
+def _tree(**tyranno: object) -> DotTree:
+    deps = {f"pkg{i}": f"pkg-{i}" for i in range(10)} | {"gone": "missing"}
+    return DotTree.from_nested(
+        {"project": {"name": "my-project"}, "tool": {"tyranno": {"data": deps, **tyranno}}}
+    )
+
+
+class TestNetworkCalls:
+    def test_network_calls(self, data: Data) -> None:
+        template = "$<<.pkg1.pypi_versions(@)>> $<<project.name>> $<<.pkg2 | pypi_versions(@)>>"
+        assert list(data.network_calls(template)) == [
+            NetworkCall("pypi_versions", "pkg-1", ()),
+            NetworkCall("pypi_versions", "pkg-2", ()),
+        ]
+
+    def test_network_calls_skips_errors(self, data: Data) -> None:
+        assert not list(data.network_calls("$<<.nonexistent.pypi_versions(@)>>"))
+
+    def test_prefetch_is_concurrent(self, data: Data, functions: _SlowFunctions) -> None:
+        assert data.network is not None
+        template = " ".join(f"$<<.pkg{i}.pypi_versions(@)>>" for i in range(10))
+        calls = list(data.network_calls(template)) * 2
+        started = time.monotonic()
+        assert data.network.prefetch(calls) == 10
+        assert time.monotonic() - started < 5 * LATENCY
+        assert sorted(functions.calls) == sorted(f"pkg-{i}" for i in range(10))
+        assert data.replace_vars_in(template).startswith("1.0, 2.0 1.0, 2.0")
+        assert len(functions.calls) == 10
+
+    def test_failure_is_raised_when_rendering(self, data: Data) -> None:
+        assert data.network is not None
+        calls = [NetworkCall("pypi_versions", "missing", ())]
+        assert data.network.prefetch(calls) == 1
+        with pytest.raises(FunctionFailedError, match="No such package"):
+            data.expand_var(".gone.pypi_versions(@)")
+
+    def test_without_network(self) -> None:
+        data = Data(DotTree.from_nested({"name": "x"}))
+        with pytest.raises(FunctionFailedError, match="unavailable"):
+            data.expand_var("name.pypi_versions(@)")
+
+
+class TestSyncerPrefetch:
+    @pytest.fixture
+    def context(self, tmp_path: Path, data: Data) -> Context:
+        env = GlobalVars(
+            cache_dir=tmp_path / "cache",
+            config_dir=tmp_path / "config",
+            data_dir=tmp_path / "data",
+            log_dir=tmp_path / "log",
+            tyranno_dir=".tyranno",
+            log_format="",
+            debug_mode=False,
+        )
+        data = Data(_tree(targets=["*.toml"]), data.network)
+        return Context(env=env, repo_dir=tmp_path, data=data, dry_run=False)
+
+    def test_syncer_prefetches(self, context: Context, functions: _SlowFunctions) -> None:
+        for i in range(10):
+            path = context.repo_dir / f"file-{i}.toml"
+            path.write_text(f'# ::tyranno:: v = "$<<.pkg{i}.pypi_versions(@)>>"\nv = ""\n')
+        started = time.monotonic()
+        Syncer(context).run()
+        assert time.monotonic() - started < 5 * LATENCY
+        assert len(functions.calls) == 10
+        assert (context.repo_dir / "file-3.toml").read_text().splitlines()[1] == 'v = "1.0, 2.0"'
+
+    def test_network_targets_are_never_skipped(
+        self, context: Context, functions: _SlowFunctions
+    ) -> None:
+        path = context.repo_dir / "versions.toml"
+        path.write_text('# ::tyranno:: v = "$<<.pkg1.pypi_versions(@)>>"\nv = ""\n')
+        Syncer(context).run()
+        assert "versions.toml" not in json.loads(context.manifest_path.read_text())["files"]
+        functions.versions = {"3.0"}
+        network = NetworkCalls(cast("Functions", functions))
+        Syncer(replace(context, data=Data(context.data.tree, network))).run()
+        assert path.read_text().splitlines()[1] == 'v = "3.0"'
+
+    def test_memory_is_bounded(self, context: Context) -> None:
+        path = context.repo_dir / "large.toml"
+        with path.open("w") as f:
+            f.write('# ::tyranno:: v = "$<<.pkg1.pypi_versions(@)>>"\nv = ""\n')
+            f.writelines(f"filler line {i:07}\n" for i in range(400_000))
+        size = path.stat().st_size
+        tracemalloc.start()
+        try:
+            Syncer(context, stream_threshold=size // 2).run()
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+        assert path.read_text().splitlines()[1] == 'v = "1.0, 2.0"'
+        assert peak < size // 4
+
+
+class TestClose:
+    def test_closes_session(self, functions: _SlowFunctions) -> None:
+        session = Mock()
+        Data(_tree(), NetworkCalls(cast("Functions", functions), session=session)).close()
+        session.close.assert_called_once_with()
+        Data(_tree()).close()
@@ -0,0 +1,110 @@
+# SPDX-FileCopyrightText: Copyright 2020-2026, Contributors to Tyrannosaurus
+# SPDX-PackageHomePage: https://github.com/dmyersturnbull/tyrannosaurus
+# SPDX-License-Identifier: Apache-2.0
+
+"""Tests for npm-style semver ranges and `SemverIndex`."""
+
+import pytest
+
+from tyranno_sandbox.functions.semver import (
+    SemverFunctions,
+    SemverIndex,
+    SemverRange,
+    compile_range,
+)
+
+VERSIONS = [
+    "0.0.3",
+    "0.0.4",
+    "0.2.3",
+    "0.2.9",
+    "0.3.0",
+    "1.0.0",
+    "1.2.0",
+    "1.2.3-beta.2",
+    "1.2.3",
+    "1.2.9",
+    "1.3.0-rc.1",
+    "1.3.0",
+    "1.9.9",
+    "2.0.0-alpha",
+    "2.0.0",
+    "2.5.1",
+    "3.0.0",
+]
+
+
+@pytest.fixture(scope="module")
+def index() -> SemverIndex:
+    return SemverIndex.of(reversed(VERSIONS))
+
+
+class TestSemverRange:
+    @pytest.mark.parametrize(
+        ("predicate", "expected"),
+        [
+            ("^1.2", ["1.2.0", "1.2.3", "1.2.9", "1.3.0", "1.9.9"]),
+            ("^1.2.3-beta.1", ["1.2.3-beta.2", "1.2.3", "1.2.9", "1.3.0", "1.9.9"]),
+            ("^0.2.3", ["0.2.3", "0.2.9"]),
+            ("^0.0.3", ["0.0.3"]),
+            ("^0.0", ["0.0.3", "0.0.4"]),
+            ("~1.2.3", ["1.2.3", "1.2.9"]),
+            ("~1.2", ["1.2.0", "1.2.3", "1.2.9"]),
+            ("~1", ["1.0.0", "1.2.0", "1.2.3", "1.2.9", "1.3.0", "1.9.9"]),
+            (">=1 <2", ["1.0.0", "1.2.0", "1.2.3", "1.2.9", "1.3.0", "1.9.9"]),
+            (">= 2.0.0 < 3", ["2.0.0", "2.5.1"]),
+            (">1.2", ["1.3.0", "1.9.9", "2.0.0", "2.5.1", "3.0.0"]),
+            (
+                "<=1.2",
+                ["0.0.3", "0.0.4", "0.2.3", "0.2.9", "0.3.0", "1.0.0", "1.2.0", "1.2.3", "1.2.9"],
+            ),
+            ("<0.2", ["0.0.3", "0.0.4"]),
+            ("1.2.x", ["1.2.0", "1.2.3", "1.2.9"]),
+            ("=1.3.0", ["1.3.0"]),
+            ("1.3.0-rc.1", ["1.3.0-rc.1"]),
+            ("1.2.3 - 2", ["1.2.3", "1.2.9", "1.3.0", "1.9.9", "2.0.0", "2.5.1"]),
+            ("^0.2 || >=2.5", ["0.2.3", "0.2.9", "2.5.1", "3.0.0"]),
+            (
+                "<1.0.0 || ^1.2.3 <1.3",
+                ["0.0.3", "0.0.4", "0.2.3", "0.2.9", "0.3.0", "1.2.3", "1.2.9"],
+            ),
+            (">=2.0.0-alpha <2.0.0", ["2.0.0-alpha"]),
+            (">2 <2", []),
+            ("<*", []),
+        ],
+    )
+    def test_filter(self, index: SemverIndex, predicate: str, expected: list[str]) -> None:
+        assert [str(v) for v in index.filter(predicate)] == expected
+        assert [v for v in VERSIONS if v in compile_range(predicate)] == expected
+
+    @pytest.mark.parametrize("predicate", ["", "*", "x", ">=0.0.0"])
+    def test_any(self, index: SemverIndex, predicate: str) -> None:
+        assert [str(v) for v in index.filter(predicate)] == [v for v in VERSIONS if "-" not in v]
+
+    def test_cached(self) -> None:
+        assert compile_range("^1.2") is compile_range("^1.2")
+
+    def test_invalid(self) -> None:
+        with pytest.raises(ValueError, match="Invalid"):
+            SemverRange.parse("^1.2.3.4")
+
+
+class TestSemverIndex:
+    def test_sorted(self, index: SemverIndex) -> None:
+        assert [str(v) for v in index.versions] == VERSIONS
+        assert str(index.min()) == "0.0.3"
+        assert str(index.max()) == "3.0.0"
+
+
+class TestSplitSpec:
+    @pytest.mark.parametrize(
+        ("spec", "package", "predicate"),
+        [
+            ("left-pad@^1.2", "left-pad", "^1.2"),
+            ("@scope/pkg@~2", "@scope/pkg", "~2"),
+            ("@scope/pkg", "@scope/pkg", "*"),
+            ("react", "react", "*"),
+        ],
+    )
+    def test_split_spec(self, spec: str, package: str, predicate: str) -> None:
+        assert SemverFunctions().split_spec(spec) == {"package": package, "predicate": predicate}
@@ -0,0 +1,285 @@
+# SPDX-FileCopyrightText: Copyright 2020-2026, Contributors to Tyrannosaurus
+# SPDX-PackageHomePage: https://github.com/dmyersturnbull/tyrannosaurus
+# SPDX-License-Identifier: Apache-2.0
+
+"""Integration tests for `tyranno sync`."""
+
+import io
+import json
+import tracemalloc
+from typing import TYPE_CHECKING
+
+import pytest
+from loguru import logger
+
+from tyranno_sandbox.context import Context, Data
+from tyranno_sandbox.dot_tree import DotTree
+from tyranno_sandbox.global_vars import STARTUP, GlobalVars
+from tyranno_sandbox.sync import ManifestEntry, Syncer, SyncHelper
+
+if TYPE_CHECKING:
+    from collections.abc import Generator
+    from pathlib import Path
+
+
+@pytest.fixture
+def env(tmp_path: Path) -> GlobalVars:
+    return GlobalVars(
+        cache_dir=tmp_path / "cache",
+        config_dir=tmp_path / "config",
+        data_dir=tmp_path / "data",
+        log_dir=tmp_path / "log",
+        tyranno_dir=".tyranno",
+        log_format="",
+        debug_mode=False,
+    )
+
+
+@pytest.fixture
+def context(tmp_path: Path, env: GlobalVars) -> Context:
+    tree = DotTree.from_nested(
+        {
+            "project": {"name": "my-project", "version": "1.2.3"},
+            "tool": {"tyranno": {"targets": ["*.toml", "*.md"], "data": {"vendor": "acme"}}},
+        }
+    )
+    return Context(env=env, repo_dir=tmp_path, data=Data(tree), dry_run=False)
+
+
+@pytest.fixture
+def messages() -> Generator[list[str]]:
+    logged: list[str] = []
+    handler = logger.add(lambda m: logged.append(m.record["message"]), level="INFO")
+    yield logged
+    logger.remove(handler)
+
+
+def _write_targets(root: Path, n: int) -> list[Path]:
+    paths = []
+    for i in range(n):
+        path = root / f"file-{i:03}.toml"
+        path.write_text(f'# ::tyranno:: name = "$<<project.name>>-{i}"\nname = "old"\n')
+        paths.append(path)
+    return paths
+
+
+class TestSyncerJobs:
+    @pytest.mark.parametrize("jobs", [1, 4])
+    def test_all_files_synced(self, context: Context, jobs: int) -> None:
+        paths = _write_targets(context.repo_dir, 12)
+        Syncer(context, jobs=jobs).run()
+        for i, path in enumerate(paths):
+            assert path.read_text().splitlines()[1] == f'name = "my-project-{i}"'
+
+    def test_log_order_is_deterministic(self, context: Context, messages: list[str]) -> None:
+        paths = _write_targets(context.repo_dir, 12)
+        Syncer(context, jobs=4).run()
+        processed = [m for m in messages if m.startswith("Processed ")]
+        expected = [f"Processed {p}: " for p in context.find_targets()]
+        assert len(processed) == len(expected) == len(paths)
+        assert all(m.startswith(e) for m, e in zip(processed, expected, strict=True))
+
+
+def _with_data(context: Context, changes: dict) -> Context:
+    tree = DotTree.from_nested({**context.data.tree, **changes})
+    return Context(env=context.env, repo_dir=context.repo_dir, data=Data(tree), dry_run=False)
+
+
+class TestSyncerIncremental:
+    def test_second_run_skips(self, context: Context, messages: list[str]) -> None:
+        _write_targets(context.repo_dir, 3)
+        Syncer(context).run()
+        assert context.manifest_path.exists()
+        messages.clear()
+        Syncer(context).run()
+        assert sum(m.startswith("Skipped ") for m in messages) == 3
+
+    def test_edited_file_is_resynced(self, context: Context, messages: list[str]) -> None:
+        paths = _write_targets(context.repo_dir, 3)
+        Syncer(context).run()
+        paths[1].write_text(paths[1].read_text().replace("my-project-1", "edited-by-hand!"))
+        messages.clear()
+        Syncer(context).run()
+        assert sum(m.startswith("Skipped ") for m in messages) == 2
+        assert paths[1].read_text().splitlines()[1] == 'name = "my-project-1"'
+
+    def test_changed_data_resyncs_all(self, context: Context, messages: list[str]) -> None:
+        paths = _write_targets(context.repo_dir, 3)
+        Syncer(context).run()
+        tree = DotTree.from_nested({**context.data.tree, "project": {"name": "renamed"}})
+        renamed = Context(
+            env=context.env, repo_dir=context.repo_dir, data=Data(tree), dry_run=False
+        )
+        messages.clear()
+        Syncer(renamed).run()
+        assert not any(m.startswith("Skipped ") for m in messages)
+        assert paths[0].read_text().splitlines()[1] == 'name = "renamed-0"'
+
+    def test_unaffected_targets_are_skipped(self, context: Context, messages: list[str]) -> None:
+        by_name = _write_targets(context.repo_dir, 2)
+        by_version = context.repo_dir / "version.toml"
+        by_version.write_text('# ::tyranno:: v = "$<<project.version>>"\nv = ""\n')
+        Syncer(context).run()
+        manifest = json.loads(context.manifest_path.read_text())
+        assert ManifestEntry.from_json(manifest["files"]["version.toml"]).keys == (
+            "project.version",
+        )
+        messages.clear()
+        Syncer(_with_data(context, {"project": {"name": "my-project", "version": "2"}})).run()
+        assert sum(m.startswith("Skipped ") for m in messages) == 2
+        assert by_version.read_text().splitlines()[1] == 'v = "2"'
+        messages.clear()
+        # The skipped targets were recorded as current, so only changes since are considered.
+        Syncer(_with_data(context, {"project": {"name": "renamed", "version": "2"}})).run()
+        assert sum(m.startswith("Skipped ") for m in messages) == 1
+        assert by_name[1].read_text().splitlines()[1] == 'name = "renamed-1"'
+
+    def test_branch_changes(self, context: Context, messages: list[str]) -> None:
+        path = context.repo_dir / "urls.toml"
+        path.write_text('# ::tyranno:: v = "$<<project.urls.*>>"\nv = ""\n')
+        Syncer(context).run()
+        messages.clear()
+        urls = {"name": "my-project", "urls": {"Home": "https://x.com"}}
+        Syncer(_with_data(context, {"project": urls})).run()
+        assert not any(m.startswith("Skipped ") for m in messages)
+        assert path.read_text().splitlines()[1] == 'v = "https://x.com"'
+
+    def test_type_changes(self, context: Context) -> None:
+        path = context.repo_dir / "flag.toml"
+        path.write_text("# ::tyranno:: v = $<<tool.x.flag>>\nv = 0\n")
+        tool = dict(context.data.tree["tool"])
+        Syncer(_with_data(context, {"tool": {**tool, "x": {"flag": 1}}})).run()
+        assert path.read_text().splitlines()[1] == "v = 1"
+        Syncer(_with_data(context, {"tool": {**tool, "x": {"flag": True}}})).run()
+        assert path.read_text().splitlines()[1] == "v = True"
+
+    def test_unexplained_data_change_resyncs_all(
+        self, context: Context, messages: list[str]
+    ) -> None:
+        _write_targets(context.repo_dir, 2)
+        Syncer(context).run()
+        renamed = _with_data(context, {"project": {"name": "renamed"}})
+        # As if the snapshot had missed the change.
+        manifest = json.loads(context.manifest_path.read_text())
+        manifest["data"] = renamed.data.snapshot()
+        context.manifest_path.write_text(json.dumps(manifest))
+        messages.clear()
+        Syncer(renamed).run()
+        assert not any(m.startswith("Skipped ") for m in messages)
+
+    def test_impure_targets_are_never_skipped(self, context: Context, messages: list[str]) -> None:
+        _write_targets(context.repo_dir, 1)
+        path = context.repo_dir / "year.toml"
+        path.write_text("# ::tyranno:: year = $<<now_utc().year>>\nyear = 0\n")
+        Syncer(context).run()
+        messages.clear()
+        Syncer(context).run()
+        assert [m for m in messages if m.startswith("Skipped ")] == [
+            f"Skipped {context.repo_dir / 'file-000.toml'}: up to date"
+        ]
+        assert any(m.startswith(f"Processed {path}: ") for m in messages)
+        assert path.read_text().splitlines()[1] == f"year = {STARTUP.utc.year}"
+
+    def test_not_incremental(self, context: Context, messages: list[str]) -> None:
+        _write_targets(context.repo_dir, 3)
+        Syncer(context).run()
+        messages.clear()
+        Syncer(context, incremental=False).run()
+        assert not any(m.startswith("Skipped ") for m in messages)
+
+
+class TestSyncerPrefilter:
+    def test_file_without_markers_is_untouched(self, context: Context) -> None:
+        path = context.repo_dir / "plain.toml"
+        path.write_bytes(b"# plain\r\nkey = 'value'")
+        mtime = path.stat().st_mtime_ns
+        Syncer(context).run()
+        assert path.read_bytes() == b"# plain\r\nkey = 'value'"
+        assert path.stat().st_mtime_ns == mtime
+
+    def test_has_markers(self, context: Context) -> None:
+        plain = context.repo_dir / "plain.toml"
+        plain.write_text("# ::tyranno start::\nkey = 'value'\n")
+        helper = SyncHelper(context, plain)
+        helper.run()
+        assert not helper.has_markers
+        assert helper.new_lines == ["# ::tyranno start::", "key = 'value'"]
+        marked = _write_targets(context.repo_dir, 1)[0]
+        helper = SyncHelper(context, marked)
+        helper.run()
+        assert helper.has_markers
+
+
+class TestSyncerWriteIfChanged:
+    def test_unchanged_file_is_untouched(self, context: Context, messages: list[str]) -> None:
+        path = context.repo_dir / "synced.toml"
+        path.write_bytes(b'# ::tyranno:: name = "$<<project.name>>"\r\nname = "my-project"')
+        mtime = path.stat().st_mtime_ns
+        Syncer(context).run()
+        assert (
+            path.read_bytes() == b'# ::tyranno:: name = "$<<project.name>>"\r\nname = "my-project"'
+        )
+        assert path.stat().st_mtime_ns == mtime
+        assert "0 modified, 1 unmodified" in messages[-1]
+
+    def test_rewrite_unchanged(self, context: Context) -> None:
+        path = context.repo_dir / "synced.toml"
+        path.write_bytes(b'# ::tyranno:: name = "$<<project.name>>"\r\nname = "my-project"')
+        Syncer(context, rewrite_unchanged=True).run()
+        assert (
+            path.read_bytes() == b'# ::tyranno:: name = "$<<project.name>>"\nname = "my-project"\n'
+        )
+
+    def test_is_modified(self, context: Context, messages: list[str]) -> None:
+        _write_targets(context.repo_dir, 2)
+        Syncer(context).run()
+        assert "2 modified, 0 unmodified" in messages[-1]
+
+
+class TestSyncHelperStream:
+    @pytest.mark.parametrize(
+        "content",
+        [
+            "",
+            "plain\n",
+            '# ::tyranno:: name = "$<<project.name>>"\nname = "old"\ntail\n',
+            "# ::tyranno:: $<<project.name>>\n# ::tyranno:: $<<project.version>>\na\nb\nc\n",
+            "# ::tyranno:: $<<project.name>>\n# ::tyranno:: $<<project.version>>\nonly-one",
+            "# ::tyranno:: $<<project.nonexistent>>\nkept\n# ::tyranno:: $<<.vendor>>\nx\n",
+        ],
+    )
+    def test_matches_run(self, context: Context, content: str) -> None:
+        path = context.repo_dir / "target.toml"
+        path.write_text(content)
+        in_memory = SyncHelper(context, path)
+        in_memory.run()
+        streamed = SyncHelper(context, path)
+        out = io.StringIO()
+        streamed.stream(out)
+        assert streamed.has_markers == in_memory.has_markers
+        if in_memory.has_markers:
+            assert out.getvalue().splitlines() == in_memory.new_lines
+        else:
+            assert not out.getvalue()
+        assert [h.new_lines for h in streamed.hits] == [h.new_lines for h in in_memory.hits]
+
+    def test_syncer_streams_large_files(self, context: Context) -> None:
+        paths = _write_targets(context.repo_dir, 3)
+        Syncer(context, stream_threshold=0).run()
+        for i, path in enumerate(paths):
+            assert path.read_text().splitlines()[1] == f'name = "my-project-{i}"'
+            assert not path.with_name(f".~{path.name}.temp").exists()
+
+    def test_streaming_memory_is_bounded(self, context: Context) -> None:
+        path = _write_targets(context.repo_dir, 1)[0]
+        with path.open("a") as f:
+            f.writelines(f"filler line {i:07}\n" for i in range(400_000))
+        size = path.stat().st_size
+        tracemalloc.start()
+        try:
+            Syncer(context, stream_threshold=size // 2).run()
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+        assert path.read_text().splitlines()[1] == 'name = "my-project-0"'
+        assert peak < size // 4
@@ -0,0 +1,94 @@
+# SPDX-FileCopyrightText: Copyright 2020-2026, Contributors to Tyrannosaurus
+# SPDX-PackageHomePage: https://github.com/dmyersturnbull/tyrannosaurus
+# SPDX-License-Identifier: Apache-2.0
+
+"""Tests for binary snapshots of parsed TOML files."""
+
+import pickle
+import tomllib
+from datetime import UTC, date, datetime, time, timedelta, timezone
+from typing import TYPE_CHECKING
+
+import pytest
+
+from tyranno_sandbox.tree_cache import TreeCache
+
+if TYPE_CHECKING:
+    from pathlib import Path
+
+TOML = """
+[project]
+name = "my-project"
+released = 2026-10-16
+built = 2026-10-16T12:30:00Z
+offset = 2026-10-16T12:30:00+05:30
+local = 2026-10-16T12:30:00
+at = 07:32:00
+keywords = ["alpha", "beta"]
+ratio = inf
+"""
+
+
+@pytest.fixture
+def cache(tmp_path: Path) -> TreeCache:
+    return TreeCache(tmp_path / "trees")
+
+
+@pytest.fixture
+def pyproject(tmp_path: Path) -> Path:
+    path = tmp_path / "pyproject.toml"
+    path.write_text(TOML, encoding="utf-8")
+    return path
+
+
+def _fail(_: str) -> None:
+    msg = "re-parsed"
+    raise AssertionError(msg)
+
+
+class TestTreeCache:
+    def test_round_trip(
+        self, cache: TreeCache, pyproject: Path, monkeypatch: pytest.MonkeyPatch
+    ) -> None:
+        parsed = cache.load_toml(pyproject)
+        monkeypatch.setattr(tomllib, "loads", _fail)
+        loaded = cache.load_toml(pyproject)
+        assert loaded == parsed
+        project = loaded["project"]
+        assert project["released"] == date(2026, 10, 16)  # ty:ignore[not-subscriptable]
+        assert project["built"] == datetime(2026, 10, 16, 12, 30, tzinfo=UTC)  # ty:ignore[not-subscriptable]
+        offset = timezone(timedelta(hours=5, minutes=30))
+        assert project["offset"].tzinfo == offset  # ty:ignore[not-subscriptable, unresolved-attribute]
+        assert project["local"].tzinfo is None  # ty:ignore[not-subscriptable, unresolved-attribute]
+        assert project["at"] == time(7, 32)  # ty:ignore[not-subscriptable]
+        assert type(project["released"]) is date  # ty:ignore[not-subscriptable]
+
+    def test_changed_file(self, cache: TreeCache, pyproject: Path) -> None:
+        cache.load_toml(pyproject)
+        pyproject.write_text(TOML.replace("my-project", "renamed"), encoding="utf-8")
+        assert cache.load_toml(pyproject).access("project.name") == "renamed"
+        assert len(list(cache.directory.glob("*.pickle"))) == 1
+
+    def test_corrupt_snapshot(self, cache: TreeCache, pyproject: Path) -> None:
+        cache.load_toml(pyproject)
+        (snapshot,) = cache.directory.glob("*.pickle")
+        snapshot.write_bytes(snapshot.read_bytes()[:-10])
+        assert cache.load_toml(pyproject).access("project.name") == "my-project"
+
+    def test_refuses_other_classes(
+        self, cache: TreeCache, pyproject: Path, monkeypatch: pytest.MonkeyPatch
+    ) -> None:
+        cache.load_toml(pyproject)
+        (snapshot,) = cache.directory.glob("*.pickle")
+        header = snapshot.read_bytes().partition(b"\n")[0] + b"\n"
+        snapshot.write_bytes(header + pickle.dumps({"x": timedelta, "y": print}))
+        monkeypatch.setattr(tomllib, "loads", lambda _: {"reparsed": True})
+        assert cache.load_toml(pyproject) == {"reparsed": True}
+
+    def test_invalid_toml(self, cache: TreeCache, pyproject: Path) -> None:
+        pyproject.write_text("[project\n", encoding="utf-8")
+        with pytest.raises(tomllib.TOMLDecodeError):
+            cache.load_toml(pyproject)
+        pyproject.write_text('"a.b" = 1\n', encoding="utf-8")
+        with pytest.raises(ValueError, match=r"contains '\.'"):
+            cache.load_toml(pyproject)
@@ -4,6 +4,9 @@
 
 """Unit tests for the Tyranno function registry."""
 
+from datetime import datetime
+
+from tyranno_sandbox.functions.times import DatetimeFunctions
 from tyranno_sandbox.tyranno_functions import (
     from_json,
     from_yaml,
@@ -161,6 +164,32 @@ class TestSourceFuncs:
         assert utc["unix_time"] == local["unix_time"]
 
 
+class TestLazyTimeDict:
+    def test_computes_only_accessed_fields(self) -> None:
+        lazy = DatetimeFunctions().lazy(datetime.fromisoformat("2025-06-15T10:30:00+00:00"))
+        assert lazy["year"] == 2025
+        assert lazy.month_name == "June"
+        assert len(dict.keys(lazy)) == 2  # Only the cached fields
+        assert "rfc_3339" in lazy
+
+    def test_equals_eager(self) -> None:
+        dt = datetime.fromisoformat("2024-02-29T23:59:59.5-05:00")
+        eager = DatetimeFunctions().of(dt)
+        lazy = DatetimeFunctions().lazy(dt)
+        assert lazy == eager
+        assert dict(lazy) == eager
+        assert list(lazy) == list(eager)
+        assert lazy.get("nonexistent") is None
+
+    def test_yaml(self) -> None:
+        lazy = DatetimeFunctions().lazy(datetime.fromisoformat("2025-06-15T10:30:00+00:00"))
+        assert yaml(lazy).startswith("date: '2025-06-15'")
+
+    def test_now_is_memoized(self) -> None:
+        assert now_utc() is now_utc()
+        assert now_local() is now_local()
+
+
 class TestYamlMultiline:
     def test_basic(self) -> None:
         assert yaml_multiline("alpha, beta, gamma") == "alpha\nbeta\ngamma"